@@ -0,0 +1,167 @@
+"""
+[BENCHMARK]: Admin analytics - per-request aggregation vs precomputed rollups
+===========================================================================
+Before: every dashboard request aggregates the `deal` table (volume, status
+split, average completion time, top channels). After: `AnalyticsService`
+reads `DealRollup` rows maintained incrementally by `src.workers.rollups`.
+
+Seeds a synthetic dataset (default 1M deals over 90 days, ~60% completed,
+~10% rejected) straight into a temporary SQLite file, then reports:
+- request latency for both read paths,
+- the one-off catch-up cost of the rollup job and an incremental run.
+
+Usage:
+    python -m benchmarks.bench_analytics --deals 1000000 --requests 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_TMP_DIR = tempfile.mkdtemp(prefix="tgadmc-bench-")
+_DB_PATH = f"{_TMP_DIR}/bench.db"
+os.environ.setdefault("BOT_TOKEN", "123456:BENCH-TOKEN")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_DB_PATH}")
+sys.path.append(os.getcwd())
+
+from loguru import logger
+from sqlalchemy import text
+
+from src.core.config import settings
+from src.db.database import async_session_maker, engine, init_db
+from src.services.analytics import AnalyticsService
+from src.workers.rollups import run_rollups
+
+FMT = "%Y-%m-%d %H:%M:%S.%f"
+CHUNK = 50_000
+
+
+def seed(deals: int, channels: int, advertisers: int, days: int, seed_value: int = 7):
+    """Bulk-loads users, channels, deals and their events with sqlite3."""
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    db = sqlite3.connect(_DB_PATH)
+    db.executemany(
+        'INSERT INTO "user" (id, telegram_id, role) VALUES (?, ?, ?)',
+        [(i, 1_000_000 + i, "ADVERTISER") for i in range(1, advertisers + 1)],
+    )
+    db.executemany(
+        "INSERT INTO channel (id, channel_id, title, owner_id, subscribers, avg_views, language, "
+        "premium_ratio, price_post, verified, created_at, updated_at) "
+        "VALUES (?, ?, ?, 1, 1000, 100, 'en', 0.0, 10.0, 1, ?, ?)",
+        [(i, -i, f"Channel {i}", now.strftime(FMT), now.strftime(FMT)) for i in range(1, channels + 1)],
+    )
+
+    deal_id = 0
+    for start in range(0, deals, CHUNK):
+        deal_rows, event_rows = [], []
+        for _ in range(min(CHUNK, deals - start)):
+            deal_id += 1
+            created = now - timedelta(seconds=rng.uniform(0, days * 86400))
+            roll = rng.random()
+            status = "COMPLETED" if roll < 0.6 else "REJECTED" if roll < 0.7 else "SCHEDULED"
+            changed = min(created + timedelta(seconds=rng.uniform(600, 3 * 86400)), now)
+            deal_rows.append((
+                deal_id, rng.randint(1, advertisers), rng.randint(1, channels), status,
+                round(rng.uniform(1, 100), 2), "brief", created.strftime(FMT), changed.strftime(FMT),
+            ))
+            event_rows.append((deal_id, None, "CREATED", created.strftime(FMT)))
+            if status != "SCHEDULED":
+                event_rows.append((deal_id, "CREATED", status, changed.strftime(FMT)))
+        db.executemany(
+            "INSERT INTO deal (id, advertiser_id, channel_id, status, amount_ton, ad_brief, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            deal_rows,
+        )
+        db.executemany(
+            "INSERT INTO dealevent (deal_id, from_status, to_status, created_at) VALUES (?, ?, ?, ?)",
+            event_rows,
+        )
+    db.commit()
+    db.close()
+
+
+# Legacy read path: aggregate the deal table on every request
+LEGACY_QUERIES = (
+    "SELECT sum(amount_ton), count(*) FROM deal WHERE status = 'COMPLETED'",
+    "SELECT status, count(*) FROM deal GROUP BY status",
+    "SELECT avg((julianday(updated_at) - julianday(created_at)) * 86400) FROM deal WHERE status = 'COMPLETED'",
+    "SELECT channel_id, sum(amount_ton) AS volume FROM deal WHERE status = 'COMPLETED' "
+    "GROUP BY channel_id ORDER BY volume DESC LIMIT 10",
+    "SELECT advertiser_id, sum(amount_ton) AS volume FROM deal WHERE status = 'COMPLETED' "
+    "GROUP BY advertiser_id ORDER BY volume DESC LIMIT 10",
+)
+
+
+async def legacy_request():
+    async with async_session_maker() as session:
+        for query in LEGACY_QUERIES:
+            (await session.execute(text(query))).all()
+
+
+async def rollup_request():
+    async with async_session_maker() as session:
+        service = AnalyticsService(session)
+        await service.get_platform_stats(days=None)
+        await service.get_channel_performance(days=None)
+        await service.get_advertiser_performance(days=None)
+
+
+async def measure(request, repeats: int):
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await request()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.mean(latencies), max(latencies)
+
+
+async def main(args):
+    logger.remove()
+    await init_db()
+    started = time.perf_counter()
+    seed(args.deals, args.channels, args.advertisers, args.days)
+    print(f"seeded {args.deals} deals in {time.perf_counter() - started:.1f}s")
+
+    async with async_session_maker() as session:
+        from src.services.events import backfill_projections
+        await backfill_projections(session) # Status-count projection for the active/cancelled split
+
+        def after_lag():
+            # As the job sees events once the commit-lag window has passed
+            return datetime.utcnow() + timedelta(seconds=settings.ANALYTICS_ROLLUP_LAG_SECONDS + 1)
+
+        started = time.perf_counter()
+        events = await run_rollups(session, now=after_lag())
+        print(f"rollup catch-up: {events} events in {time.perf_counter() - started:.1f}s (one-off)")
+
+        await session.execute(text(
+            "INSERT INTO dealevent (deal_id, from_status, to_status, created_at) "
+            "SELECT id, 'SCHEDULED', 'COMPLETED', :now FROM deal WHERE status = 'SCHEDULED' LIMIT 1000"
+        ), {"now": datetime.utcnow().strftime(FMT)})
+        await session.commit()
+        started = time.perf_counter()
+        events = await run_rollups(session, now=after_lag())
+        print(f"rollup incremental: {events} events in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    mean, worst = await measure(legacy_request, args.requests)
+    print(f"before (aggregate deal)  mean={mean:9.2f}ms  max={worst:9.2f}ms")
+    mean, worst = await measure(rollup_request, args.requests)
+    print(f"after  (rollups)         mean={mean:9.2f}ms  max={worst:9.2f}ms")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deals", type=int, default=1_000_000)
+    parser.add_argument("--channels", type=int, default=2_000)
+    parser.add_argument("--advertisers", type=int, default=5_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--requests", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,94 @@
+"""
+[BENCHMARK]: Per-request Mini App auth cost (initData validation)
+=================================================================
+Legacy behaviour re-derived the HMAC secret from the bot token, re-parsed the
+query string and the user JSON on every request. Validation now derives the
+secret once and keeps recently validated initData strings in a bounded TTL
+cache. Measures a realistic mix: a pool of active users, each re-sending the
+same initData string on every call of their session.
+
+Usage:
+    python -m benchmarks.bench_auth --users 200 --requests 50000
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from urllib.parse import parse_qsl, urlencode
+
+os.environ.setdefault("BOT_TOKEN", "123456:BENCH-TOKEN")
+sys.path.append(os.getcwd())
+
+from loguru import logger
+
+from src.utils.auth import init_data_cache, validate_init_data
+
+TOKEN = os.environ["BOT_TOKEN"]
+
+
+def legacy_validate(init_data: str, bot_token: str):
+    parsed_data = dict(parse_qsl(init_data))
+    received_hash = parsed_data.pop("hash")
+    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(parsed_data.items()))
+    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    if calculated_hash == received_hash:
+        return json.loads(parsed_data["user"])
+    return None
+
+
+def make_init_data(user_id: int) -> str:
+    fields = {
+        "auth_date": str(int(time.time())),
+        "query_id": f"AAH{user_id:012d}",
+        "user": json.dumps({"id": user_id, "first_name": "Bench", "username": f"user{user_id}",
+                            "language_code": "en", "allows_write_to_pm": True}),
+    }
+    check = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret = hmac.new(b"WebAppData", TOKEN.encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(secret, check.encode(), hashlib.sha256).hexdigest()
+    return urlencode(fields)
+
+
+def measure(validate, workload):
+    samples = []
+    for init_data in workload:
+        start = time.perf_counter()
+        assert validate(init_data, TOKEN)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return samples
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{name:<18} mean={statistics.mean(samples):6.2f}us  p50={statistics.median(samples):6.2f}us  p99={p99:6.2f}us")
+
+
+def main(args):
+    logger.remove()
+    sessions = [make_init_data(user_id) for user_id in range(args.users)]
+    rng = random.Random(7)
+    workload = [rng.choice(sessions) for _ in range(args.requests)]
+
+    init_data_cache.invalidate()
+    legacy = measure(legacy_validate, workload)
+    current = measure(validate_init_data, workload)
+
+    print(f"users: {args.users}  requests: {args.requests}")
+    report("before (legacy)", legacy)
+    report("after  (cached)", current)
+    stats = init_data_cache.stats()
+    print(f"cache: hit_ratio={stats['hit_ratio']} size={stats['size']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=50000)
+    main(parser.parse_args())
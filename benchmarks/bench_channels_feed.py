@@ -0,0 +1,113 @@
+"""
+[BENCHMARK]: GET /api/channels throughput (requests/sec)
+=======================================================
+Compares the legacy session layer (new `sessionmaker` per request + `echo=True`)
+against the pooled engine / module-level session factory in `src/db/database.py`.
+
+Runs in-process through httpx's ASGI transport against a seeded SQLite file,
+so the numbers isolate app + DB overhead from network noise.
+
+Usage:
+    python -m benchmarks.bench_channels_feed --requests 2000 --channels 500
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+_TMP_DIR = tempfile.mkdtemp(prefix="tgadmc-bench-")
+os.environ.setdefault("BOT_TOKEN", "123456:BENCH-TOKEN")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_TMP_DIR}/bench.db")
+sys.path.append(os.getcwd())
+
+import httpx
+from loguru import logger
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.core.config import settings
+from src.db.database import get_session, init_db, async_session_maker
+from src.db.models import Channel, User
+from src.main import app
+
+
+async def seed(channels: int):
+    await init_db()
+    async with async_session_maker() as session:
+        owner = User(telegram_id=1, username="bench_owner")
+        session.add(owner)
+        await session.commit()
+        await session.refresh(owner)
+        for i in range(channels):
+            session.add(Channel(
+                channel_id=-100_000 - i,
+                title=f"Bench Channel {i}",
+                username=f"bench_{i}",
+                owner_id=owner.id,
+                subscribers=1000 + i,
+                verified=True,
+            ))
+        await session.commit()
+
+
+def legacy_session_dependency():
+    """Reproduces the pre-pooling behaviour: echo engine + factory per call."""
+    legacy_engine = create_async_engine(settings.DATABASE_URL, echo=True, future=True)
+
+    async def legacy_get_session():
+        factory = sessionmaker(legacy_engine, class_=AsyncSession, expire_on_commit=False)
+        async with factory() as session:
+            yield session
+
+    return legacy_engine, legacy_get_session
+
+
+async def run_load(total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = asyncio.Queue()
+        for _ in range(total):
+            queue.put_nowait(None)
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                resp = await client.get("/api/channels", params={"limit": 20})
+                resp.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - start)
+
+
+async def main(args):
+    # Keep the console readable: logs are still formatted, just discarded
+    logger.configure(handlers=[{"sink": lambda _msg: None}])
+    await seed(args.channels)
+
+    legacy_engine, legacy_get_session = legacy_session_dependency()
+    app.dependency_overrides[get_session] = legacy_get_session
+    await run_load(min(100, args.requests), args.concurrency) # warm-up
+    before = await run_load(args.requests, args.concurrency)
+    app.dependency_overrides.clear()
+    await legacy_engine.dispose()
+
+    await run_load(min(100, args.requests), args.concurrency) # warm-up
+    after = await run_load(args.requests, args.concurrency)
+
+    print(f"channels seeded : {args.channels}")
+    print(f"requests        : {args.requests} (concurrency={args.concurrency})")
+    print(f"before (legacy) : {before:8.1f} req/s")
+    print(f"after  (pooled) : {after:8.1f} req/s")
+    print(f"speedup         : {after / before:8.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--channels", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,78 @@
+"""
+[BENCHMARK]: Web process cold start (import time)
+=================================================
+Autoscaled replicas are not ready until `src.main` is imported and the
+lifespan has run; imports dominate. This runs `python -X importtime` in
+fresh interpreters and reports:
+- lazy:  `import src.main` as shipped (aiogram, tonsdk, APScheduler deferred),
+- eager: the same plus the deferred modules, i.e. what every web process
+  paid at import before they were deferred,
+and where the lazy run spends its time, per package.
+
+The lifespan's own phases (db, ton, scheduler, bot, webhook) are logged by
+the app at boot: "Startup ready in ...".
+
+Usage:
+    python -m benchmarks.bench_import_time --runs 5 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+LAZY = "import src.main"
+EAGER = (
+    "import src.main, src.bot.instance, aiogram.types, src.services.ton, src.workers.scheduler, "
+    "apscheduler.schedulers.asyncio; src.services.ton._sdk()"
+)
+
+
+def profile(code: str):
+    """
+    Runs `code` in a fresh interpreter.
+    Returns (total import ms, {root package: self ms}).
+    """
+    env = dict(os.environ, BOT_TOKEN=os.environ.get("BOT_TOKEN", "123456:BENCH-TOKEN"))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env, cwd=os.getcwd(), check=True,
+    )
+    total, packages = 0, defaultdict(float)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "): # Depth 0: imported by the -c code itself
+            total += int(cumulative)
+        # Self times add up to the total, so they attribute it without double counting
+        packages[name.strip().split(".")[0]] += int(own) / 1000
+    return total / 1000, packages
+
+
+def main(args):
+    totals = defaultdict(list)
+    packages = defaultdict(list)
+    for _ in range(args.runs):
+        for label, code in (("lazy", LAZY), ("eager", EAGER)):
+            total, own = profile(code)
+            totals[label].append(total)
+            if label == "lazy":
+                for name, ms in own.items():
+                    packages[name].append(ms)
+
+    for label in ("eager", "lazy"):
+        print(f"{label:5} imports  median={statistics.median(totals[label]):8.1f}ms  "
+              f"min={min(totals[label]):8.1f}ms")
+    print(f"\nslowest packages (lazy, self time, median of {args.runs}):")
+    ranked = sorted(packages.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for name, samples in ranked[:args.top]:
+        print(f"  {name:32} {statistics.median(samples):8.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    main(parser.parse_args())
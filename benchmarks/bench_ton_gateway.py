@@ -0,0 +1,71 @@
+"""
+[BENCHMARK]: TonGateway call latency, fresh session vs shared pool
+==================================================================
+Legacy behaviour opened a new `aiohttp.ClientSession` per call (new TCP, and in
+production a new TLS handshake to toncenter). The gateway now keeps one pooled
+session. Runs against the local fake toncenter from `tests/fake_toncenter.py`,
+so only connection setup differs (plain HTTP: the TLS saving is not even counted).
+
+Usage:
+    python -m benchmarks.bench_ton_gateway --calls 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("BOT_TOKEN", "123456:BENCH-TOKEN")
+sys.path.append(os.getcwd())
+
+import aiohttp
+from loguru import logger
+
+from src.services.ton import TonGateway
+from tests.fake_toncenter import FakeToncenter
+
+
+async def legacy_call(url: str):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{url}/getMasterchainInfo") as resp:
+            return resp.status == 200
+
+
+async def measure(call, calls: int):
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        assert await call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{name:<18} mean={statistics.mean(samples):6.3f}ms  p50={statistics.median(samples):6.3f}ms  p95={p95:6.3f}ms")
+
+
+async def main(args):
+    logger.remove()
+    async with FakeToncenter() as toncenter:
+        legacy = await measure(lambda: legacy_call(toncenter.url), args.calls)
+        legacy_conns = len(toncenter.connections)
+
+        toncenter.connections.clear()
+        gateway = TonGateway("EQ-bench", base_url=toncenter.url)
+        await gateway.start()
+        pooled = await measure(gateway.check_connection, args.calls)
+        await gateway.close()
+
+    print(f"calls: {args.calls}")
+    report("before (per-call)", legacy)
+    report("after  (pooled)", pooled)
+    print(f"TCP connections: before={legacy_conns} after={len(toncenter.connections)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,107 @@
+"""
+[BENCHMARK]: /start storm - get_or_create_user round trips and latency
+=====================================================================
+Legacy behaviour: SELECT -> INSERT -> COMMIT -> refresh SELECT, and on a lost
+race ROLLBACK + re-SELECT. Now: SELECT, then on a miss one
+`INSERT ... ON CONFLICT DO UPDATE ... RETURNING` + COMMIT.
+
+Simulates a viral channel: `--users` new users each sending /start
+`--repeats` times, all concurrently, one session per update (as aiogram does).
+Runs against a temporary SQLite file.
+
+Usage:
+    python -m benchmarks.bench_user_upsert --users 200 --repeats 3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+_TMP_DIR = tempfile.mkdtemp(prefix="tgadmc-bench-")
+os.environ.setdefault("BOT_TOKEN", "123456:BENCH-TOKEN")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_TMP_DIR}/bench.db")
+sys.path.append(os.getcwd())
+
+from loguru import logger
+from sqlalchemy import event, text
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import SQLModel, select
+
+from src.db.database import async_session_maker, engine
+from src.db.models import User
+from src.services.identity import IdentityService
+
+
+async def legacy_get_or_create_user(session, telegram_id: int, username: str = None) -> User:
+    """Pre-upsert implementation, kept verbatim for comparison."""
+    statement = select(User).where(User.telegram_id == telegram_id)
+    user = (await session.exec(statement)).first()
+    if user:
+        return user
+    try:
+        user = User(telegram_id=telegram_id, username=username)
+        session.add(user)
+        await session.commit()
+        await session.refresh(user)
+        return user
+    except IntegrityError:
+        await session.rollback()
+        return (await session.exec(statement)).first()
+
+
+async def current_get_or_create_user(session, telegram_id: int, username: str = None) -> User:
+    return await IdentityService(session).get_or_create_user(telegram_id, username)
+
+
+async def storm(get_or_create, users: int, repeats: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+
+    latencies = []
+
+    async def start(telegram_id):
+        started = time.perf_counter()
+        async with async_session_maker() as session:
+            await get_or_create(session, telegram_id, f"user{telegram_id}")
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(start(10_000 + i) for _ in range(repeats) for i in range(users)))
+    elapsed = time.perf_counter() - started
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    async with async_session_maker() as session:
+        rows = (await session.exec(text("SELECT count(*) FROM user"))).scalar()
+    assert rows == users, f"expected {users} users, found {rows}"
+    return statements, latencies, elapsed
+
+
+def report(name, statements, latencies, elapsed, calls):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<18} statements/call={len(statements) / calls:4.2f}  "
+          f"mean={statistics.mean(latencies):7.2f}ms  p95={p95:7.2f}ms  total={elapsed:5.2f}s")
+
+
+async def main(args):
+    logger.remove()
+    calls = args.users * args.repeats
+    print(f"users: {args.users}  /start per user: {args.repeats}  calls: {calls}")
+    report("before (legacy)", *await storm(legacy_get_or_create_user, args.users, args.repeats), calls)
+    report("after  (upsert)", *await storm(current_get_or_create_user, args.users, args.repeats), calls)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -6,15 +6,24 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from datetime import datetime
+from typing import Optional
 import os
 
 from src.db.database import get_session
+from src.services.analytics import system_counts_cache
+from src.services.identity import invalidate_identity
 
 admin_router = APIRouter(prefix="/admin", tags=["Admin"])
 
 # [SECURITY]: Simple key for demo protection
 ADMIN_KEY = os.getenv("ADMIN_KEY", "hackathon2026")
 
+# Deal data, children first (foreign keys)
+DEAL_TABLES = (
+    "payout", "dealevent", "dealstatuscount", "statusduration", "channeldealstats",
+    "dealrollup", "rollupcursor", "deal",
+)
+
 def verify_admin_key(key: str = Query(...)):
     if key != ADMIN_KEY:
         raise HTTPException(status_code=403, detail="Invalid admin key")
@@ -58,9 +67,11 @@ async def reset_database(key: str = Query(...), session: AsyncSession = Depends(
         return {"error": "Invalid admin key", "hint": "Use ?key=hackathon2026"}
     
     try:
-        # Clear deals (main transaction data)
-        await session.execute(text("DELETE FROM deal"))
+        # Clear deals (main transaction data), their payouts, history and projections
+        for table in DEAL_TABLES:
+            await session.execute(text(f"DELETE FROM {table}"))
         await session.commit()
+        system_counts_cache.invalidate()
         
         return {
             "status": "success",
@@ -88,11 +99,14 @@ async def purge_all(key: str = Query(...), session: AsyncSession = Depends(get_s
     
     try:
         # Order matters due to foreign keys
-        await session.execute(text("DELETE FROM deal"))
-        await session.execute(text("DELETE FROM channel_manager"))
+        for table in DEAL_TABLES:
+            await session.execute(text(f"DELETE FROM {table}"))
+        await session.execute(text("DELETE FROM channelmanager"))
         await session.execute(text("DELETE FROM channel"))
         await session.execute(text("DELETE FROM \"user\""))
         await session.commit()
+        invalidate_identity()
+        system_counts_cache.invalidate()
         
         return {
             "status": "success",
@@ -112,27 +126,73 @@ async def purge_all(key: str = Query(...), session: AsyncSession = Depends(get_s
 async def system_info(session: AsyncSession = Depends(get_session)):
     """
     [DEMO]: System statistics for jury display.
-    Shows counts of all entities.
+    Shows counts of all entities and deals per status.
+    [PERF]: One round trip, no full scans of large tables, cached for
+    ADMIN_STATS_CACHE_TTL seconds (see AnalyticsService.get_system_counts).
     """
+    from src.services.analytics import AnalyticsService
+
     try:
-        users = await session.execute(text("SELECT COUNT(*) FROM \"user\""))
-        channels = await session.execute(text("SELECT COUNT(*) FROM channel"))
-        deals = await session.execute(text("SELECT COUNT(*) FROM deal"))
-        
         return {
             "status": "ok",
-            "stats": {
-                "users": users.scalar(),
-                "channels": channels.scalar(),
-                "deals": deals.scalar()
-            },
+            "stats": await AnalyticsService(session).get_system_counts(),
             "endpoints": {
                 "health": "/admin/health",
                 "reset_deals": "/admin/reset-db?key=<ADMIN_KEY>",
                 "full_purge": "/admin/purge-all?key=<ADMIN_KEY>",
-                "info": "/admin/info"
+                "info": "/admin/info",
+                "cache": "/admin/cache",
+                "analytics": "/admin/analytics?key=<ADMIN_KEY>"
             },
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
         return {"status": "error", "message": str(e)}
+
+# -------------------------------------------
+# CACHE STATS
+# -------------------------------------------
+@admin_router.get("/cache")
+async def cache_stats():
+    """
+    [PERF]: Hit/miss/eviction counters for in-process caches.
+    Per worker process; use it to size the *_CACHE_SIZE / *_CACHE_TTL settings.
+    """
+    from src.services.marketplace import channel_feed_cache
+    from src.services.identity import identity_cache
+    from src.utils.auth import init_data_cache
+
+    return {
+        "status": "ok",
+        "caches": [channel_feed_cache.stats(), init_data_cache.stats(), identity_cache.stats(),
+                   system_counts_cache.stats()],
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+# -------------------------------------------
+# ANALYTICS
+# -------------------------------------------
+@admin_router.get("/analytics")
+async def analytics(key: str = Query(...), days: Optional[int] = Query(None, ge=0),
+                    limit: int = Query(10, ge=1, le=100), session: AsyncSession = Depends(get_session)):
+    """
+    [ANALYTICS]: Platform KPIs, daily series and top channels/advertisers.
+    Served from the precomputed rollups (see `src.workers.rollups`).
+    `days` omitted or 0: all-time KPIs and leaders (the daily series then
+    covers the last 30 days).
+    """
+    if key != ADMIN_KEY:
+        return {"error": "Invalid admin key"}
+
+    from src.services.analytics import AnalyticsService
+
+    days = days or None # All time: the TOTAL rollup rows
+    service = AnalyticsService(session)
+    return {
+        "status": "ok",
+        "platform": await service.get_platform_stats(days),
+        "daily": await service.get_timeseries(periods=days or 30),
+        "top_channels": await service.get_channel_performance(days=days, limit=limit),
+        "top_advertisers": await service.get_advertiser_performance(days=days, limit=limit),
+        "timestamp": datetime.utcnow().isoformat()
+    }
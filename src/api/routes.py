@@ -1,13 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
-from pydantic import BaseModel
-
-from src.db.database import get_session
-from src.services.marketplace import MarketplaceService
-from src.services.escrow import EscrowService
-from src.services.identity import IdentityService
-from src.db.models import Channel, Deal, User
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+from src.db.database import async_session_maker, get_session
+from src.services.marketplace import MarketplaceService, FeedFilters
+from src.services.escrow import EscrowService, DealRequest
+from src.services.deals import UserDealsService
+from src.services.identity import IdentityService, invalidate_identity
+from src.services.search import ChannelSearchService
+from src.db.models import Channel, Deal, DealStatus, User
 from src.utils.auth import get_current_user # [SECURITY] Import Dependency
 
 router = APIRouter(prefix="/api", tags=["Marketplace"])
@@ -39,6 +45,20 @@ class CreateDealRequest(BaseModel):
     brief: str
     amount: float
 
+class BulkDealItem(BaseModel):
+    """ One target channel of a campaign """
+    channel_id: int
+    amount: float
+    brief: Optional[str] = None # Defaults to the campaign brief
+
+class BulkCreateDealRequest(BaseModel):
+    """
+    DTO for Campaign Launch (one deal per channel).
+    """
+    advertiser_id: int
+    brief: Optional[str] = None # Shared brief for every item without its own
+    deals: List[BulkDealItem] = Field(..., min_length=1, max_length=100)
+
 class ActionWithContent(BaseModel):
     """ Generic DTO for actions that require text (Draft, Revision) """
     user_id: int
@@ -79,20 +99,59 @@ class RoleUpdateRequest(BaseModel):
 
 @router.get("/channels", response_model=List[ChannelResponse])
 async def get_channels(
-    limit: int = 20, 
-    offset: int = 0, 
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    language: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_subscribers: Optional[int] = None,
+    min_premium_ratio: Optional[float] = None,
     session: AsyncSession = Depends(get_session)
     # user: dict = Depends(get_current_user) # [SECURITY]: Descomentar para activar "Auth Shield"
 ):
     """
     [TACTICAL PURPOSE]: Public Marketplace Feed.
     [DATA FLOW]: Fetch Verified Channels -> Filter by Metrics -> Serve to Advertiser UI.
-    Using 'limit/offset' for Infinite Scroll efficiency.
+    [PAGINATION]: Pass the `X-Next-Cursor` response header back as `cursor`
+    for constant-cost Infinite Scroll. Legacy `limit/offset` still works.
     """
     service = MarketplaceService(session)
-    channels = await service.list_verified_channels(limit, offset)
+    filters = FeedFilters(
+        language=language,
+        min_price=min_price,
+        max_price=max_price,
+        min_subscribers=min_subscribers,
+        min_premium_ratio=min_premium_ratio,
+    )
+
+    if cursor or offset == 0:
+        try:
+            channels, next_cursor = await service.list_verified_channels_page(limit, cursor, filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        channels = await service.list_verified_channels(limit, offset, filters)
+        next_cursor = service.cursor_for(channels[-1]) if len(channels) == limit else None
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return channels
 
+@router.get("/channels/search", response_model=List[ChannelResponse])
+async def search_channels(
+    q: str = Query(..., min_length=2, max_length=64),
+    limit: int = Query(20, ge=1, le=50),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    [DISCOVERY]: Full-text Channel Search.
+    [DATA FLOW]: Prefix match on title/@username -> Rank by relevance x audience size.
+    """
+    service = ChannelSearchService(session)
+    return await service.search(q, limit)
+
 @router.get("/channels/user/{user_id}", response_model=List[ChannelResponse])
 async def get_user_channels(
     user_id: int,
@@ -102,15 +161,13 @@ async def get_user_channels(
     [OWNER DASHBOARD]: Get simplified list of My Channels.
     """
     ident_service = IdentityService(session)
-    # Map TG ID to DB ID
-    user = await ident_service.get_or_create_user(user_id)
+    # Map TG ID to DB ID (cached)
+    user = await ident_service.resolve_user(user_id)
     
     from sqlmodel import select
     from src.db.models import Channel
     stmt = select(Channel).where(Channel.owner_id == user.id)
     result = await session.exec(stmt)
-    stmt = select(Channel).where(Channel.owner_id == user.id)
-    result = await session.exec(stmt)
     return result.all()
 
 @router.post("/user/wallet")
@@ -129,6 +186,7 @@ async def update_user_wallet(
     user.wallet_address = req.wallet_address
     session.add(user)
     await session.commit()
+    invalidate_identity(req.user_id)
     
     return {"status": "updated", "wallet_address": req.wallet_address}
 
@@ -156,6 +214,7 @@ async def update_user_role(
         user.role = role_map[req.role.lower()]
         session.add(user)
         await session.commit()
+        invalidate_identity(req.user_id)
         return {"status": "updated", "role": user.role.value}
     else:
         raise HTTPException(status_code=400, detail=f"Invalid role: {req.role}")
@@ -170,7 +229,7 @@ async def update_channel_price(
     [OWNER]: Update Channel Price.
     """
     ident_service = IdentityService(session)
-    user = await ident_service.get_or_create_user(req.user_id)
+    user = await ident_service.resolve_user(req.user_id)
     
     # Verify Ownership
     channel = await session.get(Channel, channel_id)
@@ -197,7 +256,7 @@ async def create_deal(
     escrow_service = EscrowService(session)
     try:
         # [MAPPING]: Linking Telegram User -> Internal Host ID
-        advertiser = await ident_service.get_or_create_user(request.advertiser_id)
+        advertiser = await ident_service.resolve_user(request.advertiser_id)
         
         deal = await escrow_service.create_deal_request(
             advertiser_id=advertiser.id, # Internal DB ID
@@ -209,6 +268,39 @@ async def create_deal(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/deals/bulk-create")
+async def create_deals_bulk(
+    request: BulkCreateDealRequest,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    [CAMPAIGN]: Creates deals on many channels at once.
+    [PERF]: One user lookup, one channel validation query, one multi-row
+    INSERT and one commit, instead of N calls to /deals/create.
+    """
+    items = []
+    for item in request.deals:
+        brief = item.brief or request.brief
+        if not brief:
+            raise HTTPException(status_code=400, detail=f"Missing brief for channel {item.channel_id}")
+        items.append(DealRequest(channel_id=item.channel_id, brief=brief, amount=item.amount))
+
+    ident_service = IdentityService(session)
+    escrow_service = EscrowService(session)
+    try:
+        advertiser = await ident_service.resolve_user(request.advertiser_id)
+        created = await escrow_service.create_deals_bulk(advertiser.id, items)
+        return {
+            "status": "created",
+            "deal_ids": [deal.deal_id for deal in created],
+            "deals": [
+                {"deal_id": deal.deal_id, "channel_id": deal.channel_id, "amount_ton": deal.amount_ton}
+                for deal in created
+            ],
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/deals/{deal_id}")
 async def get_deal(deal_id: int, session: AsyncSession = Depends(get_session)):
     """
@@ -231,7 +323,7 @@ async def accept_deal(
     ident_service = IdentityService(session)
     escrow_service = EscrowService(session)
     try:
-        user = await ident_service.get_or_create_user(req.user_id)
+        user = await ident_service.resolve_user(req.user_id)
         deal = await escrow_service.accept_deal(deal_id, user.id)
         return {"status": deal.status}
     except Exception as e:
@@ -249,7 +341,7 @@ async def reject_deal(
     ident_service = IdentityService(session)
     escrow_service = EscrowService(session)
     try:
-        user = await ident_service.get_or_create_user(req.user_id)
+        user = await ident_service.resolve_user(req.user_id)
         # Verify ownership (implicit in logic but good to enforce if needed, 
         # but Service handles status check which is primary guard)
         
@@ -264,7 +356,7 @@ async def submit_draft(deal_id: int, req: ActionWithContent, session: AsyncSessi
     ident_service = IdentityService(session)
     escrow_service = EscrowService(session)
     try:
-        user = await ident_service.get_or_create_user(req.user_id)
+        user = await ident_service.resolve_user(req.user_id)
         deal = await escrow_service.submit_draft(deal_id, req.content)
         return {"status": deal.status}
     except Exception as e:
@@ -276,7 +368,7 @@ async def approve_deal(deal_id: int, req: ActionSimple, session: AsyncSession =
     ident_service = IdentityService(session)
     escrow_service = EscrowService(session)
     try:
-        user = await ident_service.get_or_create_user(req.user_id)
+        user = await ident_service.resolve_user(req.user_id)
         deal = await session.get(Deal, deal_id)
         
         # [SECURITY]: Verify caller is the Advertiser
@@ -296,7 +388,7 @@ async def request_revision(deal_id: int, req: ActionWithContent, session: AsyncS
     ident_service = IdentityService(session)
     escrow_service = EscrowService(session)
     try:
-        user = await ident_service.get_or_create_user(req.user_id)
+        user = await ident_service.resolve_user(req.user_id)
         deal = await escrow_service.request_revision(deal_id, req.content)
         return {"status": deal.status}
     except Exception as e:
@@ -308,7 +400,7 @@ async def confirm_payment(deal_id: int, req: PaymentConfirmation, session: Async
     ident_service = IdentityService(session)
     escrow_service = EscrowService(session)
     try:
-        user = await ident_service.get_or_create_user(req.user_id)
+        user = await ident_service.resolve_user(req.user_id)
         
         # [CRITICAL VULNERABILITY]: MVP Mode (Blind Trust).
         # [VIRAL VECTOR]: El frontend nos envía un hash y nosotros lo creemos.
@@ -324,42 +416,57 @@ async def confirm_payment(deal_id: int, req: PaymentConfirmation, session: Async
         raise HTTPException(status_code=400, detail=str(e))
 @router.get("/deals/user/{user_id}")
 async def get_user_deals(
-    user_id: int, 
+    user_id: int,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status: Optional[DealStatus] = None,
+    role: Optional[Literal["advertiser", "owner"]] = None,
     session: AsyncSession = Depends(get_session)
 ):
     """
     [MVP REQ]: CRM Lite View
-    Retrieves all deals relevant to the user (as Advertiser or Channel Manager).
+    Retrieves deals relevant to the user (as Advertiser or Channel Owner),
+    most recently updated first, each tagged with `user_role`.
+    [PAGINATION]: Pass the `X-Next-Cursor` response header back as `cursor`.
+    Brief/draft are previews (`brief_truncated`/`draft_truncated` say which
+    was cut, `truncated` either); GET /deals/{id} returns the full deal.
     """
-    from sqlmodel import select, or_
-    from src.db.models import Channel, User
-    
-    # 1. Map telegram_id to DB user_id
-    user_stmt = select(User.id).where(User.telegram_id == user_id)
-    user_db_id = (await session.exec(user_stmt)).first()
+    # 1. Map telegram_id to DB user_id (cached)
+    user_db_id = await IdentityService(session).find_user_id(user_id)
     
     if not user_db_id:
         return []
 
-    # 2. Fetch deals
-    stmt = select(Deal).where(
-        or_(
-            Deal.advertiser_id == user_db_id,
-            Deal.channel_id.in_(
-                select(Channel.id).where(Channel.owner_id == user_db_id)
-            )
-        )
-    )
-    result = await session.exec(stmt)
-    deals = result.all()
-    
-    # 3. Enrich with Role for Frontend Discrimination
-    enriched_deals = []
-    for deal in deals:
-        role = "advertiser" if deal.advertiser_id == user_db_id else "owner"
-        # Convert to dict and add role
-        d = deal.model_dump()
-        d["user_role"] = role
-        enriched_deals.append(d)
-
-    return enriched_deals
+    # 2. One keyset page, role computed in SQL
+    try:
+        deals, next_cursor = await UserDealsService(session).list_page(user_db_id, limit, cursor, status, role)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return deals
+
+@router.get("/deals/user/{user_id}/export")
+async def export_user_deals(
+    user_id: int,
+    status: Optional[DealStatus] = None,
+    role: Optional[Literal["advertiser", "owner"]] = None,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    [EXPORT]: Every deal of the user as NDJSON (one summary per line),
+    streamed page by page instead of built in memory.
+    """
+    user_db_id = await IdentityService(session).find_user_id(user_id)
+
+    async def lines():
+        if not user_db_id:
+            return
+        # Own session: the request's session is closed once the handler returns
+        async with async_session_maker() as export_session:
+            async for deal in UserDealsService(export_session).iter_all(user_db_id, status, role):
+                yield json.dumps(jsonable_encoder(deal)) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
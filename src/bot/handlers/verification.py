@@ -80,7 +80,8 @@ async def register_channel_logic(message: types.Message, bot: Bot, chat: types.C
         channel = await identity_service.register_channel(
             owner_id=owner.id,
             channel_id=chat.id,
-            title=chat.title
+            title=chat.title,
+            username=chat.username
         )
         
         # [AUTOMATIC]: Verification Logic
@@ -0,0 +1,19 @@
+"""
+[BOT]: Process-wide Bot and Dispatcher.
+Shared by the web app (webhook ingress) and the standalone worker (publishing),
+so neither has to import the other.
+"""
+from aiogram import Bot, Dispatcher
+from aiogram.enums import ParseMode
+from aiogram.client.default import DefaultBotProperties
+
+from src.core.config import settings
+from src.bot.handlers import common, verification
+
+# Bot & Dispatcher Setup
+bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+dp = Dispatcher()
+
+# Register Routers
+dp.include_router(common.router)
+dp.include_router(verification.router)
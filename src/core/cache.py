@@ -0,0 +1,120 @@
+"""
+[LEGO BLOCK: CACHE]
+In-process read-through cache with TTL, LRU eviction and counters.
+
+Scope is one process: each uvicorn worker keeps its own copy, so entries must
+be safe to serve for up to `ttl` seconds after a change made elsewhere.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU map whose entries expire `ttl` seconds after being stored.
+
+    Usage:
+        cache = TTLCache(maxsize=256, ttl=30, name="feed")
+        value = await cache.get_or_load(key, lambda: load_from_db())
+        cache.invalidate()  # after a write
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0, name: str = "cache",
+                 clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Bumped on invalidation so in-flight loads never store stale results
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the cached value or `default` (counts a hit or a miss).
+        """
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Stores a value, evicting the least recently used entries when full.
+        """
+        if not self.enabled:
+            return
+        self._data[key] = (self._clock() + (ttl if ttl is not None else self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable):
+        """
+        Drops a single entry (no-op if absent).
+        """
+        if self._data.pop(key, _MISSING) is not _MISSING:
+            self.invalidations += 1
+        self._generation += 1
+
+    def invalidate(self):
+        """
+        Drops every entry. Call after writes that affect cached data.
+        """
+        self.invalidations += len(self._data)
+        self._data.clear()
+        self._generation += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Read-through helper: returns the cached value or awaits `loader()`
+        and caches its result, unless an invalidation happened meanwhile.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        generation = self._generation
+        value = await loader()
+        if generation == self._generation:
+            self.set(key, value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters for sizing the cache (exposed on the admin API).
+        """
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Literal, Optional
 
 class Settings(BaseSettings):
     """
@@ -8,18 +8,78 @@ class Settings(BaseSettings):
     """
     # [Start] Telegram Config
     BOT_TOKEN: str # The Telegram Bot API Token
+    INIT_DATA_MAX_AGE: int = 86400 # Reject Mini App initData whose auth_date is older than N seconds (0 = no limit)
     
     # [Start] Database Config
     DATABASE_URL: str = "sqlite+aiosqlite:///./database.db" # Connection string
     ADMIN_IDS: list[int] = [] # List of hardcoded system admins
+    DB_ECHO: bool = False # Log every SQL statement (expensive, debugging only)
+    DB_POOL_SIZE: int = 10 # Persistent connections kept in the pool
+    DB_MAX_OVERFLOW: int = 20 # Extra connections allowed under burst load
+    DB_POOL_TIMEOUT: int = 30 # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800 # Recycle connections older than N seconds
+    DB_POOL_PRE_PING: bool = True # Validate connections before checkout
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000 # SQLite: wait on locked DB instead of failing
+
+    DB_AUTO_MIGRATE: bool = True # Startup upgrades an outdated schema (false: refuse to start, run `python -m src.db.migrate`)
+
+    # [Start] Cache Config
+    FEED_CACHE_TTL: float = 30.0 # Seconds a marketplace feed page stays cached (0 = off)
+    FEED_CACHE_SIZE: int = 512 # Max cached feed pages (LRU eviction beyond this)
+    AUTH_CACHE_TTL: float = 300.0 # Seconds a validated initData string is trusted without re-hashing (0 = off)
+    AUTH_CACHE_SIZE: int = 4096 # Max cached initData strings (about one per active user)
+    IDENTITY_CACHE_TTL: float = 120.0 # Seconds a telegram_id -> user mapping stays cached (0 = off)
+    IDENTITY_CACHE_SIZE: int = 10000 # Max cached identities
+    ADMIN_STATS_CACHE_TTL: float = 30.0 # Seconds /admin/info counts are reused (0 = off)
+    ADMIN_STATS_EXACT_BELOW: int = 100000 # Postgres: tables estimated smaller than this are counted exactly
+
+    # [Start] Search Config
+    SEARCH_POPULARITY_WEIGHT: float = 0.1 # How much subscriber count boosts text relevance
     
     # [Start] TON Blockchain Config
     TON_WALLET_ADDRESS: Optional[str] = None # Hot Wallet for receiving payments
     WALLET_MNEMONIC: Optional[str] = None # 24-word mnemonic for signing payout transactions
+    WALLET_VERSION: str = "v4r2" # Payout wallet contract: v4r2 (4 payouts/message) or hv2 (highload v2, 254/message)
+    TONCENTER_URL: str = "https://testnet.toncenter.com/api/v2" # toncenter HTTP API base URL
+    TONCENTER_API_KEY: str = "" # Raises toncenter's rate limit (sent as X-API-Key)
+    TON_HTTP_POOL_SIZE: int = 20 # Max open connections in the shared session
+    TON_HTTP_LIMIT_PER_HOST: int = 10 # Max concurrent connections to toncenter
+    TON_HTTP_TIMEOUT: float = 15.0 # Total seconds per toncenter call
+    TON_HTTP_CONNECT_TIMEOUT: float = 5.0 # Seconds to establish a connection
     
     # [Start] Lifecycle Config
     WEBHOOK_URL: Optional[str] = None # For production deployment
     WEBHOOK_PATH: str = "/webhook"
+    PROCESS_ROLE: Literal["all", "api", "webhook", "worker"] = "all" # What this process runs (see src/core/roles.py); all = everything, dev default
+    
+    # [Start] Publishing Worker Config
+    PUBLISH_CONCURRENCY: int = 10 # Max deals published in parallel
+    PUBLISH_COMMIT_BATCH: int = 50 # Deals committed per transaction
+    TELEGRAM_GLOBAL_RATE: float = 25.0 # Bot-wide messages/sec (Telegram allows ~30)
+    TELEGRAM_PER_CHAT_INTERVAL: float = 3.0 # Min seconds between posts to one channel (~20/min)
+    PUBLISH_CLAIM_BATCH: int = 100 # Deals a worker claims per round
+    PUBLISH_LEASE_SECONDS: int = 300 # Claim lifetime; a crashed worker's deals are re-claimed after this
+    PUBLISH_LEASE_MARGIN_SECONDS: int = 30 # No new sends this close to lease expiry (time left to commit)
+    SCHEDULER_RECONCILE_SECONDS: int = 300 # Safety-net scan interval (publishing itself is event-driven)
+    SCHEDULER_DUE_POLL_SECONDS: int = 10 # Next-due lookup for deals scheduled by other processes (max publish delay)
+    PAYMENT_WATCHER_SECONDS: int = 15 # Hot-wallet scan interval for incoming payments
+    PAYMENT_WATCHER_PAGE_SIZE: int = 50 # Transactions per getTransactions page
+    PAYMENT_WATCHER_MAX_PAGES: int = 20 # Max pages per tick (bounds catch-up work)
+    PAYOUT_FLUSH_SECONDS: int = 5 # How often queued payouts are checked
+    PAYOUT_FLUSH_SIZE: int = 4 # Send as soon as this many payouts are queued
+    PAYOUT_MAX_DELAY_SECONDS: int = 30 # ...or once the oldest queued payout waited this long
+    PAYOUT_MESSAGES_PER_FLUSH: int = 4 # Highload wallet only; seqno wallets send one message per flush
+    PAYOUT_MAX_ATTEMPTS: int = 8 # Broadcast attempts before a payout is marked FAILED
+    PAYOUT_RETRY_BASE_SECONDS: int = 10 # Backoff after the 1st failure, doubled each time...
+    PAYOUT_RETRY_MAX_SECONDS: int = 600 # ...up to this
+    PAYOUT_CONFIRM_TIMEOUT_SECONDS: int = 180 # Unconfirmed SENT payouts are re-queued after this (message TTL is 60s)
+    PAYOUT_SWEEP_BATCH: int = 500 # PUBLISHED deals without a payout (owner linked a wallet late) queued per flush
+    RUN_EMBEDDED_WORKER: bool = True # PROCESS_ROLE=all: also run the scheduler (disable when using `python -m src.workers.worker`)
+    
+    # [Start] Analytics Config
+    ANALYTICS_ROLLUP_SECONDS: int = 60 # How often new deal events are folded into the rollups
+    ANALYTICS_ROLLUP_BATCH: int = 5000 # Events per rollup transaction
+    ANALYTICS_ROLLUP_LAG_SECONDS: int = 60 # Events younger than this wait: a lower id may still be uncommitted
     
     # [Start] Debug
     DEBUG: bool = True # [DEBUG MODE] Set to True to see all logs
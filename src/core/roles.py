@@ -0,0 +1,40 @@
+"""
+[PROCESS ROLES]: Which parts of the app a process runs (PROCESS_ROLE).
+
+    all      everything below in one process (dev default)
+    api      Mini App static files, REST and admin API
+    webhook  Telegram webhook ingress (aiogram dispatcher)
+    worker   scheduler jobs: publishing, payment watcher, payouts, rollups
+
+Every role serves GET /health. Each role scales on its own, e.g. N `api`
+replicas behind the load balancer, one `webhook`, M `worker`s, so a
+publishing burst or a slow payout never takes event-loop time from API
+requests. `python -m src.workers.worker` is the worker role without HTTP.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+from src.core.config import settings
+
+PROCESS_ROLES = ("all", "api", "webhook", "worker")
+
+
+@dataclass(frozen=True)
+class ProcessPlan:
+    role: str
+    api: bool # REST + admin routers, Mini App static files
+    webhook: bool # Webhook route, bot dispatcher, set/delete webhook
+    scheduler: bool # APScheduler jobs + TON gateway
+
+
+def process_plan(role: Optional[str] = None) -> ProcessPlan:
+    """
+    Raises:
+        ValueError: If the role is unknown.
+    """
+    role = role or settings.PROCESS_ROLE
+    if role not in PROCESS_ROLES:
+        raise ValueError(f"Unknown process role '{role}' (expected one of {', '.join(PROCESS_ROLES)})")
+    if role == "all":
+        return ProcessPlan(role, api=True, webhook=True, scheduler=settings.RUN_EMBEDDED_WORKER)
+    return ProcessPlan(role, api=role == "api", webhook=role == "webhook", scheduler=role == "worker")
@@ -0,0 +1,43 @@
+"""
+[STARTUP REPORT]: Where a process spends its boot time.
+
+    startup = StartupReport()        # as early as possible
+    ...imports...
+    startup.mark("imports")          # time since the previous mark
+    await init_db()
+    startup.mark("db")
+    startup.log()
+    # Startup ready in 912ms: imports 640ms | server 12ms | db 3ms | ...
+
+Only needs the logger, so it can be imported before anything heavy.
+"""
+import time
+from typing import List, Tuple
+
+from src.core.logger import app_logger
+
+
+class StartupReport:
+    def __init__(self, started: float = None):
+        self.started = started if started is not None else time.perf_counter()
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, name: str) -> float:
+        """Closes the phase `name` (time since the previous mark). Returns its ms."""
+        now = time.perf_counter()
+        elapsed = (now - self._last) * 1000
+        self._last = now
+        self.phases.append((name, elapsed))
+        return elapsed
+
+    @property
+    def total_ms(self) -> float:
+        return (self._last - self.started) * 1000
+
+    def summary(self) -> str:
+        phases = " | ".join(f"{name} {ms:.0f}ms" for name, ms in self.phases)
+        return f"Startup ready in {self.total_ms:.0f}ms: {phases}"
+
+    def log(self):
+        app_logger.info(self.summary())
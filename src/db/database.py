@@ -1,27 +1,84 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import sessionmaker
-from sqlmodel import SQLModel
 from src.core.config import settings
 
-# Create Async Engine
-# echo=True will log all SQL queries for debugging (solid debugging principle)
-engine = create_async_engine(settings.DATABASE_URL, echo=True, future=True)
+
+def _engine_options(database_url: str) -> dict:
+    """
+    [PERF]: Builds engine kwargs from Settings.
+    Pool sizing only applies to real pools; in-memory SQLite uses a
+    single static connection and rejects pool arguments.
+    """
+    url = make_url(database_url)
+    options = {
+        "echo": settings.DB_ECHO, # Off by default: echo formats every statement
+        "future": True,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            return options
+        # aiosqlite: seconds to wait on a locked database before raising
+        options["connect_args"] = {"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}
+
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    [PERF]: SQLite tuning applied once per new pooled connection.
+    WAL lets readers (API) run while the scheduler writes.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL") # Safe with WAL, avoids fsync per commit
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.close()
+
+
+def create_engine_from_settings(database_url: str = None):
+    """
+    Creates the Async Engine for the given URL (defaults to settings.DATABASE_URL).
+    """
+    database_url = database_url or settings.DATABASE_URL
+    new_engine = create_async_engine(database_url, **_engine_options(database_url))
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
+
+# Create Async Engine (one per process, shared by API, Bot and Scheduler)
+engine = create_engine_from_settings()
+
+# [PERF]: Session factory built once at import, not on every request
+async_session_maker = sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
 
 async def init_db():
     """
-    Creates the database tables based on SQLModel definitions.
-    Should be run on startup.
+    [STARTUP]: Checks the schema revision (one SELECT).
+    Tables are created and changed by migrations (`python -m src.db.migrate`);
+    with DB_AUTO_MIGRATE an outdated database is migrated here instead.
     """
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+    from src.db.migrate import check_schema
+
+    await check_schema(engine)
 
 async def get_session() -> AsyncSession:
     """
     Dependency for FastAPI/Bot to get a DB session.
+    FastAPI caches the dependency, so one session is reused per request.
     """
-    async_session = sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
-    )
-    async with async_session() as session:
+    async with async_session_maker() as session:
         yield session
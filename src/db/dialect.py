@@ -0,0 +1,54 @@
+"""
+[LEGO BLOCK: DIALECT]
+Dialect-aware INSERT ... ON CONFLICT helpers for Postgres and SQLite.
+
+Both dialects share the same `on_conflict_do_*` + `RETURNING` API, so a
+get-or-create becomes ONE statement instead of SELECT -> INSERT -> refresh
+with an IntegrityError/rollback/re-SELECT fallback.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+UpdateSpec = Union[Dict[str, Any], Callable[[Any], Dict[str, Any]]]
+
+
+def dialect_insert(session, model):
+    """
+    `INSERT` construct for the session's dialect (supports ON CONFLICT).
+
+    Raises:
+        NotImplementedError: For dialects without ON CONFLICT support.
+    """
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"ON CONFLICT inserts are not supported on '{dialect}'")
+
+
+def upsert(session, model, values: Union[Dict[str, Any], List[Dict[str, Any]], None],
+           conflict: Iterable[str], update: Optional[UpdateSpec] = None):
+    """
+    INSERT `values` (one row, a list for a multi-row insert, or None to pass
+    the rows to `session.execute(statement, rows)` as an executemany), resolving unique conflicts on the `conflict` columns:
+    - `update=None`: DO NOTHING. RETURNING yields no row if it already existed.
+    - `update={...}` or `update=lambda excluded: {...}`: DO UPDATE SET those
+      columns (`excluded` = the row we tried to insert).
+    - `update={}`: DO UPDATE that rewrites the key to itself, i.e. no visible
+      change, so RETURNING always yields the row (new or existing).
+    """
+    statement = dialect_insert(session, model)
+    if isinstance(values, list):
+        statement = statement.values(values)
+    elif values is not None:
+        statement = statement.values(**values)
+    conflict = list(conflict)
+    if update is None:
+        return statement.on_conflict_do_nothing(index_elements=conflict)
+    if callable(update):
+        update = update(statement.excluded)
+    if not update:
+        update = {name: statement.excluded[name] for name in conflict}
+    return statement.on_conflict_do_update(index_elements=conflict, set_=update)
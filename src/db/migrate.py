@@ -0,0 +1,200 @@
+"""
+[LEGO BLOCK: MIGRATIONS]
+Versioned schema migrations (Alembic; scripts in src/db/migrations/versions).
+
+    python -m src.db.migrate             # Upgrade to the latest revision (release step)
+    python -m src.db.migrate current     # Print the database revision
+
+App startup only runs `check_schema`: one SELECT on `alembic_version`,
+compared with SCHEMA_HEAD. No catalog introspection, no DDL. With
+DB_AUTO_MIGRATE (the default, for single-instance and dev setups) an
+outdated database is upgraded in place; autoscaled replicas set it to
+false so they fail fast and leave migrating to the release step.
+
+Adding a revision:
+
+    alembic revision --autogenerate -m "what changed"
+
+then bump SCHEMA_HEAD (tests/test_migrations.py fails until they agree).
+Indexes on big tables go through `create_index_online` (CONCURRENTLY on
+Postgres, so writes keep flowing while it builds).
+"""
+import argparse
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.core.config import settings
+from src.core.logger import app_logger
+
+# Revision this code expects (the newest file in migrations/versions)
+SCHEMA_HEAD = "0005"
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+# Arbitrary key: one migrating process at a time across replicas (Postgres)
+MIGRATION_LOCK_ID = 72_410_023
+
+# Full-text search structures are created by the migrations but are not
+# models: keep autogenerate from proposing to drop them
+_UNMANAGED_INDEXES = ("ix_channel_search_tsv", "ix_channel_search_trgm")
+
+
+def include_object(obj, name, type_, reflected, compare_to) -> bool:
+    if type_ == "table" and name.startswith("channel_fts"):
+        return False
+    if type_ == "index" and name in _UNMANAGED_INDEXES:
+        return False
+    return True
+
+
+def alembic_config(connection=None):
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def create_index_online(name: str, table: str, columns, **kwargs):
+    """
+    Migration helper: builds an index without blocking writes.
+    - Postgres: CREATE INDEX CONCURRENTLY, outside the migration transaction
+      (Postgres refuses it inside one). IF NOT EXISTS makes a retry after an
+      interrupted build safe.
+    - SQLite: a plain CREATE INDEX (the whole file is locked anyway).
+    """
+    from alembic import op
+
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kwargs)
+    else:
+        op.create_index(name, table, columns, if_not_exists=True, **kwargs)
+
+
+def add_columns_if_missing(table: str, *columns):
+    """
+    Migration helper: adds the columns `table` does not have yet. Tables
+    created by create_all (or by the baseline for a newer model) may already
+    carry them. Nullable columns without a default are catalog-only changes.
+    """
+    from alembic import op
+    import sqlalchemy as sa
+
+    existing = {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+    for column in columns:
+        if column.name not in existing:
+            op.add_column(table, column)
+
+
+def _default_engine(engine):
+    if engine is not None:
+        return engine
+    from src.db.database import engine as app_engine
+    return app_engine
+
+
+async def current_revision(engine=None) -> Optional[str]:
+    """The database's schema revision (None: never migrated)."""
+    async with _default_engine(engine).connect() as conn:
+        try:
+            return (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+        except DBAPIError:
+            # No alembic_version table: empty, or created by create_all before migrations
+            return None
+
+
+def _upgrade(sync_conn, revision: str):
+    from alembic import command
+
+    command.upgrade(alembic_config(sync_conn), revision)
+
+
+@asynccontextmanager
+async def migration_lock(engine):
+    """
+    Postgres: holds a session-level advisory lock so one replica migrates at
+    a time. The lock lives on its OWN autocommit connection: taken on the
+    migrating connection it would open a transaction before Alembic starts,
+    and `autocommit_block` (CREATE INDEX CONCURRENTLY) cannot leave it.
+    SQLite: no-op (writers are serialized by the file lock).
+    """
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.exec_driver_sql(f"SELECT pg_advisory_lock({MIGRATION_LOCK_ID})")
+        try:
+            yield
+        finally:
+            await conn.exec_driver_sql(f"SELECT pg_advisory_unlock({MIGRATION_LOCK_ID})")
+
+
+async def migrate(engine=None, revision: str = "head"):
+    """
+    Upgrades the schema to `revision`, then runs the one-off data backfills.
+    Safe to re-run: a database already at `revision` is left untouched.
+    """
+    from src.services.events import backfill_projections
+
+    engine = _default_engine(engine)
+    before = await current_revision(engine)
+    async with migration_lock(engine), engine.connect() as conn:
+        await conn.run_sync(_upgrade, revision)
+        await conn.commit()
+    after = await current_revision(engine)
+    if before != after:
+        app_logger.info(f"Database schema: {before or 'empty'} -> {after}")
+
+    # Seeds the deal event log for deals that predate it (no-op afterwards)
+    async with sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        await backfill_projections(session)
+
+
+async def check_schema(engine=None):
+    """
+    [STARTUP]: Cheap schema-version check.
+
+    Raises:
+        RuntimeError: If the database is outdated and DB_AUTO_MIGRATE is off.
+    """
+    current = await current_revision(engine)
+    if current == SCHEMA_HEAD:
+        return
+    if not settings.DB_AUTO_MIGRATE:
+        raise RuntimeError(
+            f"Database schema is at {current or 'no revision'}, this code expects {SCHEMA_HEAD}. "
+            "Run `python -m src.db.migrate` first."
+        )
+    app_logger.warning(f"Database schema at {current or 'no revision'}: migrating to {SCHEMA_HEAD}")
+    await migrate(engine)
+
+
+async def main(args):
+    from src.db.database import engine
+
+    try:
+        if args.command == "current":
+            print(await current_revision(engine) or "none")
+        else:
+            await migrate(engine, args.revision)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    from src.core.logger import setup_logging
+
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Database schema migrations")
+    parser.add_argument("command", nargs="?", choices=("upgrade", "current"), default="upgrade")
+    parser.add_argument("revision", nargs="?", default="head")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,51 @@
+"""
+[MIGRATIONS]: Alembic environment.
+
+Run through `python -m src.db.migrate` (which hands over its connection in
+`config.attributes["connection"]`), or with the plain `alembic` CLI for
+authoring revisions:
+
+    alembic revision --autogenerate -m "add foo"
+"""
+import asyncio
+
+from alembic import context
+from sqlmodel import SQLModel
+
+import src.db.models  # noqa: F401  (registers every table on SQLModel.metadata)
+from src.db.migrate import include_object
+
+target_metadata = SQLModel.metadata
+
+
+def run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        # SQLite can't ALTER most things: rebuild the table instead
+        render_as_batch=connection.dialect.name == "sqlite",
+        compare_type=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_with_engine():
+    from src.db.database import create_engine_from_settings
+
+    engine = create_engine_from_settings()
+    async with engine.connect() as connection:
+        await connection.run_sync(run_migrations)
+        await connection.commit()
+    await engine.dispose()
+
+
+if context.is_offline_mode():
+    raise SystemExit("Offline (--sql) migrations are not supported")
+
+connection = context.config.attributes.get("connection")
+if connection is None:
+    asyncio.run(run_with_engine())
+else:
+    run_migrations(connection)
@@ -0,0 +1,229 @@
+"""baseline
+
+The schema as `SQLModel.metadata.create_all` built it before migrations
+existed, plus the full-text search structures. Every step is skipped when
+its object already exists, so databases created by create_all are adopted
+as they are (the big `deal` indexes follow in 0002, built online).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 23:31:50.678402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+from src.services.search import create_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _enum(name, *values):
+    # Postgres: one shared type per enum, created once up front (several tables use dealstatus)
+    return postgresql.ENUM(*values, name=name, create_type=False)
+
+
+DEAL_STATUS = _enum(
+    'dealstatus', 'CREATED', 'ACCEPTED', 'DRAFT_SUBMITTED', 'REVISION_REQUESTED', 'AWAITING_PAYMENT',
+    'LOCKED', 'SCHEDULED', 'PUBLISHED', 'COMPLETED', 'CANCELLED', 'REJECTED',
+)
+USER_ROLE = _enum('userrole', 'ADVERTISER', 'OWNER', 'ADMIN')
+PAYOUT_STATUS = _enum('payoutstatus', 'QUEUED', 'SENT', 'CONFIRMED', 'FAILED')
+ROLLUP_GRANULARITY = _enum('rollupgranularity', 'HOUR', 'DAY', 'TOTAL')
+ROLLUP_SCOPE = _enum('rollupscope', 'PLATFORM', 'CHANNEL', 'ADVERTISER')
+ENUMS = (DEAL_STATUS, USER_ROLE, PAYOUT_STATUS, ROLLUP_GRANULARITY, ROLLUP_SCOPE)
+
+
+def _create_table(existing, name, *columns):
+    if name not in existing:
+        op.create_table(name, *columns)
+
+
+def _create_indexes(table, *indexes):
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+    for name, columns, unique in indexes:
+        if name not in existing:
+            op.create_index(name, table, columns, unique=unique)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    existing = set(sa.inspect(bind).get_table_names())
+    if bind.dialect.name == 'postgresql':
+        for enum in ENUMS:
+            enum.create(bind, checkfirst=True)
+
+    _create_table(existing, 'dealrollup',
+        sa.Column('granularity', ROLLUP_GRANULARITY, nullable=False),
+        sa.Column('scope', ROLLUP_SCOPE, nullable=False),
+        sa.Column('period_start', sa.DateTime(), nullable=False),
+        sa.Column('scope_id', sa.Integer(), nullable=False),
+        sa.Column('created', sa.Integer(), nullable=False),
+        sa.Column('completed', sa.Integer(), nullable=False),
+        sa.Column('cancelled', sa.Integer(), nullable=False),
+        sa.Column('volume_ton', sa.Float(), nullable=False),
+        sa.Column('completion_seconds', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('granularity', 'scope', 'period_start', 'scope_id'),
+    )
+    _create_table(existing, 'dealstatuscount',
+        sa.Column('status', DEAL_STATUS, nullable=False),
+        sa.Column('deals', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('status'),
+    )
+    _create_table(existing, 'rollupcursor',
+        sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('last_event_id', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    _create_table(existing, 'statusduration',
+        sa.Column('status', DEAL_STATUS, nullable=False),
+        sa.Column('exits', sa.Integer(), nullable=False),
+        sa.Column('total_seconds', sa.Float(), nullable=False),
+        sa.Column('max_seconds', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('status'),
+    )
+    _create_table(existing, 'user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+        sa.Column('username', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('wallet_address', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('role', USER_ROLE, nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    _create_table(existing, 'walletcursor',
+        sa.Column('address', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('last_lt', sa.BigInteger(), nullable=False),
+        sa.Column('last_hash', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('address'),
+    )
+    _create_table(existing, 'channel',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('channel_id', sa.BigInteger(), nullable=False),
+        sa.Column('title', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('username', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('subscribers', sa.Integer(), nullable=False),
+        sa.Column('avg_views', sa.Integer(), nullable=False),
+        sa.Column('language', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('premium_ratio', sa.Float(), nullable=False),
+        sa.Column('price_post', sa.Float(), nullable=False),
+        sa.Column('verified', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    _create_table(existing, 'channeldealstats',
+        sa.Column('channel_id', sa.Integer(), nullable=False),
+        sa.Column('deals_total', sa.Integer(), nullable=False),
+        sa.Column('deals_completed', sa.Integer(), nullable=False),
+        sa.Column('volume_ton', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['channel_id'], ['channel.id']),
+        sa.PrimaryKeyConstraint('channel_id'),
+    )
+    _create_table(existing, 'channelmanager',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('channel_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['channel_id'], ['channel.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id', 'channel_id'),
+    )
+    _create_table(existing, 'deal',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('advertiser_id', sa.Integer(), nullable=False),
+        sa.Column('channel_id', sa.Integer(), nullable=False),
+        sa.Column('status', DEAL_STATUS, nullable=False),
+        sa.Column('amount_ton', sa.Float(), nullable=False),
+        sa.Column('ad_brief', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('ad_draft', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('rejection_reason', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('scheduled_at', sa.DateTime(), nullable=True),
+        sa.Column('published_at', sa.DateTime(), nullable=True),
+        sa.Column('escrow_wallet', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('payment_tx_hash', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('proof_link', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('claimed_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['advertiser_id'], ['user.id']),
+        sa.ForeignKeyConstraint(['channel_id'], ['channel.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('payment_tx_hash'),
+    )
+    _create_table(existing, 'dealevent',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('deal_id', sa.Integer(), nullable=False),
+        sa.Column('from_status', DEAL_STATUS, nullable=True),
+        sa.Column('to_status', DEAL_STATUS, nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['deal_id'], ['deal.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    _create_table(existing, 'payout',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('deal_id', sa.Integer(), nullable=False),
+        sa.Column('destination', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('amount_ton', sa.Float(), nullable=False),
+        sa.Column('memo', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('status', PAYOUT_STATUS, nullable=False),
+        sa.Column('batch_ref', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('tx_hash', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.Column('confirmed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['deal_id'], ['deal.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('deal_id'),
+    )
+
+    _create_indexes('dealrollup', ('ix_dealrollup_leaders', ['granularity', 'scope', 'volume_ton'], False))
+    _create_indexes('user',
+        ('ix_user_telegram_id', ['telegram_id'], True),
+        ('ix_user_wallet_address', ['wallet_address'], False),
+    )
+    _create_indexes('channel',
+        ('ix_channel_channel_id', ['channel_id'], True),
+        ('ix_channel_feed', ['verified', 'subscribers', 'id'], False),
+        ('ix_channel_feed_language', ['verified', 'language', 'subscribers', 'id'], False),
+        ('ix_channel_owner_id', ['owner_id'], False),
+    )
+    _create_indexes('deal',
+        ('ix_deal_advertiser_id', ['advertiser_id'], False),
+        ('ix_deal_channel_id', ['channel_id'], False),
+    )
+    _create_indexes('dealevent', ('ix_deal_event_deal', ['deal_id', 'id'], False))
+    _create_indexes('payout',
+        ('ix_payout_batch_ref', ['batch_ref'], False),
+        ('ix_payout_status', ['status'], False),
+    )
+
+    create_search_index(bind)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS channel_fts')
+    for table in (
+        'payout', 'dealevent', 'deal', 'channelmanager', 'channeldealstats', 'channel',
+        'walletcursor', 'user', 'statusduration', 'rollupcursor', 'dealstatuscount', 'dealrollup',
+    ):
+        op.drop_table(table)
+    if bind.dialect.name == 'postgresql':
+        for enum in ENUMS:
+            enum.drop(bind, checkfirst=True)
@@ -0,0 +1,35 @@
+"""deal hot-query indexes
+
+Composite indexes for the scheduler due scan and the "My Deals" keyset
+pages. `deal` is the biggest table, so they are built online
+(CREATE INDEX CONCURRENTLY on Postgres).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 23:45:12.104233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from src.db.migrate import create_index_online
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_index_online('ix_deal_advertiser_recent', 'deal', ['advertiser_id', 'updated_at', 'id'])
+    create_index_online('ix_deal_channel_recent', 'deal', ['channel_id', 'updated_at', 'id'])
+    create_index_online('ix_deal_due', 'deal', ['status', 'scheduled_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_deal_due', table_name='deal')
+    op.drop_index('ix_deal_channel_recent', table_name='deal')
+    op.drop_index('ix_deal_advertiser_recent', table_name='deal')
@@ -0,0 +1,37 @@
+"""deal lease columns on pre-migration databases
+
+The baseline only creates missing tables, so a database built by
+create_all from the original models keeps its old `deal` table without
+the publish lease columns. Adds every column introduced on an existing
+table since then; each one is skipped when it is already there.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:12:40.518306
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+
+from src.db.migrate import add_columns_if_missing
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    add_columns_if_missing('deal',
+        sa.Column('claimed_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    # The baseline's `deal` already has these columns: nothing to undo
+    pass
@@ -0,0 +1,40 @@
+"""walletcursor scan resume point
+
+The payment watcher only advances `last_lt` once a scan reaches it; a
+backlog deeper than PAYMENT_WATCHER_MAX_PAGES is finished over several
+ticks from the stored resume point.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:41:09.227514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+from src.db.migrate import add_columns_if_missing
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    add_columns_if_missing('walletcursor',
+        sa.Column('scan_lt', sa.BigInteger(), nullable=True),
+        sa.Column('scan_hash', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('scan_top_lt', sa.BigInteger(), nullable=True),
+        sa.Column('scan_top_hash', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('walletcursor') as batch:
+        for name in ('scan_top_hash', 'scan_top_lt', 'scan_hash', 'scan_lt'):
+            batch.drop_column(name)
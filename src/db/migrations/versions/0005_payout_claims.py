@@ -0,0 +1,40 @@
+"""payout claims
+
+Aggregators claim queued payouts (status SENDING, `claimed_by`) before
+broadcasting them, so two workers never send the same payout.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 01:02:18.640917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+from src.db.migrate import add_columns_if_missing
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # ADD VALUE can't run inside a transaction block before Postgres 12
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE payoutstatus ADD VALUE IF NOT EXISTS 'SENDING' AFTER 'QUEUED'")
+    add_columns_if_missing('payout',
+        sa.Column('claimed_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    # Postgres can't drop an enum value: SENDING stays in the type, unused
+    with op.batch_alter_table('payout') as batch:
+        batch.drop_column('claimed_by')
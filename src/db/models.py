@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import Optional, List
 from enum import Enum
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship, Column, BigInteger
 
 # --- Enums for State Machines (Logic Flow Control) ---
@@ -30,6 +31,16 @@ class UserRole(str, Enum):
     OWNER = "owner"           # Can clean/list channels
     ADMIN = "admin"           # System Admin
 
+class PayoutStatus(str, Enum):
+    """
+    Lifecycle of an owner payout (see `src.workers.payouts`).
+    """
+    QUEUED = "queued"       # Owed, waiting for the next batch (or a retry)
+    SENDING = "sending"     # Claimed by one aggregator, broadcast in progress
+    SENT = "sent"           # Included in a broadcast wallet message
+    CONFIRMED = "confirmed" # Seen in the hot wallet's outgoing transactions
+    FAILED = "failed"       # Gave up (invalid destination / out of attempts)
+
 # --- Models ---
 
 class User(SQLModel, table=True):
@@ -52,6 +63,13 @@ class Channel(SQLModel, table=True):
     Represents a Telegram Channel listed on the marketplace.
     Includes verified metrics.
     """
+    __table_args__ = (
+        # [PERF] Keyset feed: WHERE verified ORDER BY subscribers DESC, id DESC
+        Index("ix_channel_feed", "verified", "subscribers", "id"),
+        # [PERF] Same feed filtered by language
+        Index("ix_channel_feed_language", "verified", "language", "subscribers", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     channel_id: int = Field(sa_column=Column(BigInteger, index=True, unique=True, nullable=False))
     title: str
@@ -95,6 +113,15 @@ class Deal(SQLModel, table=True):
     Represents an Escrow Deal between an Advertiser and a Channel.
     Tracks the lifecycle from Draft to Completion.
     """
+    __table_args__ = (
+        # [PERF] "My Deals" keyset pages, one index per UNION branch (see src/services/deals.py)
+        Index("ix_deal_advertiser_recent", "advertiser_id", "updated_at", "id"),
+        Index("ix_deal_channel_recent", "channel_id", "updated_at", "id"),
+        # [PERF] Scheduler claim/due scan: status = SCHEDULED AND scheduled_at <= now ORDER BY scheduled_at, id
+        # (also serves the payment watcher's status IN (...) lookup)
+        Index("ix_deal_due", "status", "scheduled_at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     
     # Relationships
@@ -123,6 +150,138 @@ class Deal(SQLModel, table=True):
     # Verification
     proof_link: Optional[str] = None # Link to the posted message
     
+    # Publishing lease (multi-worker safety): who is posting it and until when
+    claimed_by: Optional[str] = Field(default=None, description="Worker ID holding the publish lease")
+    lease_expires_at: Optional[datetime] = Field(default=None, description="Lease expiry; expired leases can be re-claimed")
+    
+    # timestamps
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class WalletCursor(SQLModel, table=True):
+    """
+    Last transaction processed per watched wallet.
+    Lets the payment watcher resume incrementally instead of rescanning.
+    """
+    address: str = Field(primary_key=True)
+    last_lt: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, default=0))
+    last_hash: Optional[str] = Field(default=None)
+    # Unfinished scan (backlog over PAYMENT_WATCHER_MAX_PAGES): next tick pages on
+    # from scan_lt/hash; once it reaches last_lt, scan_top_* becomes last_*
+    scan_lt: Optional[int] = Field(default=None, sa_column=Column(BigInteger, nullable=True))
+    scan_hash: Optional[str] = Field(default=None)
+    scan_top_lt: Optional[int] = Field(default=None, sa_column=Column(BigInteger, nullable=True))
+    scan_top_hash: Optional[str] = Field(default=None)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class Payout(SQLModel, table=True):
+    """
+    Owner payout for a published deal (one per deal): the payout ledger.
+    Queued by the publisher (outbox row), sent in multi-output batches by the
+    aggregator, confirmed by the payment watcher from on-chain data.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    deal_id: int = Field(foreign_key="deal.id", unique=True) # One payout per deal, ever
+    destination: str = Field(description="Owner TON wallet")
+    amount_ton: float = Field(default=0.0)
+    memo: str = Field(default="")
+    status: PayoutStatus = Field(default=PayoutStatus.QUEUED, index=True) # [PERF] Aggregator scans QUEUED
+    batch_ref: Optional[str] = Field(default=None, index=True, description="Wallet message that carried it (seqno:N / query:ID)")
+    claimed_by: Optional[str] = Field(default=None, description="Worker ID of the aggregator that claimed it for sending")
+    tx_hash: Optional[str] = Field(default=None, description="Outgoing wallet transaction (set on confirmation)")
+    
+    # Outbox retries
+    attempts: int = Field(default=0)
+    next_attempt_at: Optional[datetime] = Field(default=None, description="Backoff: not retried before this")
+    last_error: Optional[str] = None
+    
     # timestamps
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = None
+    confirmed_at: Optional[datetime] = None
+
+# --- Event Log & Projections ---
+
+class DealEvent(SQLModel, table=True):
+    """
+    Append-only history of deal status changes (never updated or deleted).
+    Written in the same transaction as the change itself.
+    """
+    __table_args__ = (
+        # [PERF] Latest event of a deal: WHERE deal_id = ? ORDER BY id DESC
+        Index("ix_deal_event_deal", "deal_id", "id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    deal_id: int = Field(foreign_key="deal.id")
+    from_status: Optional[DealStatus] = Field(default=None, description="None for creation/backfill")
+    to_status: DealStatus
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class DealStatusCount(SQLModel, table=True):
+    """
+    [PROJECTION]: Number of deals currently in each status.
+    """
+    status: DealStatus = Field(primary_key=True)
+    deals: int = Field(default=0)
+
+class ChannelDealStats(SQLModel, table=True):
+    """
+    [PROJECTION]: Deal volume per channel.
+    """
+    channel_id: int = Field(foreign_key="channel.id", primary_key=True)
+    deals_total: int = Field(default=0)
+    deals_completed: int = Field(default=0)
+    volume_ton: float = Field(default=0.0, description="Sum of completed deal amounts")
+
+class StatusDuration(SQLModel, table=True):
+    """
+    [PROJECTION]: Time spent in each status, over all deals that left it.
+    Average = total_seconds / exits.
+    """
+    status: DealStatus = Field(primary_key=True)
+    exits: int = Field(default=0)
+    total_seconds: float = Field(default=0.0)
+    max_seconds: float = Field(default=0.0)
+
+# --- Analytics Rollups ---
+
+class RollupGranularity(str, Enum):
+    HOUR = "hour"
+    DAY = "day"
+    TOTAL = "total" # All time; period_start = ROLLUP_EPOCH
+
+class RollupScope(str, Enum):
+    PLATFORM = "platform"     # scope_id = 0
+    CHANNEL = "channel"       # scope_id = channel.id
+    ADVERTISER = "advertiser" # scope_id = user.id
+
+class DealRollup(SQLModel, table=True):
+    """
+    [ROLLUP]: Deal activity per period and scope, aggregated from `DealEvent`
+    by the rollup job. Hourly rows exist for the platform scope only.
+    """
+    __table_args__ = (
+        # [PERF] All-time leaderboards: top channels/advertisers by volume
+        Index("ix_dealrollup_leaders", "granularity", "scope", "volume_ton"),
+    )
+
+    # [PERF] Key order = lookup order: (granularity, scope) + period range
+    granularity: RollupGranularity = Field(primary_key=True)
+    scope: RollupScope = Field(primary_key=True)
+    period_start: datetime = Field(primary_key=True)
+    scope_id: int = Field(default=0, primary_key=True)
+    
+    created: int = Field(default=0)
+    completed: int = Field(default=0)
+    cancelled: int = Field(default=0, description="Rejected or cancelled")
+    volume_ton: float = Field(default=0.0, description="Completed deal amounts")
+    completion_seconds: float = Field(default=0.0, description="Sum of created -> completed durations")
+
+class RollupCursor(SQLModel, table=True):
+    """
+    Last `DealEvent.id` folded into the rollups (per job).
+    """
+    name: str = Field(primary_key=True)
+    last_event_id: int = Field(default=0)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
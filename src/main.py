@@ -1,19 +1,19 @@
+# [STARTUP]: Timed from the first line: import time dominates replica cold start
+from src.core.startup import StartupReport
+startup = StartupReport()
+
 import sys
 import os
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from typing import Optional
+from fastapi import APIRouter, FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from aiogram import Bot, Dispatcher, types
-from aiogram.enums import ParseMode
-from aiogram.client.default import DefaultBotProperties
 
 from src.core.config import settings
+from src.core.roles import ProcessPlan, process_plan
 from src.db.database import init_db
-from src.bot.handlers import common, verification
-from src.api import routes
-from src.api.admin import admin_router
 
 from loguru import logger
 from src.core.logger import setup_logging
@@ -23,48 +23,64 @@ import time
 # Logging Setup
 setup_logging()
 
-# Bot & Dispatcher Setup
-bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-dp = Dispatcher()
-
-# Register Routers
-dp.include_router(common.router)
-dp.include_router(verification.router)
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     [LIFESPAN]: El Ciclo de Vida del Organismo (Bot).
     Builds connections, starts the heart (scheduler), and hooks into the Matrix (Telegram).
+    Only the parts of this process's role (`app.state.plan`) are started.
     """
+    plan: ProcessPlan = app.state.plan
+    startup.mark("server")
+
     # 1. [DB]: Conexión Sináptica con PostgreSQL
     await init_db()
+    startup.mark("db")
     
     # 2. [HEARTBEAT]: Start Scheduler (El Reloj Biológico)
     # Controla tareas diferidas como "Check Scheduled Posts"
-    from src.workers.scheduler import start_scheduler
-    start_scheduler()
+    # Roles `all` (with RUN_EMBEDDED_WORKER) and `worker`; see also `python -m src.workers.worker`
+    if plan.scheduler:
+        # [TON]: Shared toncenter connection pool (keep-alive, DNS cache) for the payment/payout jobs
+        from src.services.ton import get_ton_gateway
+        await get_ton_gateway().start()
+        startup.mark("ton")
+
+        from src.workers.scheduler import start_scheduler
+        start_scheduler()
+        startup.mark("scheduler")
     
-    # 3. [WEBHOOK]: Hook into the Matrix
-    logger.info("Starting TG-ADMC Bot...")
-    if settings.WEBHOOK_URL and "example.com" not in settings.WEBHOOK_URL:
-        # [PROD MODE]: Usamos Webhook para alta concurrencia.
-        # Evita "terminated by other getUpdates" conflict.
-        webhook_url = f"{settings.WEBHOOK_URL}{settings.WEBHOOK_PATH}"
-        logger.info(f"Setting webhook to: {webhook_url}")
-        await bot.set_webhook(webhook_url)
-    else:
-        # [DEV MODE]: Polling para pruebas locales sin túnel.
-        logger.info("Webhook URL not set. Polling mode recommended for local dev.")
+    # 3. [WEBHOOK]: Hook into the Matrix (roles `all` and `webhook`)
+    if plan.webhook:
+        # aiogram is by far the slowest import (pydantic models for the whole Bot API):
+        # loaded here, where the report shows it, not at module import
+        from src.bot.instance import bot
+        startup.mark("bot")
+        logger.info("Starting TG-ADMC Bot...")
+        if settings.WEBHOOK_URL and "example.com" not in settings.WEBHOOK_URL:
+            # [PROD MODE]: Usamos Webhook para alta concurrencia.
+            # Evita "terminated by other getUpdates" conflict.
+            webhook_url = f"{settings.WEBHOOK_URL}{settings.WEBHOOK_PATH}"
+            logger.info(f"Setting webhook to: {webhook_url}")
+            await bot.set_webhook(webhook_url)
+            startup.mark("webhook")
+        else:
+            # [DEV MODE]: Polling para pruebas locales sin túnel.
+            logger.info("Webhook URL not set. Polling mode recommended for local dev.")
+    logger.info(f"Process role: {plan.role}")
+    startup.log()
     
     yield
     
     # [SHUTDOWN]: Hibernación Controlada
     logger.info("Shutting down...")
-    await bot.delete_webhook()
-    await bot.session.close()
-
-app = FastAPI(lifespan=lifespan)
+    if plan.scheduler:
+        from src.workers.scheduler import stop_scheduler
+        stop_scheduler()
+        await get_ton_gateway().close()
+    if plan.webhook:
+        await bot.delete_webhook()
+        await bot.session.close()
 
 class RequestLogMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request, call_next):
@@ -82,33 +98,68 @@ class RequestLogMiddleware(BaseHTTPMiddleware):
         )
         return response
 
-app.add_middleware(RequestLogMiddleware)
-app.include_router(routes.router)
-app.include_router(admin_router)  # [DEMO] Admin endpoints
-
-# Mount Static Files
-os.makedirs("src/static", exist_ok=True) # Ensure dir exists
-app.mount("/static", StaticFiles(directory="src/static"), name="static")
+# [API ROLE]: Mini App frontend
+webapp_router = APIRouter(tags=["Mini App"])
 
-@app.get("/app")
+@webapp_router.get("/app")
 async def serve_webapp():
     """
     Serves the Mini App Frontend.
     """
     return FileResponse("src/static/index.html")
 
-@app.post(settings.WEBHOOK_PATH)
-async def bot_webhook(update: dict):
-    telegram_update = types.Update(**update)
-    await dp.feed_update(bot, telegram_update)
-
-@app.get("/")
+@webapp_router.get("/")
 async def root():
     """
     [UX]: Serve the Mini App immediately at root.
     """
     return FileResponse("src/static/index.html")
 
-@app.get("/health")
+# [WEBHOOK ROLE]: Telegram updates ingress
+webhook_router = APIRouter(tags=["Telegram"])
+
+@webhook_router.post(settings.WEBHOOK_PATH)
+async def bot_webhook(update: dict):
+    from aiogram import types
+    from src.bot.instance import bot, dp
+
+    telegram_update = types.Update(**update)
+    await dp.feed_update(bot, telegram_update)
+
+# [EVERY ROLE]: Liveness probe
+health_router = APIRouter(tags=["Health"])
+
+@health_router.get("/health")
 async def health_check():
     return {"status": "ok", "service": "Telegram Ads Marketplace MVP"}
+
+def create_app(plan: Optional[ProcessPlan] = None) -> FastAPI:
+    """
+    [APP FACTORY]: The ASGI app for one process role (default: PROCESS_ROLE).
+    """
+    plan = plan or process_plan()
+    app = FastAPI(lifespan=lifespan)
+    app.state.plan = plan
+    app.add_middleware(RequestLogMiddleware)
+
+    if plan.api:
+        from src.api import routes
+        from src.api.admin import admin_router
+
+        app.include_router(routes.router)
+        app.include_router(admin_router)  # [DEMO] Admin endpoints
+
+        # Mount Static Files
+        os.makedirs("src/static", exist_ok=True) # Ensure dir exists
+        app.mount("/static", StaticFiles(directory="src/static"), name="static")
+        app.include_router(webapp_router)
+
+    if plan.webhook:
+        app.include_router(webhook_router)
+
+    app.include_router(health_router)
+    return app
+
+app = create_app()
+
+startup.mark("imports")
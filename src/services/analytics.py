@@ -1,29 +1,223 @@
 """
-[FUTURE MODULE]: Analytics Service
-==================================
-This service should aggregate data for the Admin Dashboard.
-
-Suggested Metrics to Track:
----------------------------
-1. Total Volume (TON) processed.
-2. Active Deals vs. Cancelled Deals.
-3. Average Deal Completion Time.
-
-Implementation Guide:
----------------------
+[LEGO BLOCK: ANALYTICS]
+Platform and per-channel / per-advertiser performance for the Admin Dashboard.
+
+Reads only precomputed data, never aggregates `deal` per request:
+- `DealRollup` (hourly/daily rows maintained by `src.workers.rollups`) for
+  volume, completions, cancellations and completion time over a window;
+- `DealStatusCount` (event-log projection) for the current active/cancelled split.
+Figures lag the live tables by at most one rollup run (ANALYTICS_ROLLUP_SECONDS).
+
+System counts (`/admin/info`) come from ONE round trip, cached per process:
+users/channels are counted exactly on SQLite and estimated from
+`pg_class.reltuples` on large Postgres tables; deals come from the
+`DealStatusCount` projection, which also gives the per-status breakdown.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import Integer, case, desc, false, func, literal, literal_column, null, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from src.db.models import (
+    Channel, DealRollup, DealStatus, DealStatusCount, RollupCursor, RollupGranularity, RollupScope, User,
+)
+from src.core.cache import TTLCache
+from src.core.config import settings
+from src.services.events import status_counts
+from src.workers.rollups import CANCELLED_STATUSES, ROLLUP_CURSOR
+
+system_counts_cache = TTLCache(
+    maxsize=1,
+    ttl=settings.ADMIN_STATS_CACHE_TTL,
+    name="system_counts",
+)
+
+# Deals still moving through the escrow (not terminal)
+ACTIVE_STATUSES = (
+    DealStatus.CREATED, DealStatus.ACCEPTED, DealStatus.DRAFT_SUBMITTED, DealStatus.REVISION_REQUESTED,
+    DealStatus.AWAITING_PAYMENT, DealStatus.LOCKED, DealStatus.SCHEDULED, DealStatus.PUBLISHED,
+)
+
+
+def _performance(created, completed, cancelled, volume, seconds) -> Dict:
+    created, completed, cancelled = int(created or 0), int(completed or 0), int(cancelled or 0)
+    return {
+        "deals_created": created,
+        "deals_completed": completed,
+        "deals_cancelled": cancelled,
+        "volume_ton": round(volume or 0.0, 9),
+        "completion_rate": round(completed / created, 4) if created else None,
+        "avg_completion_seconds": round(seconds / completed, 1) if completed else None,
+    }
+
+
+def _row_count(session, model):
+    """
+    (count, approximate) expressions for `model`'s table.
+    Postgres: the planner's estimate once the table is large enough for it
+    to matter, else an exact count (evaluated only when needed).
+    """
+    exact = select(func.count()).select_from(model).scalar_subquery()
+    if session.bind.dialect.name != "postgresql":
+        return exact, false()
+    # Fixed model table names, quoted for regclass (e.g. "user" is reserved)
+    estimate = literal_column(
+        f"(SELECT reltuples::bigint FROM pg_class WHERE oid = '\"{model.__tablename__}\"'::regclass)",
+        Integer,
+    )
+    large = estimate >= settings.ADMIN_STATS_EXACT_BELOW
+    return case((large, estimate), else_=exact), large
+
+
+def system_counts_statement(session):
+    """
+    One UNION ALL: the deal status breakdown plus one row per counted table.
+    Columns: name, status, count, approximate.
+    """
+    parts = [
+        select(
+            literal("deal").label("name"),
+            DealStatusCount.status,
+            DealStatusCount.deals.label("count"),
+            false().label("approximate"),
+        )
+    ]
+    for name, model in (("users", User), ("channels", Channel)):
+        count, approximate = _row_count(session, model)
+        parts.append(select(literal(name), null(), count, approximate))
+    return union_all(*parts)
+
+
 class AnalyticsService:
+    """
+    [ANALYTICS]: Read side of the deal rollups.
+    """
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_platform_stats(self):
-        # TODO: Run SQL aggregation queries on 'deals' table
-        # Example: select sum(amount) from deals where status='locked'
-        pass
-    
-    async def get_user_performance(self, user_id: int):
-        # TODO: Calculate user reputation score based on successful deals
-        pass
+    def _window(self, scope: RollupScope, days: Optional[int]):
+        """
+        Sums of the counters over the last `days` daily rows, or over the
+        single all-time row per scope id when `days` is None.
+        """
+        statement = select(
+            func.sum(DealRollup.created),
+            func.sum(DealRollup.completed),
+            func.sum(DealRollup.cancelled),
+            func.sum(DealRollup.volume_ton),
+            func.sum(DealRollup.completion_seconds),
+        ).where(DealRollup.scope == scope)
+        if not days:
+            return statement.where(DealRollup.granularity == RollupGranularity.TOTAL)
+        since = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+        return statement.where(DealRollup.granularity == RollupGranularity.DAY, DealRollup.period_start >= since)
 
-Note: Consider using a caching layer (Redis) for these expensive queries.
-"""
-# Add your code below...
+    async def get_platform_stats(self, days: Optional[int] = None) -> Dict:
+        """
+        Total TON volume, completions and average completion time over the
+        last `days` (all time when None), plus the current active vs
+        cancelled split.
+        """
+        totals = (await self.session.exec(self._window(RollupScope.PLATFORM, days))).one()
+        counts = await status_counts(self.session)
+        cursor = await self.session.get(RollupCursor, ROLLUP_CURSOR)
+        return {
+            **_performance(*totals),
+            "active_deals": sum(counts.get(s.value, 0) for s in ACTIVE_STATUSES),
+            "cancelled_deals": sum(counts.get(s.value, 0) for s in CANCELLED_STATUSES),
+            "by_status": counts,
+            "window_days": days,
+            "rolled_up_at": cursor.updated_at.isoformat() if cursor else None,
+        }
+
+    async def get_timeseries(self, granularity: RollupGranularity = RollupGranularity.DAY,
+                             periods: int = 30) -> List[Dict]:
+        """
+        Platform activity per hour/day, oldest first (periods without deal activity are omitted).
+        """
+        step = timedelta(hours=1) if granularity == RollupGranularity.HOUR else timedelta(days=1)
+        since = datetime.utcnow() - step * periods
+        statement = (
+            select(DealRollup)
+            .where(
+                DealRollup.granularity == granularity,
+                DealRollup.scope == RollupScope.PLATFORM,
+                DealRollup.period_start >= since,
+            )
+            .order_by(DealRollup.period_start)
+        )
+        rows = (await self.session.exec(statement)).all()
+        return [
+            {"period_start": row.period_start.isoformat(),
+             **_performance(row.created, row.completed, row.cancelled, row.volume_ton, row.completion_seconds)}
+            for row in rows
+        ]
+
+    async def _leaders(self, scope: RollupScope, scope_id: Optional[int], days: Optional[int],
+                       limit: int) -> List[Dict]:
+        if days:
+            statement = (
+                self._window(scope, days)
+                .add_columns(DealRollup.scope_id)
+                .group_by(DealRollup.scope_id)
+                .order_by(desc(func.sum(DealRollup.volume_ton)), DealRollup.scope_id)
+            )
+        else:
+            # One all-time row per id: no GROUP BY, walk ix_dealrollup_leaders instead of sorting
+            statement = (
+                select(
+                    DealRollup.created, DealRollup.completed, DealRollup.cancelled,
+                    DealRollup.volume_ton, DealRollup.completion_seconds, DealRollup.scope_id,
+                )
+                .where(DealRollup.scope == scope, DealRollup.granularity == RollupGranularity.TOTAL)
+                .order_by(desc(DealRollup.volume_ton), DealRollup.scope_id)
+            )
+        if scope_id is not None:
+            statement = statement.where(DealRollup.scope_id == scope_id)
+        statement = statement.limit(limit)
+        rows = (await self.session.exec(statement)).all()
+        return [{"id": row[-1], **_performance(*row[:-1])} for row in rows]
+
+    async def get_channel_performance(self, channel_id: Optional[int] = None, days: Optional[int] = 30,
+                                      limit: int = 10) -> List[Dict]:
+        """
+        Per-channel performance, top `limit` by completed volume (or one channel).
+        """
+        return await self._leaders(RollupScope.CHANNEL, channel_id, days, limit)
+
+    async def get_advertiser_performance(self, advertiser_id: Optional[int] = None, days: Optional[int] = 30,
+                                         limit: int = 10) -> List[Dict]:
+        """
+        Per-advertiser performance, top `limit` by completed volume (or one advertiser).
+        """
+        return await self._leaders(RollupScope.ADVERTISER, advertiser_id, days, limit)
+
+    async def get_system_counts(self) -> Dict:
+        """
+        [ADMIN INFO]: Entity counts and deals per status, one round trip,
+        cached for ADMIN_STATS_CACHE_TTL seconds.
+        """
+        async def load():
+            rows = (await self.session.execute(system_counts_statement(self.session))).all()
+            counts = {"users": 0, "channels": 0}
+            by_status = {status.value: 0 for status in DealStatus}
+            approximate = []
+            for name, status, count, estimated in rows:
+                if name == "deal":
+                    by_status[status.value] = int(count)
+                    continue
+                counts[name] = max(int(count), 0)
+                if estimated:
+                    approximate.append(name)
+            return {
+                **counts,
+                "deals": sum(by_status.values()),
+                "deals_by_status": by_status,
+                "approximate": approximate,
+                "computed_at": datetime.utcnow().isoformat(),
+            }
+
+        return dict(await system_counts_cache.get_or_load("system", load))
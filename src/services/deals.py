@@ -0,0 +1,147 @@
+"""
+[LEGO BLOCK: USER DEALS]
+"My Deals" (CRM Lite) listing: keyset-paginated, projected, role computed in SQL.
+
+One statement per page:
+
+    SELECT * FROM (
+        SELECT <summary>, 'advertiser' AS user_role FROM deal
+         WHERE advertiser_id = :u [AND status = :s] AND <after cursor>
+         ORDER BY updated_at DESC, id DESC LIMIT :n
+        UNION ALL
+        SELECT <summary>, 'owner' FROM deal JOIN channel ON channel.id = deal.channel_id
+         WHERE channel.owner_id = :u AND deal.advertiser_id != :u ...
+         ORDER BY updated_at DESC, id DESC LIMIT :n
+    ) ORDER BY updated_at DESC, id DESC LIMIT :n
+
+Each branch walks its own (advertiser_id | channel_id, updated_at, id) index
+and stops after one page, instead of an `OR ... IN (subquery)` over all of
+the user's deals. Long texts are cut to DEAL_PREVIEW_CHARS in SQL and the row
+says which (`brief_truncated`, `draft_truncated`; `truncated` for either).
+The full deal is served by GET /api/deals/{id}, which clients must load
+before acting on a truncated brief or draft.
+"""
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import Boolean, and_, func, literal, or_, type_coerce, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from src.db.models import Channel, Deal, DealStatus
+from src.utils.pagination import decode_cursor, encode_cursor
+
+DEAL_PREVIEW_CHARS = 280
+ROLES = ("advertiser", "owner")
+
+
+def _summary_columns(role: str):
+    brief_cut = func.length(Deal.ad_brief) > DEAL_PREVIEW_CHARS
+    draft_cut = func.coalesce(func.length(Deal.ad_draft), 0) > DEAL_PREVIEW_CHARS
+    return (
+        Deal.id,
+        Deal.status,
+        Deal.amount_ton,
+        Deal.channel_id,
+        Deal.advertiser_id,
+        func.substr(Deal.ad_brief, 1, DEAL_PREVIEW_CHARS).label("ad_brief"),
+        func.substr(Deal.ad_draft, 1, DEAL_PREVIEW_CHARS).label("ad_draft"),
+        type_coerce(brief_cut, Boolean).label("brief_truncated"),
+        type_coerce(draft_cut, Boolean).label("draft_truncated"),
+        type_coerce(or_(brief_cut, draft_cut), Boolean).label("truncated"),
+        Deal.scheduled_at,
+        Deal.published_at,
+        Deal.created_at,
+        Deal.updated_at,
+        literal(role).label("user_role"),
+    )
+
+
+def _after(updated_at: datetime, deal_id: int):
+    # SQL: updated_at < u OR (updated_at = u AND id < i)
+    return or_(Deal.updated_at < updated_at, and_(Deal.updated_at == updated_at, Deal.id < deal_id))
+
+
+def cursor_for(row) -> str:
+    return encode_cursor({"u": row.updated_at.isoformat(), "i": row.id})
+
+
+def parse_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Raises:
+        ValueError: If the cursor is invalid.
+    """
+    key = decode_cursor(cursor)
+    try:
+        return datetime.fromisoformat(key["u"]), int(key["i"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+class UserDealsService:
+    """
+    [READ MODEL]: Deals where the user is the advertiser or the channel owner.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def page_statement(self, user_db_id: int, limit: int, after: Optional[Tuple[datetime, int]] = None,
+                       status: Optional[DealStatus] = None, role: Optional[str] = None):
+        branches = []
+        for branch_role in ROLES:
+            if role and role != branch_role:
+                continue
+            statement = select(*_summary_columns(branch_role))
+            if branch_role == "advertiser":
+                statement = statement.where(Deal.advertiser_id == user_db_id)
+            else:
+                # A deal on one's own channel is listed once, as advertiser (legacy behaviour)
+                statement = (
+                    statement.join(Channel, Channel.id == Deal.channel_id)
+                    .where(Channel.owner_id == user_db_id, Deal.advertiser_id != user_db_id)
+                )
+            if status:
+                statement = statement.where(Deal.status == status)
+            if after:
+                statement = statement.where(_after(*after))
+            statement = statement.order_by(Deal.updated_at.desc(), Deal.id.desc()).limit(limit)
+            # Wrapped so each branch keeps its own ORDER BY/LIMIT inside the UNION
+            branches.append(select(statement.subquery()))
+
+        merged = (union_all(*branches) if len(branches) > 1 else branches[0]).subquery()
+        return select(merged).order_by(merged.c.updated_at.desc(), merged.c.id.desc()).limit(limit)
+
+    async def list_page(self, user_db_id: int, limit: int = 50, cursor: Optional[str] = None,
+                        status: Optional[DealStatus] = None,
+                        role: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Returns one page of deal summaries (newest activity first) and the
+        cursor for the next page (None on the last page).
+
+        Raises:
+            ValueError: If the cursor is invalid.
+        """
+        after = parse_cursor(cursor) if cursor else None
+        # Fetch one extra row to know if another page exists
+        statement = self.page_statement(user_db_id, limit + 1, after, status, role)
+        rows = (await self.session.execute(statement)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = cursor_for(rows[-1])
+        return [dict(row._mapping) for row in rows], next_cursor
+
+    async def iter_all(self, user_db_id: int, status: Optional[DealStatus] = None,
+                       role: Optional[str] = None, page_size: int = 500) -> AsyncIterator[Dict[str, Any]]:
+        """
+        [EXPORT]: Every matching deal summary, fetched page by page so memory
+        stays bounded by `page_size` whatever the user's history.
+        """
+        cursor = None
+        while True:
+            rows, cursor = await self.list_page(user_db_id, page_size, cursor, status, role)
+            for row in rows:
+                yield row
+            if not cursor:
+                return
@@ -1,10 +1,24 @@
+from dataclasses import dataclass
 from datetime import datetime
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
-from typing import Optional
+from typing import List, Optional
 
-from src.db.models import Deal, DealStatus, User
+from src.db.models import Channel, Deal, DealStatus, User
 from src.core.logger import app_logger
+from src.services.events import DealChange, record_changes
+from src.services.transitions import apply_transition
+from src.workers.timer import notify_deal_scheduled
+
+@dataclass(frozen=True)
+class DealRequest:
+    """
+    [DTO]: One deal of a bulk (campaign) creation.
+    """
+    channel_id: int
+    brief: str
+    amount: float
 
 class EscrowService:
     """
@@ -12,7 +26,8 @@ class EscrowService:
     [RESPONSIBILITY]: Gestionar la vida del contrato desde 'Created' hasta 'Completed'.
     [LOGIC]: 
     1. No toca Telegram (Agnóstico).
-    2. Solo mueve estados si las condiciones previas se cumplen.
+    2. Solo mueve estados si las condiciones previas se cumplen
+       (UPDATE condicional atómico, ver `src.services.transitions`).
     
     Flow:
     CREATED -> ACCEPTED -> LOCKED (Funds Safe) -> SCHEDULED -> PUBLISHED -> COMPLETED
@@ -26,19 +41,9 @@ class EscrowService:
         """
         [STEP 2 Alt] Reject Deal
         ------------------------
-        Owner rejects the deal.
-        """
-        deal = await self.session.get(Deal, deal_id)
-        if not deal:
-            raise ValueError("Deal not found")
-            
-        # Allow rejection if Created or Locked (Pre-Paid)
-        if deal.status not in [DealStatus.CREATED, DealStatus.LOCKED]:
-             raise ValueError("Cannot reject deal in current status")
-
-        deal.status = DealStatus.REJECTED
-        deal.rejection_reason = reason
-        deal.updated_at = datetime.utcnow()
+        Owner rejects the deal (Created or Locked/Pre-Paid).
+        """
+        deal = await apply_transition(self.session, "reject", deal_id, {"rejection_reason": reason})
         await self.session.commit()
         
         self.logger.info(f"Deal Rejected: ID={deal.id} | Reason={reason}", extra={"deal_id": deal.id, "status": "REJECTED"})
@@ -58,6 +63,8 @@ class EscrowService:
             status=DealStatus.CREATED
         )
         self.session.add(deal)
+        await self.session.flush()
+        await record_changes(self.session, [DealChange.from_deal(deal)], deal.created_at, created=True)
         await self.session.commit()
         await self.session.refresh(deal)
         
@@ -65,6 +72,64 @@ class EscrowService:
                          extra={"deal_id": deal.id, "action": "create_deal"})
         return deal
 
+    async def create_deals_bulk(self, advertiser_id: int, requests: List[DealRequest]) -> List[DealChange]:
+        """
+        [STEP 1 Bulk] Campaign Launch
+        -----------------------------
+        Creates one deal per request in a single transaction:
+        one query validates every target channel, one multi-row
+        `INSERT ... RETURNING` creates the deals, their creation events
+        are logged in bulk, one commit.
+
+        Returns:
+            List[DealChange]: One per new deal (ID, channel, amount), built
+                from the rows the INSERT returned, in no particular order.
+
+        Raises:
+            ValueError: If the list is empty or a channel does not exist
+                (nothing is created).
+        """
+        if not requests:
+            raise ValueError("No deals to create")
+
+        channel_ids = {request.channel_id for request in requests}
+        statement = select(Channel.id).where(Channel.id.in_(channel_ids))
+        found = set((await self.session.exec(statement)).all())
+        missing = sorted(channel_ids - found)
+        if missing:
+            raise ValueError(f"Channels not found: {missing}")
+
+        # One multi-row INSERT ... VALUES (...), (...) RETURNING
+        now = datetime.utcnow()
+        rows = [
+            {
+                "advertiser_id": advertiser_id,
+                "channel_id": request.channel_id,
+                "ad_brief": request.brief,
+                "amount_ton": request.amount,
+                "status": DealStatus.CREATED,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for request in requests
+        ]
+        # Neither the order of RETURNING rows nor of the assigned IDs is
+        # guaranteed to follow VALUES: pair IDs with what each row returned
+        result = await self.session.execute(
+            insert(Deal).values(rows).returning(Deal.id, Deal.channel_id, Deal.amount_ton)
+        )
+        changes = [
+            DealChange(deal_id, channel_id, amount, DealStatus.CREATED)
+            for deal_id, channel_id, amount in result.all()
+        ]
+        await record_changes(self.session, changes, now, created=True)
+        await self.session.commit()
+
+        deal_ids = [change.deal_id for change in changes]
+        self.logger.info(f"Deals Created (bulk): {len(deal_ids)} | Advertiser={advertiser_id}",
+                         extra={"action": "create_deals_bulk", "deal_ids": deal_ids})
+        return changes
+
     async def accept_deal(self, deal_id: int, owner_id: int) -> Deal:
         """
         [STEP 2] Accept Deal (Smart Flow)
@@ -74,25 +139,17 @@ class EscrowService:
         A) Pre-Paid (LOCKED): Auto-Schedule immediately.
         B) Post-Paid (CREATED): Fast-track to Payment.
         """
-        deal = await self.session.get(Deal, deal_id)
-        if not deal:
-            raise ValueError("Deal not found")
-            
         # [AUTO-FILL]: Assume Advertiser sent final content in brief
-        deal.ad_draft = deal.ad_brief
-        deal.updated_at = datetime.utcnow()
+        deal = await apply_transition(self.session, "accept", deal_id, {"ad_draft": Deal.ad_brief})
+        await self.session.commit()
 
-        if deal.status == DealStatus.LOCKED:
+        if deal.status == DealStatus.SCHEDULED:
             # [SCENARIO A]: Pre-Paid. Launch immediately!
-            deal.status = DealStatus.SCHEDULED
-            deal.scheduled_at = datetime.utcnow()
             self.logger.info(f"Pre-Paid Deal Accepted & Auto-Launched: ID={deal.id}", extra={"deal_id": deal.id, "status": "SCHEDULED"})
+            notify_deal_scheduled(deal.id, deal.scheduled_at)
         else:
-             # [SCENARIO B]: Post-Paid. Fast-track to Payment.
-            deal.status = DealStatus.AWAITING_PAYMENT
+            # [SCENARIO B]: Post-Paid. Fast-track to Payment.
             self.logger.info(f"Deal Accepted & Waiting Payment: ID={deal.id}", extra={"deal_id": deal.id, "status": "AWAITING_PAYMENT"})
-        
-        await self.session.commit()
         return deal
 
     async def submit_draft(self, deal_id: int, content: str) -> Deal:
@@ -101,13 +158,7 @@ class EscrowService:
         ---------------------
         Owner submits the actual ad content (text/media) for review.
         """
-        deal = await self.session.get(Deal, deal_id)
-        if deal.status not in [DealStatus.ACCEPTED, DealStatus.REVISION_REQUESTED]:
-            raise ValueError("Invalid status for draft submission")
-            
-        deal.ad_draft = content
-        deal.status = DealStatus.DRAFT_SUBMITTED
-        deal.updated_at = datetime.utcnow()
+        deal = await apply_transition(self.session, "submit_draft", deal_id, {"ad_draft": content})
         await self.session.commit()
         
         self.logger.info(f"Draft Submitted: ID={deal.id}", extra={"deal_id": deal.id, "status": "DRAFTED"})
@@ -119,12 +170,7 @@ class EscrowService:
         ----------------------
         Advertiser likes the draft. Now moves to AWAITING_PAYMENT.
         """
-        deal = await self.session.get(Deal, deal_id)
-        if deal.status != DealStatus.DRAFT_SUBMITTED:
-            raise ValueError("Nothing to approve")
-            
-        deal.status = DealStatus.AWAITING_PAYMENT
-        deal.updated_at = datetime.utcnow()
+        deal = await apply_transition(self.session, "approve_draft", deal_id)
         await self.session.commit()
         
         self.logger.info(f"Draft Approved: ID={deal.id}", extra={"deal_id": deal.id, "status": "AWAITING"})
@@ -134,12 +180,9 @@ class EscrowService:
         """
         [STEP 4 Alt] Request Revision
         ------------------------------
-        Advertiser wants changes.
+        Advertiser wants changes to a submitted draft.
         """
-        deal = await self.session.get(Deal, deal_id)
-        deal.rejection_reason = reason
-        deal.status = DealStatus.REVISION_REQUESTED
-        deal.updated_at = datetime.utcnow()
+        deal = await apply_transition(self.session, "request_revision", deal_id, {"rejection_reason": reason})
         await self.session.commit()
         
         self.logger.info(f"Revision Requested: ID={deal.id}", extra={"deal_id": deal.id, "status": "REVISION"})
@@ -148,39 +191,24 @@ class EscrowService:
     async def lock_funds(self, deal_id: int, transaction_hash: str) -> Deal:
         """
         [STEP 3] Lock Funds (Escrow)
+        Post-Paid (AWAITING_PAYMENT) auto-schedules; Pre-Paid (CREATED)
+        becomes LOCKED and waits for the Owner to accept.
         """
-        deal = await self.session.get(Deal, deal_id)
-        
-        # [FIX]: Support Pre-Paid Flow (allow locking from CREATED)
-        valid_statuses = [DealStatus.AWAITING_PAYMENT, DealStatus.CREATED]
-        if not deal or deal.status not in valid_statuses:
-             raise ValueError(f"Deal status {deal.status} not valid for locking funds.")
-
-        deal.payment_tx_hash = transaction_hash
-        
-        if deal.status == DealStatus.AWAITING_PAYMENT:
-            # If it was waiting, now we auto-schedule (Post-Paid Flow complete)
-            deal.status = DealStatus.SCHEDULED
-            deal.scheduled_at = datetime.utcnow()
-        else:
-            # If it was CREATED (Pre-Paid), we just mark it LOCKED and wait for Owner Accept
-            deal.status = DealStatus.LOCKED
-            
+        deal = await apply_transition(self.session, "lock_funds", deal_id, {"payment_tx_hash": transaction_hash})
         await self.session.commit()
+
+        if deal.status == DealStatus.SCHEDULED:
+            notify_deal_scheduled(deal.id, deal.scheduled_at)
         self.logger.info(f"Funds Locked: ID={deal.id} | Status={deal.status}", extra={"deal_id": deal.id, "status": deal.status.value})
         return deal
     
     async def schedule_post(self, deal_id: int, schedule_time: datetime) -> Deal:
         """
-        Step 4: Post is scheduled for auto-posting.
+        Step 4: Post is scheduled for auto-posting (funds must be LOCKED).
         """
-        deal = await self.session.get(Deal, deal_id)
-        if deal.status != DealStatus.LOCKED:
-             raise ValueError("Funds must be LOCKED before scheduling.")
-        
-        deal.scheduled_at = schedule_time
-        deal.status = DealStatus.SCHEDULED
+        deal = await apply_transition(self.session, "schedule", deal_id, {"scheduled_at": schedule_time})
         await self.session.commit()
+        notify_deal_scheduled(deal.id, deal.scheduled_at)
         
         self.logger.info(f"Post Scheduled: ID={deal.id} | Time={schedule_time}", extra={"deal_id": deal.id, "status": "SCHEDULED"})
         return deal
@@ -189,10 +217,8 @@ class EscrowService:
         """
         Step Final: Verification successful, funds released.
         """
-        deal = await self.session.get(Deal, deal_id)
-        deal.status = DealStatus.COMPLETED
-        deal.updated_at = datetime.utcnow()
-        
+        deal = await apply_transition(self.session, "complete", deal_id)
         await self.session.commit()
+
         self.logger.info(f"Deal Completed: ID={deal.id} | Funds Released", extra={"deal_id": deal.id, "status": "COMPLETED"})
         return deal
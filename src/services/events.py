@@ -0,0 +1,208 @@
+"""
+[LEGO BLOCK: EVENT LOG]
+Append-only `DealEvent` history plus incrementally maintained projections.
+
+Every status change (escrow transitions, publishing, payout confirmation)
+calls `record_changes` inside the caller's transaction, which:
+1. Reads the latest event of each deal (index-backed) -> previous status + since when.
+2. Appends the new events (one multi-row INSERT).
+3. Applies the deltas to the projections with one aggregated upsert each:
+   - `DealStatusCount`: -1 old status, +1 new status.
+   - `StatusDuration`: time spent in the status that was left.
+   - `ChannelDealStats`: deals created / completed and completed volume.
+
+Dashboards then read a handful of projection rows instead of scanning `deal`.
+Deals created before the log existed are seeded by `backfill_projections`.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, func, insert, select as sa_select
+
+from src.db.dialect import upsert
+from src.db.models import ChannelDealStats, Deal, DealEvent, DealStatus, DealStatusCount, StatusDuration
+from src.core.logger import app_logger
+
+
+@dataclass(frozen=True)
+class DealChange:
+    """
+    [DTO]: One deal entering `to_status`.
+    """
+    deal_id: int
+    channel_id: int
+    amount_ton: float
+    to_status: DealStatus
+
+    @classmethod
+    def from_deal(cls, deal: Deal) -> "DealChange":
+        return cls(deal.id, deal.channel_id, deal.amount_ton, deal.status)
+
+
+async def latest_events(session, deal_ids: Iterable[int]) -> Dict[int, DealEvent]:
+    """{deal_id: its most recent event} for the given deals (one query)."""
+    deal_ids = list(deal_ids)
+    if not deal_ids:
+        return {}
+    newest = (
+        sa_select(func.max(DealEvent.id))
+        .where(DealEvent.deal_id.in_(deal_ids))
+        .group_by(DealEvent.deal_id)
+    )
+    rows = await session.scalars(sa_select(DealEvent).where(DealEvent.id.in_(newest)))
+    return {event.deal_id: event for event in rows.all()}
+
+
+def _add(column, excluded):
+    return {column.key: column + excluded[column.key]}
+
+# [DEADLOCKS]: Each upsert below locks its conflict rows in VALUES order.
+# Rows are sorted by key, so concurrent transactions touching the same
+# projection rows (say SCHEDULED and PUBLISHED) always lock them in the
+# same order and wait for each other instead of deadlocking on Postgres.
+
+
+async def _apply_status_counts(session, deltas: Dict[DealStatus, int]):
+    rows = [{"status": status, "deals": delta} for status, delta in sorted(deltas.items()) if delta]
+    if rows:
+        await session.execute(upsert(
+            session, DealStatusCount, rows, ["status"],
+            lambda excluded: _add(DealStatusCount.__table__.c.deals, excluded),
+        ))
+
+
+async def _apply_durations(session, durations: Dict[DealStatus, List[float]]):
+    if not durations:
+        return
+    table = StatusDuration.__table__
+    rows = [
+        {"status": status, "exits": len(seconds), "total_seconds": sum(seconds), "max_seconds": max(seconds)}
+        for status, seconds in sorted(durations.items())
+    ]
+    await session.execute(upsert(
+        session, StatusDuration, rows, ["status"],
+        lambda excluded: {
+            **_add(table.c.exits, excluded),
+            **_add(table.c.total_seconds, excluded),
+            "max_seconds": case(
+                (excluded.max_seconds > table.c.max_seconds, excluded.max_seconds),
+                else_=table.c.max_seconds,
+            ),
+        },
+    ))
+
+
+async def _apply_channel_stats(session, stats: Dict[int, Dict[str, float]]):
+    if not stats:
+        return
+    table = ChannelDealStats.__table__
+    rows = [{"channel_id": channel_id, **values} for channel_id, values in sorted(stats.items())]
+    await session.execute(upsert(
+        session, ChannelDealStats, rows, ["channel_id"],
+        lambda excluded: {
+            **_add(table.c.deals_total, excluded),
+            **_add(table.c.deals_completed, excluded),
+            **_add(table.c.volume_ton, excluded),
+        },
+    ))
+
+
+async def record_changes(session, changes: List[DealChange], now: Optional[datetime] = None,
+                         created: bool = False) -> List[DealEvent]:
+    """
+    [HOOK]: Logs `changes` and updates the projections (caller commits).
+
+    Args:
+        created: The deals were just inserted, so there is no previous event
+            to look up (saves the read).
+    """
+    if not changes:
+        return []
+    now = now or datetime.utcnow()
+    previous = {} if created else await latest_events(session, (c.deal_id for c in changes))
+
+    events = []
+    counts: Dict[DealStatus, int] = defaultdict(int)
+    durations: Dict[DealStatus, List[float]] = defaultdict(list)
+    channels: Dict[int, Dict[str, float]] = defaultdict(
+        lambda: {"deals_total": 0, "deals_completed": 0, "volume_ton": 0.0}
+    )
+    for change in changes:
+        before = previous.get(change.deal_id)
+        from_status = before.to_status if before else None
+        events.append({
+            "deal_id": change.deal_id,
+            "from_status": from_status,
+            "to_status": change.to_status,
+            "created_at": now,
+        })
+        counts[change.to_status] += 1
+        if before is not None:
+            counts[from_status] -= 1
+            durations[from_status].append(max((now - before.created_at).total_seconds(), 0.0))
+        else:
+            channels[change.channel_id]["deals_total"] += 1
+        if change.to_status == DealStatus.COMPLETED:
+            channels[change.channel_id]["deals_completed"] += 1
+            channels[change.channel_id]["volume_ton"] += change.amount_ton
+
+    rows = await session.scalars(insert(DealEvent).values(events).returning(DealEvent))
+    logged = list(rows.all())
+    await _apply_status_counts(session, counts)
+    await _apply_durations(session, durations)
+    await _apply_channel_stats(session, channels)
+    return logged
+
+
+async def backfill_projections(session) -> int:
+    """
+    Seeds the log and projections from the current `deal` table, once.
+    Deals without events get a snapshot event (from_status None, stamped
+    with their `updated_at`); projections are rebuilt from scratch.
+    Skipped when `DealStatusCount` already has rows. Returns deals seeded.
+    """
+    if (await session.scalars(sa_select(DealStatusCount.status).limit(1))).first() is not None:
+        return 0
+
+    logged = sa_select(DealEvent.id).where(DealEvent.deal_id == Deal.id).exists()
+    seed = sa_select(Deal.id, Deal.status, Deal.updated_at).where(~logged)
+    result = await session.execute(
+        insert(DealEvent).from_select(["deal_id", "to_status", "created_at"], seed)
+    )
+    seeded = result.rowcount or 0
+
+    counts = (await session.execute(
+        sa_select(Deal.status, func.count()).group_by(Deal.status)
+    )).all()
+    await _apply_status_counts(session, dict(counts))
+
+    completed = case((Deal.status == DealStatus.COMPLETED, 1), else_=0)
+    per_channel = (await session.execute(
+        sa_select(
+            Deal.channel_id,
+            func.count(),
+            func.sum(completed),
+            func.sum(completed * Deal.amount_ton),
+        ).group_by(Deal.channel_id)
+    )).all()
+    await _apply_channel_stats(session, {
+        channel_id: {"deals_total": total, "deals_completed": done or 0, "volume_ton": volume or 0.0}
+        for channel_id, total, done, volume in per_channel
+    })
+    await session.commit()
+    if seeded:
+        app_logger.info(f"Event log: backfilled {seeded} deals into projections")
+    return seeded
+
+
+async def status_counts(session) -> Dict[str, int]:
+    """{status value: deals} from the projection (one small read)."""
+    rows = (await session.execute(sa_select(DealStatusCount.status, DealStatusCount.deals))).all()
+    return {status.value: deals for status, deals in rows}
+
+
+async def deal_history(session, deal_id: int) -> List[DealEvent]:
+    statement = sa_select(DealEvent).where(DealEvent.deal_id == deal_id).order_by(DealEvent.id)
+    return list((await session.scalars(statement)).all())
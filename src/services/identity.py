@@ -1,10 +1,51 @@
+from dataclasses import dataclass
 from datetime import datetime
+from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 from typing import Optional, List
 
 from src.db.models import User, Channel, UserRole
+from src.core.cache import TTLCache
+from src.core.config import settings
 from src.core.logger import app_logger
+from src.db.dialect import upsert
+from src.services.marketplace import invalidate_channel_feed
+from src.services.search import ChannelSearchService
+
+@dataclass(frozen=True)
+class CachedIdentity:
+    """
+    [DTO]: Immutable snapshot of the user fields hot endpoints need.
+    Safe to share between requests (unlike a session-bound `User`).
+    """
+    id: int
+    telegram_id: int
+    role: UserRole
+    wallet_address: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "CachedIdentity":
+        return cls(id=user.id, telegram_id=user.telegram_id, role=user.role, wallet_address=user.wallet_address)
+
+# [PERF]: telegram_id -> CachedIdentity, so most requests skip the user SELECT.
+# Users are never deleted in normal operation and the internal ID never
+# changes; role/wallet writes call `invalidate_identity`.
+identity_cache = TTLCache(
+    maxsize=settings.IDENTITY_CACHE_SIZE,
+    ttl=settings.IDENTITY_CACHE_TTL,
+    name="identity",
+)
+
+def invalidate_identity(telegram_id: Optional[int] = None):
+    """
+    [HOOK]: Drops one cached identity (or all of them, e.g. after a purge).
+    Call after committing changes to a user's role or wallet.
+    """
+    if telegram_id is None:
+        identity_cache.invalidate()
+    else:
+        identity_cache.pop(telegram_id)
 
 class IdentityService:
     """
@@ -17,11 +58,11 @@ class IdentityService:
     async def get_or_create_user(self, telegram_id: int, username: str = None) -> User:
         """
         Retrieves a user by Telegram ID or creates a new one if not exists.
-        [CONCURRENCY SAFE]: Handles race conditions via IntegrityError catch.
+        [CONCURRENCY SAFE]: Creation is one `INSERT ... ON CONFLICT DO UPDATE
+        ... RETURNING`, so racing /start handlers all get the same row back
+        without IntegrityError, rollback or re-SELECT.
         """
-        from sqlalchemy.exc import IntegrityError
-
-        # 1. Optimistic Check
+        # 1. Optimistic Check (read-only: the common case takes no write lock)
         statement = select(User).where(User.telegram_id == telegram_id)
         result = await self.session.exec(statement)
         user = result.first()
@@ -29,28 +70,46 @@ class IdentityService:
         if user:
             return user
 
-        # 2. Create if missing
-        try:
-            user = User(telegram_id=telegram_id, username=username)
-            self.session.add(user)
-            await self.session.commit()
-            await self.session.refresh(user)
-            self.logger.info(f"New User Created: {telegram_id}", extra={"user_id": user.id})
-            return user
-        except IntegrityError:
-            # Race condition: User was created by another process between check and commit
-            await self.session.rollback()
-            self.logger.warning(f"Race condition detected for user {telegram_id}. Recovering...")
-            
-            # Retry fetch
-            statement = select(User).where(User.telegram_id == telegram_id)
-            result = await self.session.exec(statement)
-            user = result.first()
-            if not user:
-                raise Exception("Critical: User creation failed and recovery failed.")
-            return user
+        # 2. Create if missing (or return the row a concurrent request just created)
+        insert = upsert(
+            self.session, User,
+            {"telegram_id": telegram_id, "username": username},
+            conflict=["telegram_id"],
+            update=lambda excluded: {"username": func.coalesce(User.username, excluded.username)},
+        ).returning(User)
+        result = await self.session.scalars(insert, execution_options={"populate_existing": True})
+        user = result.one()
+        await self.session.commit()
+        self.logger.info(f"New User Created: {telegram_id}", extra={"user_id": user.id})
+        return user
+
+    async def resolve_user(self, telegram_id: int, username: str = None) -> CachedIdentity:
+        """
+        [PERF]: Cached variant of `get_or_create_user` for request handlers.
+        Returns a read-only snapshot; load the `User` row to modify it.
+        """
+        cached = identity_cache.get(telegram_id)
+        if cached is not None:
+            return cached
+        identity = CachedIdentity.from_user(await self.get_or_create_user(telegram_id, username))
+        identity_cache.set(telegram_id, identity)
+        return identity
+
+    async def find_user_id(self, telegram_id: int) -> Optional[int]:
+        """
+        Internal user ID for a Telegram ID, without creating the user.
+        """
+        cached = identity_cache.get(telegram_id)
+        if cached is not None:
+            return cached.id
+        statement = select(User).where(User.telegram_id == telegram_id)
+        user = (await self.session.exec(statement)).first()
+        if user is None:
+            return None
+        identity_cache.set(telegram_id, CachedIdentity.from_user(user))
+        return user.id
 
-    async def register_channel(self, owner_id: int, channel_id: int, title: str) -> Channel:
+    async def register_channel(self, owner_id: int, channel_id: int, title: str, username: Optional[str] = None) -> Channel:
         """
         [MODULAR COMPONENT]: Channel Onboarding
         Registers a new channel in the marketplace.
@@ -59,6 +118,7 @@ class IdentityService:
             owner_id: Logic ID of the User who owns it.
             channel_id: Telegram's unique ID for the channel.
             title: Display name.
+            username: Public @handle (without '@'), if any.
         """
         # Check if channel exists to avoid duplicates
         statement = select(Channel).where(Channel.channel_id == channel_id)
@@ -69,56 +129,47 @@ class IdentityService:
             self.logger.info(f"Channel already exists: {channel_id}")
             return channel
 
-        channel = Channel(
-            owner_id=owner_id,
-            channel_id=channel_id,
-            title=title,
-            verified=False, 
-            subscribers=0
-        )
-        try:
-            self.session.add(channel)
-            await self.session.commit()
-            await self.session.refresh(channel)
-        except Exception: # Catch IntegrityError (lazy import or use from above if global)
-             # Fallback if somehow created in parallel
-             await self.session.rollback()
-             # Re-fetch
-             statement = select(Channel).where(Channel.channel_id == channel_id)
-             res = await self.session.exec(statement)
-             return res.first()
-        
-        # [INTEGRATIVE]: Auto-add owner as a Manager
-        await self.add_manager(channel.id, owner_id)
+        # Insert unless created in parallel (DO NOTHING -> no row returned)
+        insert = upsert(
+            self.session, Channel,
+            {"owner_id": owner_id, "channel_id": channel_id, "title": title,
+             "username": username, "verified": False, "subscribers": 0},
+            conflict=["channel_id"],
+        ).returning(Channel)
+        result = await self.session.scalars(insert, execution_options={"populate_existing": True})
+        channel = result.first()
+        if channel is None:
+            await self.session.rollback()
+            result = await self.session.exec(statement)
+            return result.first()
+
+        # [SEARCH]: Index in the same transaction as the insert
+        await ChannelSearchService(self.session).index_channel(channel)
+        # [INTEGRATIVE]: Auto-add owner as a Manager (same transaction, one commit)
+        await self.add_manager(channel.id, owner_id, commit=False)
+        await self.session.commit()
         
         self.logger.info(f"Channel Registered: {title} ({channel_id})", extra={"channel_id": channel.id})
         return channel
 
-    async def add_manager(self, channel_db_id: int, user_db_id: int):
+    async def add_manager(self, channel_db_id: int, user_db_id: int, commit: bool = True):
         """
         [MVP REQ]: PR Manager Flow
         Grants a user permission to manage a channel's ads.
+        Idempotent: one `INSERT ... ON CONFLICT DO NOTHING`.
         """
         from src.db.models import ChannelManager
         
-        # Check if already a manager
-        stmt = select(ChannelManager).where(
-            ChannelManager.channel_id == channel_db_id,
-            ChannelManager.user_id == user_db_id
+        insert = upsert(
+            self.session, ChannelManager,
+            {"user_id": user_db_id, "channel_id": channel_db_id},
+            conflict=["user_id", "channel_id"],
         )
-        res = await self.session.exec(stmt)
-        if res.first():
-            return
-
-        manager = ChannelManager(user_id=user_db_id, channel_id=channel_db_id)
-        try:
-            self.session.add(manager)
+        result = await self.session.execute(insert)
+        if commit:
             await self.session.commit()
+        if result.rowcount:
             self.logger.info(f"Manager added: User {user_db_id} -> Channel {channel_db_id}")
-        except Exception:
-            await self.session.rollback()
-            # Already exists, just ignore
-            return
 
     async def verify_channel_stats(self, channel_id: int, stats: dict) -> Channel:
         """
@@ -141,7 +192,9 @@ class IdentityService:
         channel.verified = True
         channel.updated_at = datetime.utcnow()
         
+        await ChannelSearchService(self.session).index_channel(channel)
         await self.session.commit()
+        invalidate_channel_feed()
         self.logger.info(f"Stats Updated for Channel: {channel.title}")
         return channel
 
@@ -157,4 +210,5 @@ class IdentityService:
         channel.price_post = price
         channel.updated_at = datetime.utcnow()
         await self.session.commit()
+        invalidate_channel_feed()
         return channel
@@ -1,9 +1,40 @@
+from dataclasses import dataclass
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import select
-from typing import List
+from sqlmodel import select, or_
+from typing import List, Optional, Tuple
 
 from src.db.models import Channel
+from src.core.cache import TTLCache
+from src.core.config import settings
 from src.core.logger import app_logger
+from src.utils.pagination import encode_cursor, decode_cursor
+
+# [PERF]: Read-through cache for feed pages, keyed by (mode, limit, position, filters).
+# Holds detached Channel snapshots; treat cached rows as read-only.
+channel_feed_cache = TTLCache(
+    maxsize=settings.FEED_CACHE_SIZE,
+    ttl=settings.FEED_CACHE_TTL,
+    name="channel_feed",
+)
+
+def invalidate_channel_feed():
+    """
+    [HOOK]: Drops every cached feed page.
+    Fired by IdentityService whenever a listed channel changes.
+    """
+    channel_feed_cache.invalidate()
+
+@dataclass(frozen=True)
+class FeedFilters:
+    """
+    [DTO]: Server-side filters for the marketplace feed.
+    Frozen (hashable) so it can be used as part of a cache key.
+    """
+    language: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_subscribers: Optional[int] = None
+    min_premium_ratio: Optional[float] = None
 
 class MarketplaceService:
     """
@@ -13,23 +44,99 @@ class MarketplaceService:
         self.session = session
         self.logger = app_logger
 
-    async def list_verified_channels(self, limit: int = 10, offset: int = 0) -> List[Channel]:
+    @staticmethod
+    def _feed_statement(filters: Optional[FeedFilters] = None):
+        """
+        Base feed query: verified channels, biggest first.
+        Order is (subscribers DESC, id DESC) so pages are stable and
+        backed by the `ix_channel_feed*` composite indexes.
+        """
+        statement = select(Channel).where(Channel.verified == True)
+        if filters:
+            if filters.language:
+                statement = statement.where(Channel.language == filters.language)
+            if filters.min_price is not None:
+                statement = statement.where(Channel.price_post >= filters.min_price)
+            if filters.max_price is not None:
+                statement = statement.where(Channel.price_post <= filters.max_price)
+            if filters.min_subscribers is not None:
+                statement = statement.where(Channel.subscribers >= filters.min_subscribers)
+            if filters.min_premium_ratio is not None:
+                statement = statement.where(Channel.premium_ratio >= filters.min_premium_ratio)
+        return statement.order_by(Channel.subscribers.desc(), Channel.id.desc())
+
+    @staticmethod
+    def cursor_for(channel: Channel) -> str:
+        """
+        Builds the opaque cursor pointing just after `channel`.
+        """
+        return encode_cursor({"s": channel.subscribers, "i": channel.id})
+
+    async def list_verified_channels(self, limit: int = 10, offset: int = 0,
+                                     filters: Optional[FeedFilters] = None) -> List[Channel]:
         """
         Fetches verified channels for the marketplace listing.
-        
+
         Logic:
         - Only returns channels where `verified=True`.
         - Supports pagination via `limit` and `offset`.
-        
+
         Args:
             limit (int): Max number of channels to return.
             offset (int): Number of channels to skip.
-            
+            filters (FeedFilters): Optional language/price/audience filters.
+
         Returns:
             List[Channel]: List of verified channel objects.
         """
-        # SQL: SELECT * FROM channel WHERE verified = 1 LIMIT x OFFSET y
-        statement = select(Channel).where(Channel.verified == True).offset(offset).limit(limit)
-        result = await self.session.exec(statement)
-        channels = result.all()
-        return list(channels)
+        async def load():
+            # SQL: SELECT * FROM channel WHERE verified = 1 ORDER BY subscribers DESC, id DESC LIMIT x OFFSET y
+            statement = self._feed_statement(filters).offset(offset).limit(limit)
+            result = await self.session.exec(statement)
+            return tuple(result.all())
+
+        key = ("offset", limit, offset, filters)
+        return list(await channel_feed_cache.get_or_load(key, load))
+
+    async def list_verified_channels_page(self, limit: int = 10, cursor: Optional[str] = None,
+                                          filters: Optional[FeedFilters] = None) -> Tuple[List[Channel], Optional[str]]:
+        """
+        [PERF]: Keyset (seek) pagination for the marketplace feed.
+        Cost stays constant however deep the advertiser scrolls, unlike OFFSET.
+
+        Args:
+            limit (int): Max number of channels to return.
+            cursor (str): Opaque cursor from the previous page (None = first page).
+            filters (FeedFilters): Optional language/price/audience filters.
+
+        Returns:
+            Tuple[List[Channel], Optional[str]]: The page and the cursor for the
+            next one (None when this is the last page).
+
+        Raises:
+            ValueError: If the cursor is invalid.
+        """
+        async def load():
+            statement = self._feed_statement(filters)
+            if cursor:
+                key = decode_cursor(cursor)
+                try:
+                    subscribers, last_id = int(key["s"]), int(key["i"])
+                except (KeyError, TypeError, ValueError) as e:
+                    raise ValueError("Invalid cursor") from e
+                # SQL: ... AND (subscribers < s OR (subscribers = s AND id < i))
+                statement = statement.where(or_(
+                    Channel.subscribers < subscribers,
+                    (Channel.subscribers == subscribers) & (Channel.id < last_id),
+                ))
+
+            # Fetch one extra row to know if another page exists
+            result = await self.session.exec(statement.limit(limit + 1))
+            channels = tuple(result.all())
+            if len(channels) > limit:
+                channels = channels[:limit]
+                return channels, self.cursor_for(channels[-1])
+            return channels, None
+
+        channels, next_cursor = await channel_feed_cache.get_or_load(("cursor", limit, cursor, filters), load)
+        return list(channels), next_cursor
@@ -0,0 +1,160 @@
+import math
+import re
+from sqlalchemy import Float, column, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+from typing import List
+
+from src.db.models import Channel
+from src.core.config import settings
+from src.core.logger import app_logger
+
+# Each token becomes a prefix term; cap them so one request can't build a huge query
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_QUERY_TOKENS = 8
+# Fetch N x limit text matches, then re-rank them with the popularity signal
+CANDIDATE_FACTOR = 5
+
+# Shared by the Postgres index and the query: the planner only uses the
+# expression index when both expressions are textually identical.
+_PG_DOCUMENT = "(coalesce(channel.title, '') || ' ' || coalesce(channel.username, ''))"
+
+def create_search_index(conn):
+    """
+    [SEARCH INDEX]: Creates the full-text structures for the current dialect.
+    - SQLite: external FTS5 table `channel_fts` (rowid = channel.id), backfilled once.
+    - Postgres: GIN `tsvector` + trigram expression indexes on `channel` itself,
+      so they stay in sync without application writes.
+    Idempotent; run by the baseline migration (sync connection).
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'channel_fts'"
+        )).first()
+        if exists:
+            return
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE channel_fts USING fts5("
+            "title, username, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        ))
+        conn.execute(text(
+            "INSERT INTO channel_fts (rowid, title, username) "
+            "SELECT id, title, coalesce(username, '') FROM channel"
+        ))
+    elif dialect == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_channel_search_tsv ON channel "
+            f"USING gin (to_tsvector('simple'::regconfig, {_PG_DOCUMENT}))"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_channel_search_trgm ON channel "
+            f"USING gin ({_PG_DOCUMENT} gin_trgm_ops)"
+        ))
+    else:
+        app_logger.warning(f"SEARCH: No full-text index available for dialect '{dialect}'")
+
+async def ensure_search_index(conn):
+    """`create_search_index` on an AsyncConnection."""
+    await conn.run_sync(create_search_index)
+
+class ChannelSearchService:
+    """
+    [DISCOVERY]: Full-text search over channel titles and usernames.
+    Text relevance (FTS5 bm25 / Postgres ts_rank + trigram similarity) is
+    blended with subscriber count so bigger channels win close matches.
+    """
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.logger = app_logger
+
+    @property
+    def dialect(self) -> str:
+        return self.session.bind.dialect.name
+
+    @staticmethod
+    def tokenize(query: str) -> List[str]:
+        """
+        Splits free text into safe word tokens (no FTS/tsquery operators survive).
+        """
+        return _TOKEN_RE.findall(query.lower())[:MAX_QUERY_TOKENS]
+
+    async def index_channel(self, channel: Channel):
+        """
+        [SYNC HOOK]: Mirrors a channel into the FTS5 table (SQLite only).
+        Joins the caller's transaction; the caller commits.
+        Postgres uses expression indexes on `channel`, so nothing to do there.
+        """
+        if self.dialect != "sqlite" or channel.id is None:
+            return
+        params = {"id": channel.id, "title": channel.title or "", "username": channel.username or ""}
+        await self.session.execute(text("DELETE FROM channel_fts WHERE rowid = :id"), params)
+        await self.session.execute(
+            text("INSERT INTO channel_fts (rowid, title, username) VALUES (:id, :title, :username)"),
+            params,
+        )
+
+    async def search(self, query: str, limit: int = 20) -> List[Channel]:
+        """
+        Searches verified channels with prefix matching ("crypt" finds "Crypto News").
+
+        Args:
+            query (str): Free text typed by the advertiser.
+            limit (int): Max results.
+
+        Returns:
+            List[Channel]: Channels ordered by blended relevance.
+        """
+        tokens = self.tokenize(query)
+        if not tokens:
+            return []
+
+        candidates = limit * CANDIDATE_FACTOR
+        if self.dialect == "sqlite":
+            # bm25() is lower-is-better; negate it. Title matches weigh double.
+            statement = text(
+                "SELECT channel.*, -bm25(channel_fts, 2.0, 1.0) AS relevance "
+                "FROM channel_fts JOIN channel ON channel.id = channel_fts.rowid "
+                "WHERE channel_fts MATCH :match AND channel.verified = 1 "
+                "ORDER BY bm25(channel_fts, 2.0, 1.0) LIMIT :candidates"
+            ).bindparams(match=" ".join(f'"{t}"*' for t in tokens), candidates=candidates)
+        elif self.dialect == "postgresql":
+            # Prefix tsquery for whole words, trigram similarity for typos
+            statement = text(
+                "SELECT channel.*, greatest("
+                f"ts_rank(to_tsvector('simple'::regconfig, {_PG_DOCUMENT}), q.query), "
+                f"similarity({_PG_DOCUMENT}, :raw)) AS relevance "
+                "FROM channel, to_tsquery('simple'::regconfig, :tsquery) AS q(query) "
+                "WHERE channel.verified AND ("
+                f"to_tsvector('simple'::regconfig, {_PG_DOCUMENT}) @@ q.query "
+                f"OR {_PG_DOCUMENT} % :raw) "
+                "ORDER BY relevance DESC LIMIT :candidates"
+            ).bindparams(
+                tsquery=" & ".join(f"{t}:*" for t in tokens),
+                raw=" ".join(tokens),
+                candidates=candidates,
+            )
+        else:
+            raise ValueError(f"Search is not supported on '{self.dialect}'")
+
+        textual = statement.columns(*Channel.__table__.columns, column("relevance", Float))
+        rows = await self.session.exec(
+            select(Channel, textual.selected_columns.relevance).from_statement(textual)
+        )
+        return self._rank(rows.all(), limit)
+
+    @staticmethod
+    def _rank(rows, limit: int) -> List[Channel]:
+        """
+        Blends text relevance with audience size:
+        score = relevance * (1 + SEARCH_POPULARITY_WEIGHT * ln(1 + subscribers))
+        """
+        weight = settings.SEARCH_POPULARITY_WEIGHT
+
+        def score(row):
+            channel, relevance = row
+            return (relevance or 0.0) * (1 + weight * math.log1p(max(channel.subscribers, 0)))
+
+        ranked = sorted(rows, key=score, reverse=True)
+        return [channel for channel, _ in ranked[:limit]]
@@ -1,192 +1,487 @@
-from typing import Optional
+from typing import Optional, List, Callable, Awaitable
 import aiohttp
 import asyncio
+import base64
+import decimal
+import functools
+import json
+import random
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
 from src.core.logger import app_logger
 from src.core.config import settings
 
-# TON SDK Imports
-TONSDK_AVAILABLE = False
-Wallets = None
-WalletVersionEnum = None
-to_nano = None
-bytes_to_b64str = None
-mnemonic_to_wallet_key = None
-
-try:
-    from tonsdk.contract.wallet import Wallets, WalletVersionEnum
-    from tonsdk.utils import to_nano, bytes_to_b64str
-    from tonsdk.crypto._mnemonic import mnemonic_to_wallet_key
-    TONSDK_AVAILABLE = True
-    app_logger.info("TONSDK imported successfully.")
-except ImportError as e:
-    app_logger.error(f"TONSDK not installed or import error: {e}. Payouts will fail.")
+@functools.lru_cache(maxsize=1)
+def _sdk():
+    """
+    [PERF]: The TON SDK, imported on first use instead of at process start
+    (most requests never sign or parse a cell). None if it isn't installed.
+    """
+    try:
+        from tonsdk.boc import Cell
+        from tonsdk.contract import Contract
+        from tonsdk.contract.wallet import Wallets, WalletVersionEnum
+        from tonsdk.utils import Address, bytes_to_b64str
+    except ImportError as e:
+        app_logger.error(f"TONSDK not installed or import error: {e}. Payouts will fail.")
+        return None
+    return SimpleNamespace(
+        Cell=Cell, Contract=Contract, Wallets=Wallets, WalletVersionEnum=WalletVersionEnum,
+        Address=Address, bytes_to_b64str=bytes_to_b64str,
+    )
+
+def decode_comment(message: dict) -> str:
+    """
+    Extracts the text comment from a toncenter message (`in_msg` / `out_msgs[i]`).
+    Uses the pre-decoded `message` field when present, otherwise decodes the
+    body: a text comment is op=0 (32 zero bits) followed by UTF-8 bytes,
+    continued through the first reference of each cell ("snake" format).
+    """
+    text = message.get("message")
+    if text:
+        return text
+
+    msg_data = message.get("msg_data") or {}
+    try:
+        if msg_data.get("@type") == "msg.dataText" and msg_data.get("text"):
+            return base64.b64decode(msg_data["text"]).decode("utf-8", errors="replace")
+        body = msg_data.get("body")
+        sdk = _sdk() if body else None
+        if sdk is None:
+            return ""
+        cell = sdk.Cell.one_from_boc(base64.b64decode(body))
+        if cell.bits.get_used_bits() < 32:
+            return ""
+        data = cell.begin_parse()
+        if data.read_uint(32) != 0:
+            return "" # Not a text comment (binary payload)
+        chunks = [data.read_bytes((cell.bits.get_used_bits() - 32) // 8)]
+        while cell.refs:
+            cell = cell.refs[0]
+            chunks.append(cell.begin_parse().read_bytes(cell.bits.get_used_bits() // 8))
+        return b"".join(chunks).decode("utf-8", errors="replace")
+    except Exception:
+        return ""
+
+# Wallet v4 messages carry valid_until = now + 60s (tonsdk default)
+WALLET_MESSAGE_TTL = 60
+
+# Max outgoing messages per external message, per wallet contract
+# (v4r2 keeps up to 4 actions; highload v2 keeps up to 254 in a dict)
+WALLET_OUTPUT_LIMITS = {"v4r2": 4, "hv2": 254}
+
+# Mode 3: pay fees separately, ignore errors (tonsdk default for transfers)
+PAYOUT_SEND_MODE = 3
+
+@dataclass(frozen=True)
+class TransferOrder:
+    """One outgoing payout inside a (possibly multi-output) wallet message."""
+    destination: str
+    amount: float # TON
+    memo: str = ""
+
+@dataclass(frozen=True)
+class BatchSend:
+    """
+    Outcome of one payout message broadcast.
+    - accepted:  toncenter took the message.
+    - ambiguous: the signed message was handed to toncenter but no clear
+      answer came back (timeout, dropped connection, gateway error page).
+      It may still land before it expires: never re-send it, let the chain
+      decide (see `src.workers.payouts.confirm_payouts`).
+    Neither: explicitly rejected or never broadcast, safe to retry.
+    """
+    batch_ref: Optional[str] = None # "seqno:<n>" / "query:<id>" once signed
+    accepted: bool = False
+    ambiguous: bool = False
+
+@functools.lru_cache(maxsize=4)
+def derive_wallet(mnemonic: str, version: str = "v4r2"):
+    """
+    [PERF]: Derives the payout wallet from the mnemonic once per process.
+    Key derivation (PBKDF2 + ed25519) is expensive; the result never changes.
+    """
+    # Using from_mnemonics returns (mnemonics, pub_key, priv_key, wallet)
+    # V4R2 is the standard (Tonkeeper default); hv2 is the highload v2 contract
+    sdk = _sdk()
+    _, _, _, wallet = sdk.Wallets.from_mnemonics(
+        mnemonic.split(),
+        version=sdk.WalletVersionEnum(version),
+        workchain=0
+    )
+    return wallet
+
+def is_valid_address(address: str) -> bool:
+    """True if tonsdk can parse `address` (raw or user-friendly form)."""
+    try:
+        _sdk().Address(address)
+        return True
+    except Exception:
+        return False
+
+def raw_address(address: str) -> str:
+    """
+    Canonical raw form ("0:<hex>") so user-friendly variants (bounceable or
+    not, url-safe or not) of one account compare equal.
+    """
+    try:
+        return _sdk().Address(address).to_string(False)
+    except Exception:
+        return address
+
+def _order_cell(order: TransferOrder):
+    """Internal message for one payout, with the memo as a text comment."""
+    sdk = _sdk()
+    payload = sdk.Cell()
+    if order.memo:
+        payload.bits.write_uint(0, 32)
+        payload.bits.write_string(order.memo)
+    header = sdk.Contract.create_internal_message_header(
+        sdk.Address(order.destination), decimal.Decimal(int(order.amount * 1_000_000_000))
+    )
+    return sdk.Contract.create_common_msg_info(header, None, payload)
+
+class SeqnoManager:
+    """
+    [PAYOUTS]: Local seqno tracking for the hot wallet.
+    - The next seqno is kept in memory and advanced after each accepted send,
+      so back-to-back payouts skip the `runGetMethod seqno` round trip.
+    - `lock` serializes payouts: two concurrent sends can never sign the same seqno.
+    - The chain is only asked again after an error (`invalidate()`); a resync
+      never goes below a seqno we already broadcast while that message can
+      still land (WALLET_MESSAGE_TTL), so a stale read can't cause a collision.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[int]], message_ttl: float = WALLET_MESSAGE_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.lock = asyncio.Lock()
+        self._fetch = fetch
+        self._message_ttl = message_ttl
+        self._clock = clock
+        self._next: Optional[int] = None
+        self._floor = 0
+        self._floor_expires = 0.0
+
+    async def next(self) -> int:
+        """
+        Seqno for the next message (caller must hold `lock`).
+        """
+        if self._next is None:
+            await self.resync()
+        return self._next
+
+    async def resync(self):
+        chain_seqno = await self._fetch()
+        if self._clock() < self._floor_expires:
+            chain_seqno = max(chain_seqno, self._floor)
+        self._next = chain_seqno
+
+    def mark_sent(self, seqno: int):
+        """
+        Records an accepted broadcast with `seqno`.
+        """
+        self._next = seqno + 1
+        self._floor = seqno + 1
+        self._floor_expires = self._clock() + self._message_ttl
+
+    def invalidate(self):
+        """
+        Forces a resync from chain before the next send (after errors).
+        """
+        self._next = None
 
 class TonGateway:
     """
     [PAYMENT GATEWAY]: Real-Time Blockchain Interaction.
+    [PERF]: Owns one long-lived aiohttp session (keep-alive pool, DNS cache),
+    so calls to toncenter skip TCP+TLS setup. Call `start()`/`close()` from
+    the app lifespan; the session is also created lazily on first use.
     """
     
-    def __init__(self, wallet_address: str, api_key: str = ""):
+    def __init__(self, wallet_address: str, api_key: str = "", base_url: Optional[str] = None):
         self.wallet_address = wallet_address
         self.api_key = api_key
         self.logger = app_logger
-        # Testnet URL
-        self.base_url = "https://testnet.toncenter.com/api/v2"
+        # Testnet URL by default (TONCENTER_URL)
+        self.base_url = (base_url or settings.TONCENTER_URL).rstrip("/")
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._seqno: Optional[SeqnoManager] = None
+
+    async def start(self):
+        """
+        Opens the shared HTTP session with a tuned connector.
+        """
+        if self._http is not None and not self._http.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=settings.TON_HTTP_POOL_SIZE,
+            limit_per_host=settings.TON_HTTP_LIMIT_PER_HOST,
+            ttl_dns_cache=300, # Seconds to cache DNS lookups
+            keepalive_timeout=30, # Keep idle connections for reuse
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=settings.TON_HTTP_TIMEOUT,
+            connect=settings.TON_HTTP_CONNECT_TIMEOUT,
+        )
+        headers = {"X-API-Key": self.api_key} if self.api_key else None
+        self._http = aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers)
+
+    async def close(self):
+        """
+        Closes the shared session (call on shutdown).
+        """
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+        self._http = None
+
+    async def _session(self) -> aiohttp.ClientSession:
+        if self._http is None or self._http.closed:
+            await self.start()
+        return self._http
 
     async def check_connection(self) -> bool:
-        async with aiohttp.ClientSession() as session:
-            try:
-                # Use getMasterchainInfo as health check
-                url = f"{self.base_url}/getMasterchainInfo"
-                async with session.get(url) as resp:
-                    return resp.status == 200
-            except Exception:
-                return False
+        session = await self._session()
+        try:
+            # Use getMasterchainInfo as health check
+            url = f"{self.base_url}/getMasterchainInfo"
+            async with session.get(url) as resp:
+                return resp.status == 200
+        except Exception:
+            return False
 
     async def generate_payment_link(self, deal_id: int, amount: float) -> str:
         nanoton = int(amount * 1_000_000_000)
         # Deep Link for Tonkeeper
         return f"ton://transfer/{self.wallet_address}?amount={nanoton}&text={deal_id}"
 
-    async def check_for_payment(self, deal_id: int, expected_amount: float) -> Optional[str]:
+    async def get_transactions(self, address: Optional[str] = None, limit: int = 50,
+                               lt: Optional[int] = None, tx_hash: Optional[str] = None,
+                               to_lt: Optional[int] = None) -> List[dict]:
         """
-        Polls for incoming payment with Comment = deal_id
+        One page of `getTransactions`, newest first.
+        Pass `lt` + `tx_hash` of the last tx seen to continue to older pages;
+        `to_lt` stops the listing at that logical time.
+
+        Raises:
+            RuntimeError: On HTTP or API errors (callers retry on the next tick).
         """
-        self.logger.info(f"Checking TON for Deal {deal_id}...")
-        
-        url = f"{self.base_url}/getTransactions"
         params = {
-            "address": self.wallet_address,
-            "limit": 20,
+            "address": address or self.wallet_address,
+            "limit": limit,
             "archival": "true",
-            "api_key": self.api_key
         }
-        
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(url, params=params) as resp:
-                    if resp.status != 200:
-                        return None
-                        
-                    data = await resp.json()
-                    if not data.get("ok"): 
-                        return None
-                        
-                    for tx in data.get("result", []):
-                        in_msg = tx.get("in_msg", {})
-                        if not in_msg: continue
-                        
-                        # Verify Amount
-                        value = int(in_msg.get("value", 0))
-                        expected_nano = int(expected_amount * 1_000_000_000)
-                        
-                        # Allow 0.05 TON variance (gas) or partial pay (MVP: strict)
-                        if value < expected_nano:
-                            continue
-
-                        # Verify Comment (Deal ID)
-                        # TonCenter returns message text in 'message' if decoded, or we check msg_data
-                        # For MVP we trust the transaction if it matches amount closely logic or ID
-                        # Real Prod: Decode base64 body
-                        msg_txt = in_msg.get("message", "")
-                        
-                        # [MVP-SHORTCUT]: If comment contains ID or Amount Valid
-                        if str(deal_id) in msg_txt or value >= expected_nano:
-                            tx_hash = tx.get("transaction_id", {}).get("hash")
-                            self.logger.info(f"Payment Found! Tx: {tx_hash}")
-                            return tx_hash
-                            
-            except Exception as e:
-                self.logger.error(f"TON Poll Error: {e}")
-                
-        return None
+        if lt is not None and tx_hash:
+            params["lt"] = lt
+            params["hash"] = tx_hash
+        if to_lt is not None:
+            params["to_lt"] = to_lt
+
+        session = await self._session()
+        async with session.get(f"{self.base_url}/getTransactions", params=params) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"getTransactions HTTP {resp.status}")
+            data = await resp.json()
+        if not data.get("ok"):
+            raise RuntimeError(f"getTransactions failed: {data.get('error')}")
+        return data.get("result", [])
+
+    @property
+    def wallet_version(self) -> str:
+        return settings.WALLET_VERSION
+
+    @property
+    def payout_address(self) -> Optional[str]:
+        """
+        Address of the wallet that signs payouts (derived from WALLET_MNEMONIC
+        and WALLET_VERSION), or None without a mnemonic. Payouts leave from
+        this account, which need not be `wallet_address`.
+        """
+        if not settings.WALLET_MNEMONIC or _sdk() is None:
+            return None
+        wallet = derive_wallet(settings.WALLET_MNEMONIC, self.wallet_version)
+        return wallet.address.to_string(True, True, True)
+
+    @property
+    def max_outputs(self) -> int:
+        """Payouts that fit into one external message for the payout wallet."""
+        return WALLET_OUTPUT_LIMITS[self.wallet_version]
+
+    @property
+    def sequential(self) -> bool:
+        """
+        True for seqno wallets (v4r2): a new message only lands after the
+        previous one, so callers should keep one batch in flight at a time.
+        Highload wallets use query IDs and accept messages in parallel.
+        """
+        return self.wallet_version != "hv2"
 
     async def send_ton_transfer(self, destination: str, amount: float, memo: str) -> Optional[str]:
         """
         [PAYOUT ENGINE]: Signs and sends a transaction using the Server Mnemonic.
         """
+        self.logger.info(f"Initiating Payout: {amount} TON -> {destination} (Memo: {memo})")
+        result = await self.send_ton_batch([TransferOrder(destination, amount, memo)])
+        # An ambiguous send may still land: report it as pending, never as failed
+        return "pending_hash" if result.accepted or result.ambiguous else None # Hash not returned by sendBoc immediately usually
+
+    async def send_ton_batch(self, orders: List[TransferOrder]) -> BatchSend:
+        """
+        [PAYOUT ENGINE]: Pays several recipients with ONE external message.
+
+        Args:
+            orders (List[TransferOrder]): At most `max_outputs` payouts.
+
+        Returns:
+            BatchSend: Accepted, ambiguous (may have been broadcast) or not sent.
+        """
         # Guard check for TONSDK availability
-        if not TONSDK_AVAILABLE:
+        if _sdk() is None:
             self.logger.error("Cannot send payment: TONSDK not available")
-            return None
+            return BatchSend()
             
         mnemonic_str = settings.WALLET_MNEMONIC
         if not mnemonic_str:
             self.logger.error("Cannot send payment: No WALLET_MNEMONIC in .env")
-            return None
+            return BatchSend()
+
+        if not orders or len(orders) > self.max_outputs:
+            raise ValueError(f"A {self.wallet_version} message carries 1..{self.max_outputs} payouts, got {len(orders)}")
 
-        self.logger.info(f"Initiating Payout: {amount} TON -> {destination} (Memo: {memo})")
-        
         try:
-            # 1. Init Wallet from existing mnemonic
-            mnemonics = mnemonic_str.split()
-            
-            # Using from_mnemonics returns (mnemonics, pub_key, priv_key, wallet)
-            # Use V4R2 as standard (Tonkeeper default)
-            _, pub_k, priv_k, wallet = Wallets.from_mnemonics(
-                mnemonics, 
-                version=WalletVersionEnum.v4r2, 
-                workchain=0
-            )
-            
-            # 2. Get Seqno (Required for replay protection)
-            seqno = await self._get_seqno(wallet.address.to_string(True, True, True))
-            
-            # 3. Create Transfer Message
-            # Amount in Nano
-            nano_amount = int(amount * 1_000_000_000)
-            
-            query = wallet.create_transfer_message(
-                to_addr=destination,
-                amount=nano_amount,
-                seqno=seqno,
-                payload=memo # Comment
-            )
-            
-            # 4. Serialize to BOC
-            boc = bytes_to_b64str(query["message"].to_boc(False))
-            
-            # 5. Broadcast
-            url = f"{self.base_url}/sendBoc"
-            payload = {"boc": boc}
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as resp:
-                    resp_text = await resp.text()
-                    self.logger.info(f"SendBoc Response: Status={resp.status}")
-                    if resp.status == 200:
-                         import json
-                         res_data = json.loads(resp_text)
-                         if res_data.get("ok"):
-                             self.logger.info("Payout Sent Successfully!")
-                             return "pending_hash" # Hash not returned by sendBoc immediately usually
-                         else:
-                             self.logger.error(f"SendBoc Failed: {res_data}")
-                    else:
-                        self.logger.error(f"SendBoc HTTP Error: {resp.status} | Body: {resp_text}")
-                        
+            # Wallet from the process-wide cache (derived once)
+            wallet = derive_wallet(mnemonic_str, self.wallet_version)
+            if self.wallet_version == "hv2":
+                return await self._send_highload(wallet, orders)
+            return await self._send_seqno(wallet, orders)
         except Exception as e:
+            # Raised before the broadcast (`_send_boc` never raises): nothing left the process
+            if self._seqno is not None:
+                self._seqno.invalidate()
             self.logger.error(f"Payout Exception: {e}")
+            return BatchSend()
+
+    async def _send_seqno(self, wallet, orders: List[TransferOrder]) -> BatchSend:
+        """v4r2: up to 4 outputs, replay-protected by the wallet seqno."""
+        if self._seqno is None:
+            wallet_address = wallet.address.to_string(True, True, True)
+            self._seqno = SeqnoManager(lambda: self._get_seqno(wallet_address))
+
+        # [CONCURRENCY]: One payout message at a time per wallet; seqno is local
+        async with self._seqno.lock:
+            # Get Seqno (Required for replay protection)
+            seqno = await self._seqno.next()
+
+            # One signing message, one (send_mode, order) action per payout
+            signing_message = wallet.create_signing_message(seqno)
+            for order in orders:
+                signing_message.bits.write_uint8(PAYOUT_SEND_MODE)
+                signing_message.refs.append(_order_cell(order))
+            query = wallet.create_external_message(signing_message, seqno)
+
+            # Serialize to BOC and broadcast
+            batch_ref = f"seqno:{seqno}"
+            accepted = await self._send_boc(_sdk().bytes_to_b64str(query["message"].to_boc(False)))
+            if accepted is None:
+                # May land: keep the seqno reserved until the message expires
+                self._seqno.mark_sent(seqno)
+                return BatchSend(batch_ref, ambiguous=True)
+            if accepted:
+                self._seqno.mark_sent(seqno)
+                self.logger.info(f"Payout Sent Successfully! (seqno={seqno}, outputs={len(orders)})")
+                return BatchSend(batch_ref, accepted=True)
+            # Rejected (often a seqno mismatch): ask the chain next time
+            self._seqno.invalidate()
+        return BatchSend(batch_ref)
+
+    async def _send_highload(self, wallet, orders: List[TransferOrder]) -> BatchSend:
+        """hv2: up to 254 outputs; query IDs instead of a seqno, so no lock."""
+        # Upper 32 bits = expiry (the contract rejects stale IDs), lower 32 = unique
+        query_id = ((int(time.time()) + WALLET_MESSAGE_TTL) << 32) | random.getrandbits(32)
+        recipients = [
+            {"address": o.destination, "amount": int(o.amount * 1_000_000_000),
+             "payload": o.memo, "send_mode": PAYOUT_SEND_MODE}
+            for o in orders
+        ]
+        # timeout=0: the ID already carries its expiry (tonsdk would re-derive it)
+        query = wallet.create_transfer_message(recipients, query_id, timeout=0)
+        batch_ref = f"query:{query_id}"
+        accepted = await self._send_boc(_sdk().bytes_to_b64str(query["message"].to_boc(False)))
+        if accepted:
+            self.logger.info(f"Payout Sent Successfully! (query_id={query_id}, outputs={len(orders)})")
+        return BatchSend(batch_ref, accepted=bool(accepted), ambiguous=accepted is None)
+
+    async def _send_boc(self, boc: str) -> Optional[bool]:
+        """
+        Broadcasts a signed external message. Never raises.
+        Returns True if toncenter accepted it, False if it explicitly rejected
+        it (an API error reply), None without a clear answer (timeout, dropped
+        connection, gateway error page): the message may be on its way.
+        """
+        url = f"{self.base_url}/sendBoc"
+        payload = {"boc": boc}
+
+        try:
+            session = await self._session()
+        except Exception as e:
+            self.logger.error(f"SendBoc not attempted: {e}")
+            return False
+        try:
+            async with session.post(url, json=payload) as resp:
+                status = resp.status
+                resp_text = await resp.text()
+        except Exception as e:
+            self.logger.error(f"SendBoc: no answer ({e!r}); the message may still land")
             return None
-            
-        return None
+        self.logger.info(f"SendBoc Response: Status={status}")
+        try:
+            res_data = json.loads(resp_text)
+        except ValueError:
+            res_data = None
+        if not isinstance(res_data, dict) or status == 504:
+            # Proxy/gateway error, not toncenter's verdict on the message
+            self.logger.error(f"SendBoc HTTP Error: {status} | Body: {resp_text}")
+            return None
+        if res_data.get("ok"):
+            return True
+        self.logger.error(f"SendBoc Failed: {status} | {res_data}")
+        return False
 
     async def _get_seqno(self, address: str) -> int:
-        """Helper to get wallet sequence number"""
+        """
+        Helper to get wallet sequence number.
+        Returns 0 for an undeployed wallet; raises on HTTP/API errors so a
+        failed lookup is never mistaken for seqno 0.
+        """
         url = f"{self.base_url}/runGetMethod"
         payload = {
             "address": address,
             "method": "seqno",
             "stack": []
         }
-        async with aiohttp.ClientSession() as session:
-             async with session.post(url, json=payload) as resp:
-                 if resp.status == 200:
-                     data = await resp.json()
-                     if data.get("ok"):
-                         # Logica de stack parsing para TonCenter
-                         # stack: [['num', '0x123']]
-                         stack = data.get("result", {}).get("stack", [])
-                         if stack and stack[0][0] == 'num':
-                             return int(stack[0][1], 16)
+        session = await self._session()
+        async with session.post(url, json=payload) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"runGetMethod seqno HTTP {resp.status}")
+            data = await resp.json()
+        if not data.get("ok"):
+            raise RuntimeError(f"runGetMethod seqno failed: {data.get('error')}")
+        # Logica de stack parsing para TonCenter
+        # stack: [['num', '0x123']]
+        stack = data.get("result", {}).get("stack", [])
+        if stack and stack[0][0] == 'num':
+            return int(stack[0][1], 16)
         return 0
+
+
+# Process-wide gateway sharing one connection pool (see `get_ton_gateway`)
+_gateway: Optional[TonGateway] = None
+
+def get_ton_gateway() -> TonGateway:
+    """
+    Returns the process-wide TonGateway for the hot wallet.
+    """
+    global _gateway
+    if _gateway is None:
+        _gateway = TonGateway(settings.TON_WALLET_ADDRESS, settings.TONCENTER_API_KEY)
+    return _gateway
@@ -0,0 +1,150 @@
+"""
+[LEGO BLOCK: STATE MACHINE]
+Declarative deal transitions, applied as ONE conditional statement:
+
+    UPDATE deal SET status = CASE status WHEN <from> THEN <to> ... END, ...
+    WHERE id = :id AND status IN (<from>...) RETURNING deal.*
+
+The status check and the write are atomic, so two concurrent requests can
+never both pass the check (the loser matches no row). No SELECT precedes the
+write; a second SELECT only runs to explain a refusal. Successful moves are
+appended to the deal event log (see `src.services.events`) in the same
+transaction.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence
+
+from sqlalchemy import case, literal, update
+from sqlmodel import select
+
+from src.db.models import Deal, DealStatus
+from src.services.events import DealChange, record_changes
+
+
+class InvalidTransition(ValueError):
+    """The deal does not exist or is not in a status the transition accepts."""
+
+
+@dataclass(frozen=True)
+class Transition:
+    """
+    One named move of the escrow state machine.
+
+    Attributes:
+        name: Action name (used in errors/logs).
+        moves: {current status: next status}; only these statuses may move.
+        on_enter: Extra column values applied only when entering a given
+            target status, e.g. {SCHEDULED: {"scheduled_at": NOW}}.
+    """
+    name: str
+    moves: Dict[DealStatus, DealStatus]
+    on_enter: Dict[DealStatus, Dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def sources(self):
+        return tuple(self.moves)
+
+
+# Placeholder for "the transaction's wall-clock time" in `on_enter` values
+NOW = object()
+
+# [STATE MACHINE]: The whole escrow lifecycle in one table.
+TRANSITIONS: Dict[str, Transition] = {t.name: t for t in (
+    # Owner accepts: pre-paid deals launch immediately, post-paid go to payment
+    Transition("accept", {
+        DealStatus.CREATED: DealStatus.AWAITING_PAYMENT,
+        DealStatus.LOCKED: DealStatus.SCHEDULED,
+    }, on_enter={DealStatus.SCHEDULED: {"scheduled_at": NOW}}),
+    Transition("reject", {
+        DealStatus.CREATED: DealStatus.REJECTED,
+        DealStatus.LOCKED: DealStatus.REJECTED,
+    }),
+    Transition("submit_draft", {
+        DealStatus.ACCEPTED: DealStatus.DRAFT_SUBMITTED,
+        DealStatus.REVISION_REQUESTED: DealStatus.DRAFT_SUBMITTED,
+    }),
+    Transition("approve_draft", {
+        DealStatus.DRAFT_SUBMITTED: DealStatus.AWAITING_PAYMENT,
+    }),
+    Transition("request_revision", {
+        DealStatus.DRAFT_SUBMITTED: DealStatus.REVISION_REQUESTED,
+    }),
+    # Payment: post-paid deals auto-schedule, pre-paid wait for the owner
+    Transition("lock_funds", {
+        DealStatus.AWAITING_PAYMENT: DealStatus.SCHEDULED,
+        DealStatus.CREATED: DealStatus.LOCKED,
+    }, on_enter={DealStatus.SCHEDULED: {"scheduled_at": NOW}}),
+    Transition("schedule", {
+        DealStatus.LOCKED: DealStatus.SCHEDULED,
+    }),
+    # Publisher: only the worker holding the deal's lease may publish it
+    Transition("publish", {
+        DealStatus.SCHEDULED: DealStatus.PUBLISHED,
+    }, on_enter={DealStatus.PUBLISHED: {"published_at": NOW}}),
+    Transition("complete", {
+        DealStatus.PUBLISHED: DealStatus.COMPLETED,
+    }),
+)}
+
+
+def _typed(column, value):
+    # Enum literals must go through the column type (stored by name)
+    return literal(value, column.type)
+
+
+def transition_statement(transition: Transition, deal_id: int, now: datetime,
+                         values: Optional[Dict[str, Any]] = None, where: Sequence = ()):
+    """
+    Builds the conditional UPDATE ... RETURNING for one transition.
+    `values` are written on every successful move; `where` adds conditions
+    the row must also meet (e.g. the caller still holds the deal's lease).
+    """
+    status = Deal.__table__.c.status
+    moves = list(transition.moves.items())
+    if len(set(transition.moves.values())) == 1:
+        new_status = _typed(status, moves[0][1])
+    else:
+        new_status = case(*((status == source, _typed(status, target)) for source, target in moves))
+
+    assignments = {"status": new_status, "updated_at": now, **(values or {})}
+    for target, extra in transition.on_enter.items():
+        entering = [source for source, to in moves if to == target]
+        for name, value in extra.items():
+            column = Deal.__table__.c[name]
+            value = now if value is NOW else value
+            assignments[name] = case((status.in_(entering), _typed(column, value)), else_=column)
+
+    return (
+        update(Deal)
+        .where(Deal.id == deal_id, Deal.status.in_(transition.sources), *where)
+        .values(**assignments)
+        .returning(Deal)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def apply_transition(session, name: str, deal_id: int,
+                           values: Optional[Dict[str, Any]] = None,
+                           now: Optional[datetime] = None) -> Deal:
+    """
+    Moves `deal_id` through transition `name` in one statement and logs the
+    event (caller commits).
+
+    Raises:
+        InvalidTransition: If the deal is missing or in the wrong status.
+    """
+    transition = TRANSITIONS[name]
+    now = now or datetime.utcnow()
+    statement = transition_statement(transition, deal_id, now, values)
+    result = await session.scalars(statement, execution_options={"populate_existing": True})
+    deal = result.first()
+    if deal is not None:
+        await record_changes(session, [DealChange.from_deal(deal)], now)
+        return deal
+
+    # Refused: one extra read, only to produce a useful error
+    current = (await session.exec(select(Deal.status).where(Deal.id == deal_id))).first()
+    if current is None:
+        raise InvalidTransition("Deal not found")
+    raise InvalidTransition(f"Cannot {name.replace('_', ' ')} deal in status {current.value}")
@@ -25,8 +25,18 @@ export async function fetchUserChannels(userId) {
     return res.json();
 }
 
-export async function fetchUserDeals(userId) {
-    const res = await fetchWithHeaders(`/api/deals/user/${userId}`);
+export async function fetchUserDealsPage(userId, role, cursor = null, limit = 20) {
+    // [PAGINATION]: One page; pass `nextCursor` back for the following one (null on the last)
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (role) params.set('role', role);
+    if (cursor) params.set('cursor', cursor);
+    const res = await fetchWithHeaders(`/api/deals/user/${userId}?${params}`);
+    return { deals: await res.json(), nextCursor: res.headers.get('X-Next-Cursor') };
+}
+
+export async function fetchDeal(id) {
+    const res = await fetchWithHeaders(`/api/deals/${id}`);
+    if (!res.ok) return null;
     return res.json();
 }
 
@@ -1,11 +1,11 @@
 /**
  * [CONTROLLERS]: Business Logic
  */
-import * as API from './api.js?v=25';
-import * as UI from './ui.js?v=25';
-import * as Wallet from './wallet.js?v=25';
-import { getUserId, getTg, safeAlert, safeMainButton } from './auth.js?v=25';
-import { ROLES, ESCROW_ADDRESS } from './config.js?v=25';
+import * as API from './api.js?v=26';
+import * as UI from './ui.js?v=26';
+import * as Wallet from './wallet.js?v=26';
+import { getUserId, getTg, safeAlert, safeMainButton } from './auth.js?v=26';
+import { ROLES, ESCROW_ADDRESS } from './config.js?v=26';
 
 const tg = getTg();
 
@@ -217,6 +217,8 @@ export async function loadMyChannels(container) {
 
 // [POLLING]: Removed in favor of Manual Refresh for stability
 let dealsPollingInterval = null;
+// [PAGINATION]: Loads the next page of deals when "Load more" scrolls into view
+let dealsPageObserver = null;
 
 export async function loadUserDeals(container, role) {
     const userId = getUserId();
@@ -227,12 +229,17 @@ export async function loadUserDeals(container, role) {
         clearInterval(dealsPollingInterval);
         dealsPollingInterval = null;
     }
+    if (dealsPageObserver) {
+        dealsPageObserver.disconnect();
+        dealsPageObserver = null;
+    }
 
     container.innerHTML = '<div class="state-message">Syncing deals...</div>';
     
     try {
-        const allDeals = await API.fetchUserDeals(userId);
-        const filtered = allDeals.filter(d => d.user_role === role);
+        // [PAGINATION]: Render the first page now, the rest on demand
+        const firstPage = await API.fetchUserDealsPage(userId, role);
+        const filtered = firstPage.deals.filter(d => d.user_role === role);
         
         container.innerHTML = '';
         
@@ -265,7 +272,9 @@ export async function loadUserDeals(container, role) {
         }
 
         const isAdvertiser = role === ROLES.ADVERTISER;
-        filtered.forEach(deal => {
+        const list = document.createElement('div');
+        container.appendChild(list);
+        const renderDeals = (deals) => deals.filter(d => d.user_role === role).forEach(deal => {
             const card = UI.renderDealCard(deal, isAdvertiser, {
                 onPay: async (id, amt) => {
                      try {
@@ -288,6 +297,13 @@ export async function loadUserDeals(container, role) {
                         safeAlert("Transaction cancelled.");
                      }
                 },
+                onLoadFull: async (id) => {
+                    showProgress();
+                    const full = await API.fetchDeal(id);
+                    hideProgress();
+                    if (!full) safeAlert("Error loading the full deal.");
+                    return full;
+                },
                 onAccept: async (id) => {
                     showProgress();
                     const res = await API.acceptDeal(id, userId);
@@ -350,8 +366,43 @@ export async function loadUserDeals(container, role) {
                 }
             });
 
-            container.appendChild(card);
+            list.appendChild(card);
         });
+        renderDeals(filtered);
+
+        let cursor = firstPage.nextCursor;
+        if (!cursor) return;
+        const moreBtn = document.createElement('button');
+        moreBtn.className = 'btn btn-sm btn-secondary';
+        moreBtn.style.cssText = "display:block; margin:10px auto;";
+        moreBtn.innerText = '⬇️ Load more';
+        let loading = false;
+        const loadMore = async () => {
+            if (loading || !cursor) return;
+            loading = true;
+            moreBtn.innerText = 'Loading...';
+            try {
+                const page = await API.fetchUserDealsPage(userId, role, cursor);
+                renderDeals(page.deals);
+                cursor = page.nextCursor;
+            } catch (e) {
+                safeAlert("Error loading more deals.");
+            }
+            loading = false;
+            moreBtn.innerText = '⬇️ Load more';
+            if (!cursor) {
+                if (dealsPageObserver) dealsPageObserver.disconnect();
+                moreBtn.remove();
+            }
+        };
+        moreBtn.onclick = loadMore;
+        container.appendChild(moreBtn);
+        if ('IntersectionObserver' in window) {
+            dealsPageObserver = new IntersectionObserver(entries => {
+                if (entries.some(entry => entry.isIntersecting)) loadMore();
+            });
+            dealsPageObserver.observe(moreBtn);
+        }
 
     } catch (e) {
         container.innerHTML = `<div class="state-message">Error loading deals.</div>`;
@@ -57,6 +57,16 @@ export function renderChannelCard(channel, isOwnerView, callbacks) {
     return card;
 }
 
+function dealBodyHtml(deal) {
+    // Only list previews carry these flags; a full deal has nothing cut
+    const briefMore = deal.brief_truncated ? '…' : '';
+    const draftMore = deal.draft_truncated ? '…' : '';
+    return `
+        <strong>Brief:</strong> ${escapeHtml(deal.ad_brief)}${briefMore}
+        ${deal.ad_draft ? `<div class="draft-box" style="background:#1a1a1a; padding:8px; border-radius:4px; margin-top:8px;"><strong>📝 Draft:</strong> ${escapeHtml(deal.ad_draft)}${draftMore}</div>` : ''}
+    `;
+}
+
 export function renderDealCard(deal, isAdvertiser, callbacks) {
     // [GROWTH]: Visual progress indicator
     const statusFlow = ['created', 'accepted', 'drafted', 'awaiting', 'locked', 'scheduled', 'published', 'completed'];
@@ -88,14 +98,39 @@ export function renderDealCard(deal, isAdvertiser, callbacks) {
         <div class="status-message" style="font-size:12px; color:#aaa; margin-bottom:8px;">
             ${statusMessages[deal.status.toLowerCase()] || '...'}
         </div>
-        <div class="deal-body">
-            <strong>Brief:</strong> ${escapeHtml(deal.ad_brief)}
-            ${deal.ad_draft ? `<div class="draft-box" style="background:#1a1a1a; padding:8px; border-radius:4px; margin-top:8px;"><strong>📝 Draft:</strong> ${escapeHtml(deal.ad_draft)}</div>` : ''}
-        </div>
+        <div class="deal-body">${dealBodyHtml(deal)}</div>
         <div class="deal-actions" style="margin-top:10px;"></div>
     `;
 
     const actions = card.querySelector('.deal-actions');
+    const body = card.querySelector('.deal-body');
+
+    // [PREVIEW]: The list cuts long briefs/drafts; load the full deal before showing or acting on it
+    let fullLoaded = !deal.truncated;
+    async function loadFullText() {
+        if (fullLoaded) return true;
+        const full = await callbacks.onLoadFull(deal.id);
+        if (!full) return false;
+        body.innerHTML = dealBodyHtml(full);
+        fullLoaded = true;
+        return true;
+    }
+    // First click on a truncated deal only reveals the full text; the next one acts
+    function afterFullText(btn, action) {
+        return async () => {
+            if (fullLoaded) return action();
+            if (await loadFullText()) btn.innerText += ' (full text above)';
+        };
+    }
+    if (deal.truncated) {
+        // Replaced with the body once the full text is in
+        const showFullBtn = document.createElement('button');
+        showFullBtn.className = 'btn btn-sm btn-secondary';
+        showFullBtn.style.marginTop = '6px';
+        showFullBtn.innerText = '📄 Show full text';
+        showFullBtn.onclick = loadFullText;
+        body.appendChild(showFullBtn);
+    }
 
     if (isAdvertiser) {
         // [FIX]: Correct flow - Approve/Revise on drafted, Pay on awaiting
@@ -104,7 +139,7 @@ export function renderDealCard(deal, isAdvertiser, callbacks) {
             const approveBtn = document.createElement('button');
             approveBtn.className = 'btn btn-sm';
             approveBtn.innerText = '✅ Approve Draft';
-            approveBtn.onclick = () => callbacks.onApprove(deal.id);
+            approveBtn.onclick = afterFullText(approveBtn, () => callbacks.onApprove(deal.id));
             
             const reviseBtn = document.createElement('button');
             reviseBtn.className = 'btn btn-sm btn-secondary';
@@ -132,7 +167,7 @@ export function renderDealCard(deal, isAdvertiser, callbacks) {
             const acceptBtn = document.createElement('button');
             acceptBtn.className = 'btn btn-sm';
             acceptBtn.innerText = deal.status === 'locked' ? '✅ Accept & Publish' : '✅ Accept Deal';
-            acceptBtn.onclick = () => callbacks.onAccept(deal.id);
+            acceptBtn.onclick = afterFullText(acceptBtn, () => callbacks.onAccept(deal.id));
             
             const rejectBtn = document.createElement('button');
             rejectBtn.className = 'btn btn-sm btn-secondary';
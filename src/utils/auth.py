@@ -1,21 +1,58 @@
+import functools
 import hashlib
 import hmac
 import json
+import time
 from urllib.parse import parse_qsl, parse_qs
 from typing import Dict, Any, Optional
 from fastapi import Header, HTTPException, status
 
+from src.core.cache import TTLCache
 from src.core.config import settings
 from src.core.logger import app_logger
 
+# [PERF]: initData strings already validated, keyed by (bot_token, init_data).
+# A Mini App sends the same string on every call of a session, so repeat
+# requests skip parsing + HMAC. Only valid results are stored.
+init_data_cache = TTLCache(
+    maxsize=settings.AUTH_CACHE_SIZE,
+    ttl=settings.AUTH_CACHE_TTL,
+    name="init_data",
+)
+
+@functools.lru_cache(maxsize=8)
+def _secret_key(bot_token: str) -> bytes:
+    """
+    HMAC key for initData: HMAC_SHA256("WebAppData", bot_token).
+    Depends only on the token, so it is derived once per process.
+    """
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+def _auth_date(parsed_data: Dict[str, str]) -> Optional[int]:
+    try:
+        return int(parsed_data["auth_date"])
+    except (KeyError, ValueError):
+        return None
+
 def validate_init_data(init_data: str, bot_token: str = settings.BOT_TOKEN) -> Optional[Dict[str, Any]]:
     """
     [LEGO BLOCK: SECURITY]
     Validates the `initData` string sent by Telegram Mini App.
     Returns the user data dict if valid, None otherwise.
+    Data older than INIT_DATA_MAX_AGE (by `auth_date`) is rejected.
     
     Ref: https://core.telegram.org/bots/webapps#validating-data-received-via-the-mini-app
     """
+    now = time.time()
+    key = (bot_token, init_data)
+    cached = init_data_cache.get(key)
+    if cached is not None:
+        user_data, expires_at = cached
+        if expires_at is None or now < expires_at:
+            return dict(user_data)
+        init_data_cache.pop(key)
+        return None
+
     try:
         parsed_data = dict(parse_qsl(init_data))
     except ValueError:
@@ -29,19 +66,30 @@ def validate_init_data(init_data: str, bot_token: str = settings.BOT_TOKEN) -> O
     # Sort keys alphabetically
     data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(parsed_data.items()))
     
-    # Calculate HMAC-SHA256
-    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
-    calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    # Calculate HMAC-SHA256 (secret derived once per token)
+    calculated_hash = hmac.new(_secret_key(bot_token), data_check_string.encode(), hashlib.sha256).hexdigest()
     
-    if calculated_hash == received_hash:
-        # Data is valid!
-        # Parse the 'user' JSON string inside
-        if "user" in parsed_data:
-            return json.loads(parsed_data["user"])
-        return parsed_data
-    
-    app_logger.warning("Invalid initData hash received!")
-    return None
+    # [SECURITY]: Constant-time comparison (no timing oracle on the hash)
+    if not hmac.compare_digest(calculated_hash.encode(), received_hash.encode()):
+        app_logger.warning("Invalid initData hash received!")
+        return None
+
+    # Data is valid! Check freshness
+    expires_at = None
+    if settings.INIT_DATA_MAX_AGE:
+        auth_date = _auth_date(parsed_data)
+        if auth_date is None or now - auth_date > settings.INIT_DATA_MAX_AGE:
+            app_logger.warning("Expired initData received!")
+            return None
+        expires_at = auth_date + settings.INIT_DATA_MAX_AGE
+
+    # Parse the 'user' JSON string inside
+    user_data = json.loads(parsed_data["user"]) if "user" in parsed_data else parsed_data
+
+    # Never trust a cached entry past its auth_date expiry
+    ttl = init_data_cache.ttl if expires_at is None else min(init_data_cache.ttl, expires_at - now)
+    init_data_cache.set(key, (user_data, expires_at), ttl=ttl)
+    return dict(user_data)
 
 async def get_current_user(x_telegram_init_data: str = Header(None)):
     """
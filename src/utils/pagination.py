@@ -0,0 +1,35 @@
+"""
+[LEGO BLOCK: PAGINATION]
+Opaque cursors for keyset (seek) pagination.
+
+A cursor is the sort key of the last row the client has seen, serialized as
+URL-safe base64 JSON. Clients must treat it as an opaque token.
+"""
+import base64
+import json
+from typing import Any, Dict
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """
+    Serializes the sort key of the last row into an opaque cursor.
+    """
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Parses a cursor produced by `encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed or tampered with.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
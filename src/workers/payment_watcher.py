@@ -0,0 +1,183 @@
+"""
+[PAYMENT WATCHER]: One incremental scan of the hot wallet for all deals.
+
+Replaces per-deal polling (O(deals x 20 txs) HTTP work that missed anything
+older than 20 txs). Each tick:
+1. Load the awaiting deals into an in-memory index {deal_id: expected nanoTON}.
+2. Page `getTransactions` from newest back to the persisted cursor (last lt/hash).
+3. Decode each incoming comment once and match it by deal ID and amount.
+4. Lock funds for matches, then advance the cursor - only once the scan
+   reached it. A backlog deeper than PAYMENT_WATCHER_MAX_PAGES keeps the old
+   cursor and stores a resume point (the oldest tx fetched); the next tick
+   pages on from there until the gap is closed.
+The same scan confirms outgoing payouts (see `src.workers.payouts`) when
+the hot wallet also signs them; otherwise a second watcher scans the payout
+wallet for confirmations only (`incoming=False`).
+"""
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlmodel import select
+
+from src.db.models import Deal, WalletCursor
+from src.core.config import settings
+from src.core.logger import app_logger
+from src.services.escrow import EscrowService
+from src.services.transitions import TRANSITIONS
+from src.services.ton import decode_comment
+from src.workers.payouts import confirm_payouts
+
+NANO = 1_000_000_000
+_DEAL_ID_RE = re.compile(r"\d+")
+
+# Statuses in which an incoming payment can lock a deal (the "lock_funds" transition)
+PAYABLE_STATUSES = TRANSITIONS["lock_funds"].sources
+
+
+def tx_id(tx: dict) -> Tuple[int, Optional[str]]:
+    ids = tx.get("transaction_id") or {}
+    return int(ids.get("lt", 0)), ids.get("hash")
+
+
+def match_payment(tx: dict, awaiting: Dict[int, int]) -> Optional[int]:
+    """
+    Returns the deal ID paid by `tx`, or None.
+    The comment must carry the deal ID and the value must cover the price.
+    """
+    in_msg = tx.get("in_msg") or {}
+    value = int(in_msg.get("value") or 0)
+    if not value:
+        return None
+    found = _DEAL_ID_RE.search(decode_comment(in_msg))
+    if not found:
+        return None
+    deal_id = int(found.group())
+    expected = awaiting.get(deal_id)
+    if expected is None or value < expected:
+        return None
+    return deal_id
+
+
+class PaymentWatcher:
+    """
+    Incremental watcher for one wallet (the hot wallet by default): incoming
+    payments lock deals (`incoming`), outgoing messages confirm payouts
+    (`payouts`). Each address keeps its own cursor.
+    """
+
+    def __init__(self, session, gateway, page_size: Optional[int] = None, max_pages: Optional[int] = None,
+                 address: Optional[str] = None, incoming: bool = True, payouts: bool = True):
+        self.session = session
+        self.gateway = gateway
+        self._address = address
+        self.incoming = incoming
+        self.payouts = payouts
+        self.page_size = page_size or settings.PAYMENT_WATCHER_PAGE_SIZE
+        self.max_pages = max_pages or settings.PAYMENT_WATCHER_MAX_PAGES
+        # Set by each scan: stopped at the cursor (not at `max_pages`), and
+        # whether that scan started at the newest tx (complete up to "now")
+        self.reached_cursor = True
+        self.caught_up = True
+        self.logger = app_logger
+
+    @property
+    def address(self) -> str:
+        return self._address or self.gateway.wallet_address
+
+    async def load_awaiting(self) -> Dict[int, int]:
+        statement = select(Deal.id, Deal.amount_ton).where(Deal.status.in_(PAYABLE_STATUSES))
+        rows = (await self.session.exec(statement)).all()
+        return {deal_id: int(round(amount * NANO)) for deal_id, amount in rows}
+
+    async def fetch_new_transactions(self, cursor: Optional[WalletCursor]) -> List[dict]:
+        """
+        Pages back until the cursor (or `max_pages`): from the newest tx, or
+        from the cursor's resume point when the previous scan was cut short.
+        Without a cursor (first run) only the newest page is taken, so the
+        watcher starts at "now" instead of replaying the wallet's history.
+        Sets `reached_cursor` and `caught_up` for the caller.
+        """
+        last_lt = cursor.last_lt if cursor else None
+        resuming = cursor is not None and cursor.scan_lt is not None
+        new: List[dict] = []
+        self.reached_cursor = cursor is None # First run: nothing older to reach
+        page_lt, page_hash = (cursor.scan_lt, cursor.scan_hash) if resuming else (None, None)
+        for _ in range(self.max_pages):
+            page = await self.gateway.get_transactions(
+                self.address, limit=self.page_size, lt=page_lt, tx_hash=page_hash, to_lt=last_lt
+            )
+            full_page = len(page) >= self.page_size
+            if page_lt is not None and page and tx_id(page[0]) == (page_lt, page_hash):
+                page = page[1:] # toncenter repeats the tx we paged from
+            for tx in page:
+                if last_lt is not None and tx_id(tx)[0] <= last_lt:
+                    self.reached_cursor = True
+                    break
+                new.append(tx)
+            if self.reached_cursor or not full_page or not page:
+                # A short page is the end of the wallet's history (or of `to_lt`)
+                self.reached_cursor = True
+                break
+            page_lt, page_hash = tx_id(page[-1])
+        else:
+            self.logger.warning(f"Payment watcher: backlog exceeds {self.max_pages} pages; continuing next tick")
+        # Complete up to "now" only for a fresh scan from the newest tx
+        # (without a cursor older history is skipped, so we can't claim it)
+        self.caught_up = self.reached_cursor and cursor is not None and not resuming
+        return new
+
+    async def poll(self) -> List[int]:
+        """
+        Runs one tick. Returns the IDs of deals whose funds were locked.
+        """
+        address = self.address
+        cursor = await self.session.get(WalletCursor, address)
+        resuming = cursor is not None and cursor.scan_lt is not None
+        awaiting = await self.load_awaiting() if self.incoming else {}
+        transactions = await self.fetch_new_transactions(cursor)
+        if not transactions and not resuming:
+            if self.payouts:
+                # Still lets expired, unconfirmed payouts be re-queued
+                await confirm_payouts(self.session, [], caught_up=self.caught_up)
+                await self.session.commit()
+            return []
+
+        escrow = EscrowService(self.session)
+        locked = []
+        # Oldest first, so the earliest payment wins if one deal is paid twice
+        for tx in reversed(transactions):
+            deal_id = match_payment(tx, awaiting)
+            if deal_id is None:
+                continue
+            tx_hash = tx_id(tx)[1]
+            try:
+                await escrow.lock_funds(deal_id, tx_hash)
+                locked.append(deal_id)
+                awaiting.pop(deal_id, None)
+                self.logger.info(f"Payment Found! Deal {deal_id} | Tx: {tx_hash}")
+            except Exception as e:
+                await self.session.rollback()
+                self.logger.warning(f"Payment watcher: could not lock deal {deal_id} ({tx_hash}): {e}")
+
+        # [PAYOUTS]: Outgoing messages of the same transactions
+        if self.payouts:
+            await confirm_payouts(self.session, transactions, caught_up=self.caught_up)
+
+        # Re-read: a rollback above expires previously loaded rows
+        cursor = await self.session.get(WalletCursor, address)
+        if cursor is None:
+            cursor = WalletCursor(address=address)
+        # Newest tx of the scan in progress (started this tick or an earlier one)
+        top = (cursor.scan_top_lt, cursor.scan_top_hash) if resuming else tx_id(transactions[0])
+        if self.reached_cursor:
+            cursor.last_lt, cursor.last_hash = top
+            cursor.scan_lt = cursor.scan_hash = cursor.scan_top_lt = cursor.scan_top_hash = None
+        else:
+            # Gap below the oldest fetched tx: keep `last_lt`, resume from there
+            cursor.scan_lt, cursor.scan_hash = tx_id(transactions[-1])
+            cursor.scan_top_lt, cursor.scan_top_hash = top
+        cursor.updated_at = datetime.utcnow()
+        self.session.add(cursor)
+        await self.session.commit()
+        return locked
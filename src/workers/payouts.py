@@ -0,0 +1,314 @@
+"""
+[PAYOUT OUTBOX]: Batched, retried and confirmed owner payouts.
+
+1. QUEUE   - the publisher inserts a `Payout` row in the same commit that marks
+             the deal PUBLISHED (cheap, transactional, no chain I/O). If the
+             owner had no wallet yet, `queue_missing_payouts` queues it once
+             one is linked.
+2. SEND    - `PayoutAggregator` flushes the queue on a size/time threshold.
+             Every worker runs it: payouts are first claimed with one
+             conditional UPDATE (QUEUED -> SENDING), and only the payouts a
+             worker won are broadcast, so none is sent by two workers. It
+             packs up to `gateway.max_outputs` payouts into one wallet message:
+             - v4r2: 4 payouts per seqno, one message in flight at a time.
+             - hv2 (highload v2): up to 254 payouts per message, several per flush.
+             Rejected broadcasts are retried with exponential backoff;
+             ambiguous ones (no answer from toncenter) are never re-sent
+             blindly, they wait for CONFIRM like any SENT payout.
+3. CONFIRM - a payment watcher on the wallet that signs the payouts (the
+             one derived from WALLET_MNEMONIC; the same scan as incoming
+             payments when that is the hot wallet) matches its outgoing
+             messages to SENT payouts, marks them CONFIRMED and completes
+             their deals.
+             SENT payouts never seen on chain are re-queued once their
+             message has expired, as are SENDING payouts left behind by a
+             worker that died mid-flush.
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import update
+from sqlmodel import select
+
+from src.db.dialect import upsert
+from src.db.models import Channel, Deal, DealStatus, Payout, PayoutStatus, User
+from src.core.config import settings
+from src.core.logger import app_logger
+from src.services.events import DealChange, record_changes
+from src.services.transitions import TRANSITIONS
+from src.services.ton import TransferOrder, decode_comment, is_valid_address, raw_address
+
+PAYOUT_MEMO = "TG-ADMC Payout #{deal_id}"
+_PAYOUT_MEMO_RE = re.compile(r"TG-ADMC Payout #(\d+)")
+NANO = 1_000_000_000
+
+
+def queue_payout(session, deal: Deal, destination: str) -> Payout:
+    """
+    [HOOK]: Adds the payout for `deal` to the caller's transaction (caller commits).
+    """
+    payout = Payout(
+        deal_id=deal.id,
+        destination=destination,
+        amount_ton=deal.amount_ton,
+        memo=PAYOUT_MEMO.format(deal_id=deal.id),
+    )
+    session.add(payout)
+    return payout
+
+
+async def queue_missing_payouts(session, limit: Optional[int] = None) -> int:
+    """
+    [SWEEP]: Queues the payout of PUBLISHED deals that have none because their
+    owner had no wallet at publish time, once the owner has linked one.
+    Commits. Returns the number of payouts queued.
+    """
+    statement = (
+        select(Deal.id, Deal.amount_ton, User.wallet_address)
+        .join(Channel, Channel.id == Deal.channel_id)
+        .join(User, User.id == Channel.owner_id)
+        .outerjoin(Payout, Payout.deal_id == Deal.id)
+        .where(Deal.status == DealStatus.PUBLISHED, Payout.id == None, User.wallet_address != None)
+        .order_by(Deal.scheduled_at, Deal.id) # ix_deal_due order: oldest first, no sort
+        .limit(limit or settings.PAYOUT_SWEEP_BATCH)
+    )
+    rows = (await session.exec(statement)).all()
+    if not rows:
+        return 0
+    # DO NOTHING: another worker's sweep may have queued some of them first
+    await session.execute(upsert(session, Payout, [
+        {"deal_id": deal_id, "destination": wallet, "amount_ton": amount,
+         "memo": PAYOUT_MEMO.format(deal_id=deal_id)}
+        for deal_id, amount, wallet in rows
+    ], ["deal_id"]))
+    await session.commit()
+    app_logger.info(f"Payouts: queued {len(rows)} late payout(s) for deals whose owner linked a wallet")
+    return len(rows)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff: base * 2^(attempts-1), capped."""
+    seconds = settings.PAYOUT_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, settings.PAYOUT_RETRY_MAX_SECONDS))
+
+
+class PayoutAggregator:
+    """
+    Sends queued payouts in multi-output batches.
+    A partial batch waits until PAYOUT_FLUSH_SIZE payouts are queued or the
+    oldest one has waited PAYOUT_MAX_DELAY_SECONDS.
+    """
+
+    def __init__(self, session, gateway, flush_size: Optional[int] = None,
+                 max_delay: Optional[float] = None, worker_id: Optional[str] = None):
+        self.session = session
+        self.gateway = gateway
+        self.worker_id = worker_id
+        self.flush_size = flush_size or settings.PAYOUT_FLUSH_SIZE
+        self.max_delay = timedelta(seconds=settings.PAYOUT_MAX_DELAY_SECONDS if max_delay is None else max_delay)
+        self.logger = app_logger
+
+    async def load_queued(self, now: datetime, limit: int) -> List[Payout]:
+        statement = (
+            select(Payout)
+            .where(
+                Payout.status == PayoutStatus.QUEUED,
+                (Payout.next_attempt_at == None) | (Payout.next_attempt_at <= now),
+            )
+            .order_by(Payout.id)
+            .limit(limit)
+        )
+        return list((await self.session.exec(statement)).all())
+
+    async def claim(self, queued: List[Payout], now: datetime) -> List[Payout]:
+        """
+        Moves the payouts of `queued` that are still QUEUED to SENDING for this
+        worker and commits. Returns the claimed payouts, reloaded: another
+        worker may have claimed (and broadcast) the others since they were read.
+        - Postgres: a concurrent UPDATE waits for the row lock, then re-checks
+          `status` and skips rows the other worker already moved.
+        - SQLite: the UPDATE runs under the database write lock.
+        """
+        result = await self.session.execute(
+            update(Payout)
+            .where(Payout.id.in_([p.id for p in queued]), Payout.status == PayoutStatus.QUEUED)
+            .values(status=PayoutStatus.SENDING, claimed_by=self.worker_id, sent_at=now)
+            .returning(Payout.id)
+            .execution_options(synchronize_session=False)
+        )
+        claimed = list(result.scalars().all())
+        await self.session.commit()
+        if not claimed:
+            return []
+        statement = (
+            select(Payout).where(Payout.id.in_(claimed)).order_by(Payout.id)
+            .execution_options(populate_existing=True)
+        )
+        return list((await self.session.exec(statement)).all())
+
+    def should_flush(self, queued: List[Payout], now: datetime) -> bool:
+        if not queued:
+            return False
+        if len(queued) >= self.flush_size:
+            return True
+        # Retries are already late: don't hold them back for a full batch
+        return any(p.attempts or p.created_at <= now - self.max_delay for p in queued)
+
+    def _release(self, payout: Payout):
+        """Returns a claimed, unsent payout to the queue."""
+        payout.status = PayoutStatus.QUEUED
+        payout.claimed_by = None
+        payout.sent_at = None
+        self.session.add(payout)
+
+    def _record_failure(self, payout: Payout, error: str, now: datetime):
+        self._release(payout)
+        payout.attempts += 1
+        payout.last_error = error
+        if payout.attempts >= settings.PAYOUT_MAX_ATTEMPTS:
+            payout.status = PayoutStatus.FAILED
+            self.logger.error(f"Payout {payout.id} (deal {payout.deal_id}) FAILED after {payout.attempts} attempts: {error}")
+        else:
+            payout.next_attempt_at = now + retry_delay(payout.attempts)
+
+    async def flush(self, now: Optional[datetime] = None, force: bool = False) -> int:
+        """
+        Sends whatever is due. Returns the number of payouts broadcast.
+        """
+        now = now or datetime.utcnow()
+        per_message = self.gateway.max_outputs
+        # Seqno wallets: one message per flush; the next seqno lands after it
+        messages = 1 if self.gateway.sequential else max(1, settings.PAYOUT_MESSAGES_PER_FLUSH)
+        queued = await self.load_queued(now, per_message * messages)
+        if not (force or self.should_flush(queued, now)):
+            return 0
+        # Only what this worker wins is broadcast
+        claimed = await self.claim(queued, now)
+
+        # Invalid destinations would make the whole message unsignable
+        sendable = []
+        for payout in claimed:
+            if is_valid_address(payout.destination):
+                sendable.append(payout)
+            else:
+                payout.status = PayoutStatus.FAILED
+                payout.last_error = "invalid destination address"
+                self.session.add(payout)
+                self.logger.error(f"Payout {payout.id} (deal {payout.deal_id}): invalid address {payout.destination}")
+
+        sent = handled = 0
+        for start in range(0, len(sendable), per_message):
+            batch = sendable[start:start + per_message]
+            handled += len(batch)
+            orders = [TransferOrder(p.destination, p.amount_ton, p.memo) for p in batch]
+            result = await self.gateway.send_ton_batch(orders)
+            if not (result.accepted or result.ambiguous):
+                # Back off; the rest of this flush would most likely fail too
+                for payout in batch:
+                    self._record_failure(payout, "broadcast rejected", now)
+                self.logger.error(f"Payout batch of {len(batch)} not broadcast, retrying later")
+                break
+            # Ambiguous sends are SENT too: a retry could pay twice. The watcher
+            # confirms them, or re-queues them once the message has expired.
+            for payout in batch:
+                payout.status = PayoutStatus.SENT
+                payout.batch_ref = result.batch_ref
+                payout.sent_at = now
+                payout.next_attempt_at = None
+                if result.ambiguous:
+                    payout.last_error = "broadcast unconfirmed"
+                self.session.add(payout)
+            # Commit per message so a later failure can't roll back what was broadcast
+            await self.session.commit()
+            sent += len(batch)
+            if result.ambiguous:
+                self.logger.warning(f"Payout batch {result.batch_ref} may not have been broadcast; "
+                                    "waiting for the chain before sending more")
+                break
+
+        # Claimed but not attempted (the flush stopped early): back to the queue
+        for payout in sendable[handled:]:
+            self._release(payout)
+        await self.session.commit()
+        if sent:
+            self.logger.info(f"Payouts: {sent} sent in {-(-sent // per_message)} message(s)")
+        return sent
+
+
+def match_payouts(tx: dict, sent: Dict[int, Payout]) -> List[Payout]:
+    """
+    Returns the SENT payouts (indexed by deal ID) carried by the outgoing
+    messages of `tx`. Memo, destination and amount must all agree.
+    """
+    matched = []
+    for out_msg in tx.get("out_msgs") or []:
+        found = _PAYOUT_MEMO_RE.search(decode_comment(out_msg))
+        if not found:
+            continue
+        payout = sent.get(int(found.group(1)))
+        if payout is None:
+            continue
+        if raw_address(out_msg.get("destination") or "") != raw_address(payout.destination):
+            continue
+        if int(out_msg.get("value") or 0) != int(payout.amount_ton * NANO):
+            continue
+        matched.append(payout)
+    return matched
+
+
+async def confirm_payouts(session, transactions: List[dict], now: Optional[datetime] = None,
+                          caught_up: bool = True) -> List[int]:
+    """
+    [CONFIRMATION]: Applies one watcher scan (newest first) to the ledger.
+    - Matched SENT payouts become CONFIRMED and their deals COMPLETED.
+      SENDING payouts count as sent: their worker may have broadcast them
+      and died before recording it.
+    - If the scan reached the present (`caught_up`), SENT/SENDING payouts
+      older than PAYOUT_CONFIRM_TIMEOUT_SECONDS never landed (their message
+      expired after 60s), so they are re-queued for a new attempt.
+    Caller's transaction; the caller commits. Returns confirmed deal IDs.
+    """
+    now = now or datetime.utcnow()
+    statement = select(Payout).where(Payout.status.in_((PayoutStatus.SENT, PayoutStatus.SENDING)))
+    sent = {payout.deal_id: payout for payout in (await session.exec(statement)).all()}
+    if not sent:
+        return []
+
+    confirmed = []
+    for tx in reversed(transactions):
+        for payout in match_payouts(tx, sent):
+            payout.status = PayoutStatus.CONFIRMED
+            payout.tx_hash = (tx.get("transaction_id") or {}).get("hash")
+            payout.confirmed_at = now
+            session.add(payout)
+            confirmed.append(sent.pop(payout.deal_id).deal_id)
+
+    if confirmed:
+        # Bulk form of the "complete" transition (same guarded source statuses)
+        complete = TRANSITIONS["complete"]
+        completed = await session.execute(
+            update(Deal)
+            .where(Deal.id.in_(confirmed), Deal.status.in_(complete.sources))
+            .values(status=complete.moves[DealStatus.PUBLISHED], updated_at=now)
+            .returning(Deal.id, Deal.channel_id, Deal.amount_ton)
+            .execution_options(synchronize_session=False)
+        )
+        await record_changes(session, [
+            DealChange(deal_id, channel_id, amount, DealStatus.COMPLETED)
+            for deal_id, channel_id, amount in completed.all()
+        ], now)
+        app_logger.info(f"Payouts confirmed on-chain for deals {confirmed}")
+
+    if caught_up:
+        expired_before = now - timedelta(seconds=settings.PAYOUT_CONFIRM_TIMEOUT_SECONDS)
+        for payout in sent.values():
+            if payout.sent_at and payout.sent_at <= expired_before:
+                app_logger.warning(f"Payout {payout.id} ({payout.batch_ref}) never landed; re-queued")
+                payout.status = PayoutStatus.QUEUED
+                payout.batch_ref = None
+                payout.claimed_by = None
+                payout.attempts += 1
+                payout.last_error = "not confirmed before message expiry"
+                session.add(payout)
+    return confirmed
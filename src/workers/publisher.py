@@ -0,0 +1,365 @@
+"""
+[PUBLISHING PIPELINE]: Batched, concurrent ad publishing.
+
+Stages:
+0. CLAIM   - atomically lease a batch of due deals to this worker, so several
+             workers/replicas never publish the same deal twice.
+1. LOAD    - one query fetches the claimed deals with their channel and owner.
+2. PUBLISH - Telegram sends run concurrently (bounded), honoring Telegram's
+             global and per-chat rate limits (one limiter per process,
+             shared by overlapping runs). No send starts after the lease
+             deadline (expiry minus PUBLISH_LEASE_MARGIN_SECONDS); those deals
+             go back to the queue unsent. No DB access here: an AsyncSession
+             must never be shared between concurrent tasks.
+3. COMMIT  - results are applied to the deals and committed in batches. Each
+             deal is finished with a conditional UPDATE that only matches
+             while this worker still holds its lease; a deal whose lease
+             lapsed (and may have been re-claimed) is left alone. Each
+             published deal queues its owner payout in the same transaction.
+             The deal stays PUBLISHED until that payout is confirmed on-chain
+             (see `src.workers.payouts`).
+Each stage is timed and the totals are logged per run.
+"""
+import asyncio
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import update
+from sqlmodel import select, or_
+
+from src.db.models import Deal, DealStatus, Channel, User
+from src.services.events import DealChange, record_changes
+from src.services.transitions import TRANSITIONS, transition_statement
+from src.workers.payouts import queue_payout
+from src.core.config import settings
+from src.core.logger import app_logger
+
+
+# Unique per process: host + pid + random suffix (pids repeat across containers)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+# Per-chat entries kept before expired ones are pruned
+RATE_LIMITER_MAX_KEYS = 1024
+
+
+class RateLimiter:
+    """
+    Async rate limiter: at most `rate` acquisitions per second overall and
+    at least `per_key_interval` seconds between acquisitions for the same key.
+    """
+
+    def __init__(self, rate: float, per_key_interval: float = 0.0):
+        self.min_gap = 1.0 / rate if rate > 0 else 0.0
+        self.per_key_interval = per_key_interval
+        self._next_slot = 0.0
+        self._next_for_key: Dict[int, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, key: Optional[int] = None):
+        # Reserve the slot under the lock, sleep outside it
+        async with self._lock:
+            now = time.monotonic()
+            if len(self._next_for_key) > RATE_LIMITER_MAX_KEYS:
+                # Long-lived limiter: forget chats whose interval has passed
+                self._next_for_key = {k: t for k, t in self._next_for_key.items() if t > now}
+            slot = max(now, self._next_slot)
+            if key is not None:
+                slot = max(slot, self._next_for_key.get(key, 0.0))
+                self._next_for_key[key] = slot + self.per_key_interval
+            self._next_slot = slot + self.min_gap
+        delay = slot - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# Process-wide limiter (see `get_rate_limiter`)
+_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Returns the process-wide Telegram send limiter. Pipeline runs started by
+    the timer, the reconcile job and the scheduler loop may overlap: they
+    must share one budget for the limits to hold per process.
+    """
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(settings.TELEGRAM_GLOBAL_RATE, settings.TELEGRAM_PER_CHAT_INTERVAL)
+    return _limiter
+
+
+def reset_rate_limiter():
+    """Drops the process-wide limiter; the next run rebuilds it from settings (tests)."""
+    global _limiter
+    _limiter = None
+
+
+@dataclass
+class PublishResult:
+    """Outcome of the network stage for one deal."""
+    deal_id: int
+    proof_link: Optional[str] = None
+    error: Optional[str] = None
+    attempted: bool = True # False: skipped before any send (lease deadline)
+
+
+@dataclass
+class PipelineMetrics:
+    """Per-stage timings (ms) and counters for one pipeline run."""
+    due: int = 0
+    published: int = 0
+    failed: int = 0
+    lost: int = 0 # Lease lapsed before the result was committed
+    stages_ms: Dict[str, float] = field(default_factory=lambda: {
+        "claim": 0.0, "load": 0.0, "publish": 0.0, "send": 0.0, "commit": 0.0,
+    })
+
+    def summary(self) -> str:
+        stages = " ".join(f"{name}={ms:.1f}ms" for name, ms in self.stages_ms.items())
+        return (f"due={self.due} published={self.published} failed={self.failed} "
+                f"lost={self.lost} | {stages}")
+
+
+# Last run metrics, for debugging from a shell or the admin API
+last_run_metrics: Optional[PipelineMetrics] = None
+
+
+def claim_statement(worker_id: str, now: datetime, limit: int, dialect: str):
+    """
+    [HOT QUERY]: Leases up to `limit` due, unclaimed (or lease-expired) deals.
+    - Postgres: candidates are locked with FOR UPDATE SKIP LOCKED, so
+      concurrent workers split the backlog instead of blocking each other.
+    - SQLite: the single UPDATE runs under the database write lock, which
+      already makes the status check + flip atomic.
+    """
+    candidates = (
+        select(Deal.id)
+        .where(
+            Deal.status == DealStatus.SCHEDULED,
+            Deal.scheduled_at <= now,
+            or_(Deal.lease_expires_at == None, Deal.lease_expires_at < now),
+        )
+        .order_by(Deal.scheduled_at, Deal.id)
+        .limit(limit)
+    )
+    if dialect == "postgresql":
+        candidates = candidates.with_for_update(skip_locked=True)
+
+    return (
+        update(Deal)
+        .where(Deal.id.in_(candidates))
+        .values(
+            claimed_by=worker_id,
+            lease_expires_at=now + timedelta(seconds=settings.PUBLISH_LEASE_SECONDS),
+        )
+        .returning(Deal.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def claim_limit() -> int:
+    """
+    Batch size a worker can publish within one lease at the global send rate.
+    Sends to a single busy chat are slower still; the lease deadline in the
+    PUBLISH stage covers that case.
+    """
+    window = max(settings.PUBLISH_LEASE_SECONDS - settings.PUBLISH_LEASE_MARGIN_SECONDS, 1)
+    return max(1, min(settings.PUBLISH_CLAIM_BATCH, int(window * settings.TELEGRAM_GLOBAL_RATE)))
+
+
+async def claim_due_deals(session, worker_id: str = WORKER_ID, now: Optional[datetime] = None,
+                          limit: Optional[int] = None) -> List[int]:
+    """
+    Claims a batch of due deals for `worker_id` and commits the lease.
+    Returns the claimed deal IDs.
+    """
+    now = now or datetime.utcnow()
+    statement = claim_statement(worker_id, now, limit or claim_limit(), session.bind.dialect.name)
+    result = await session.execute(statement)
+    deal_ids = list(result.scalars().all())
+    await session.commit()
+    return deal_ids
+
+
+def due_deals_statement(now: datetime, worker_id: Optional[str] = None):
+    """
+    [HOT QUERY]: Due deals joined with their channel and owner in one round trip.
+    With `worker_id`, only the deals currently leased to that worker.
+    """
+    statement = (
+        select(Deal, Channel, User)
+        .join(Channel, Deal.channel_id == Channel.id)
+        .outerjoin(User, Channel.owner_id == User.id)
+        .where(Deal.status == DealStatus.SCHEDULED, Deal.scheduled_at <= now)
+        .order_by(Deal.scheduled_at, Deal.id)
+    )
+    if worker_id:
+        statement = statement.where(Deal.claimed_by == worker_id, Deal.lease_expires_at >= now)
+    return statement
+
+
+def next_due_statement(now: datetime):
+    """
+    [HOT QUERY]: The earliest claimable SCHEDULED deal, as (id, scheduled_at).
+    Walks ix_deal_due in order and stops at the first row.
+    """
+    return (
+        select(Deal.id, Deal.scheduled_at)
+        .where(
+            Deal.status == DealStatus.SCHEDULED,
+            or_(Deal.lease_expires_at == None, Deal.lease_expires_at < now),
+        )
+        .order_by(Deal.scheduled_at, Deal.id)
+        .limit(1)
+    )
+
+
+async def publish_post(deal: Deal, channel: Channel, bot, limiter: RateLimiter,
+                       metrics: PipelineMetrics, deadline: Optional[float] = None) -> PublishResult:
+    """
+    Network stage for one deal: posts the ad, unless the lease deadline
+    (a `time.monotonic()` value) has passed by the time a send slot is free.
+    Never touches the DB session; the caller applies the result.
+    """
+    from aiogram.exceptions import TelegramRetryAfter
+
+    result = PublishResult(deal_id=deal.id)
+    app_logger.info(f"PUBLISHING AD: Deal {deal.id} to Channel {deal.channel_id}")
+
+    # [CORE ACTION]: Post the ad to the channel
+    content = deal.ad_draft or deal.ad_brief  # Fallback to brief if no draft
+    started = time.perf_counter()
+    try:
+        await limiter.acquire(channel.channel_id)
+        if deadline is not None and time.monotonic() >= deadline:
+            # Another worker may claim this deal once the lease lapses: never send
+            result.error = "lease deadline reached before send"
+            result.attempted = False
+            return result
+        try:
+            msg = await bot.send_message(channel.channel_id, content, parse_mode='HTML')
+        except TelegramRetryAfter as flood:
+            # Flood control: wait exactly as long as Telegram asks, retry once
+            app_logger.warning(f"Telegram flood control for chat {channel.channel_id}: retry in {flood.retry_after}s")
+            await asyncio.sleep(flood.retry_after)
+            msg = await bot.send_message(channel.channel_id, content, parse_mode='HTML')
+    except Exception as e:
+        result.error = f"send failed: {e}"
+        return result
+    finally:
+        metrics.stages_ms["send"] += (time.perf_counter() - started) * 1000
+
+    # [VERIFICATION]: Generate Proof Link
+    # If public channel, link format: t.me/username/id
+    result.proof_link = f"https://t.me/{channel.username}/{msg.message_id}" if channel.username else str(msg.message_id)
+
+    return result
+
+
+async def run_publish_pipeline(session, bot, now: Optional[datetime] = None,
+                               worker_id: str = WORKER_ID) -> PipelineMetrics:
+    """
+    Claims and publishes one batch of due deals. See module docstring for the
+    stage breakdown. `metrics.due` equals the claimed batch size, so callers
+    loop while it equals `claim_limit()` and the batch published something.
+    """
+    global last_run_metrics
+    metrics = PipelineMetrics()
+    now = now or datetime.utcnow()
+
+    # 0. CLAIM (the lease runs from `now`; sends stop short of its expiry)
+    started = time.perf_counter()
+    deadline = time.monotonic() + settings.PUBLISH_LEASE_SECONDS - settings.PUBLISH_LEASE_MARGIN_SECONDS
+    claimed = await claim_due_deals(session, worker_id, now)
+    metrics.stages_ms["claim"] = (time.perf_counter() - started) * 1000
+    if not claimed:
+        last_run_metrics = metrics
+        return metrics
+
+    # 1. LOAD
+    started = time.perf_counter()
+    rows = (await session.exec(due_deals_statement(now, worker_id).where(Deal.id.in_(claimed)))).all()
+    metrics.stages_ms["load"] = (time.perf_counter() - started) * 1000
+    metrics.due = len(claimed)
+    if not rows:
+        last_run_metrics = metrics
+        return metrics
+
+    # 2. PUBLISH (bounded concurrency, rate limited)
+    limiter = get_rate_limiter()
+    semaphore = asyncio.Semaphore(settings.PUBLISH_CONCURRENCY)
+
+    async def run_one(deal, channel, owner):
+        async with semaphore:
+            try:
+                return await publish_post(deal, channel, bot, limiter, metrics, deadline)
+            except Exception as e:
+                return PublishResult(deal_id=deal.id, error=str(e))
+
+    started = time.perf_counter()
+    results: List[PublishResult] = await asyncio.gather(
+        *(run_one(deal, channel, owner) for deal, channel, owner in rows)
+    )
+    metrics.stages_ms["publish"] = (time.perf_counter() - started) * 1000
+
+    # 3. COMMIT (batched)
+    started = time.perf_counter()
+    deals = {deal.id: (deal, channel, owner) for deal, channel, owner in rows}
+    batch_size = max(1, settings.PUBLISH_COMMIT_BATCH)
+    pending = 0
+    published: List[DealChange] = []
+    leased = (Deal.claimed_by == worker_id,)
+    release = {"claimed_by": None, "lease_expires_at": None}
+    for result in results:
+        _, channel, owner = deals[result.deal_id]
+        pending += 1
+        if result.error:
+            # Failed sends keep their lease: the deal is retried once it lapses
+            # (PUBLISH_LEASE_SECONDS backoff), not re-claimed in the same tick.
+            # Unattempted deals go straight back to the queue.
+            metrics.failed += 1
+            app_logger.error(f"Failed to publish ad {result.deal_id}: {result.error}")
+            if not result.attempted:
+                await session.execute(
+                    update(Deal).where(Deal.id == result.deal_id, *leased).values(**release)
+                    .execution_options(synchronize_session=False)
+                )
+            continue
+        # [LEASE CHECK]: Only the current lease holder may finish the deal
+        statement = transition_statement(
+            TRANSITIONS["publish"], result.deal_id, datetime.utcnow(),
+            values={"proof_link": result.proof_link, **release}, where=leased,
+        )
+        deal = (await session.scalars(statement, execution_options={"populate_existing": True})).first()
+        if deal is None:
+            metrics.lost += 1
+            app_logger.warning(f"Lease on deal {result.deal_id} lapsed before commit; "
+                               f"post {result.proof_link} left to the new lease holder")
+            continue
+        metrics.published += 1
+        # [AUTOMATION]: Auto-Release Funds (FULL amount for MVP transparency)
+        if owner and owner.wallet_address:
+            queue_payout(session, deal, owner.wallet_address)
+        else:
+            app_logger.error(f"Cannot pay owner {channel.owner_id}: No wallet connected. Deal {deal.id} stays "
+                             "PUBLISHED; its payout is queued once a wallet is linked.")
+        published.append(DealChange.from_deal(deal))
+        app_logger.info(f"Ad Published & Payout Queued: {deal.id} | Proof: {result.proof_link}")
+        if pending >= batch_size:
+            await record_changes(session, published)
+            await session.commit()
+            pending, published = 0, []
+    if pending:
+        await record_changes(session, published)
+        await session.commit()
+    metrics.stages_ms["commit"] = (time.perf_counter() - started) * 1000
+
+    last_run_metrics = metrics
+    app_logger.info(f"Worker: publish run finished | {metrics.summary()}")
+    return metrics
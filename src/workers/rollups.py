@@ -0,0 +1,159 @@
+"""
+[ANALYTICS ROLLUPS]: Folds the deal event log into `DealRollup` rows.
+
+Each run reads the events after the job's cursor (`RollupCursor`), in id
+order and in batches, and adds them to:
+- hourly + daily rows for the whole platform,
+- daily rows per channel and per advertiser.
+All-time (TOTAL) rows are kept for every scope, so unbounded queries read
+one row per platform/channel/advertiser. Each batch is aggregated in memory
+and applied as one executemany upsert, then the cursor moves forward in the
+same commit, so every event is counted exactly once. The cursor update is
+conditional on its previous value: if two workers race, the loser rolls back.
+
+Ids are handed out at INSERT but become visible at COMMIT, so a slow
+transaction can commit event 10 after event 11 was already folded; an id
+high-water mark would skip it forever. A run therefore stops at the first
+event younger than ANALYTICS_ROLLUP_LAG_SECONDS: everything below the
+cursor belongs to transactions that had that long to commit.
+
+Per event:
+- first event of a deal (from_status None) -> `created`, bucketed by the
+  deal's `created_at`;
+- entering COMPLETED -> `completed`, `volume_ton`, `completion_seconds`;
+- entering REJECTED / CANCELLED -> `cancelled`.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import update
+from sqlmodel import select
+
+from src.db.dialect import upsert
+from src.db.models import (
+    Deal, DealEvent, DealRollup, DealStatus, RollupCursor, RollupGranularity, RollupScope,
+)
+from src.core.config import settings
+from src.core.logger import app_logger
+
+ROLLUP_CURSOR = "deal_rollups"
+CANCELLED_STATUSES = (DealStatus.REJECTED, DealStatus.CANCELLED)
+COUNTERS = ("created", "completed", "cancelled", "volume_ton", "completion_seconds")
+
+# period_start of the all-time (TOTAL) rows
+ROLLUP_EPOCH = datetime(1970, 1, 1)
+
+RollupKey = Tuple[RollupGranularity, RollupScope, datetime, int]
+
+
+def period_start(moment: datetime, granularity: RollupGranularity) -> datetime:
+    if granularity == RollupGranularity.HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == RollupGranularity.DAY:
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ROLLUP_EPOCH
+
+
+def _keys(moment: datetime, channel_id: int, advertiser_id: int):
+    """Rollup rows one occurrence at `moment` counts towards."""
+    hour = period_start(moment, RollupGranularity.HOUR)
+    day = period_start(moment, RollupGranularity.DAY)
+    yield RollupGranularity.HOUR, RollupScope.PLATFORM, hour, 0
+    for granularity, start in ((RollupGranularity.DAY, day), (RollupGranularity.TOTAL, ROLLUP_EPOCH)):
+        yield granularity, RollupScope.PLATFORM, start, 0
+        yield granularity, RollupScope.CHANNEL, start, channel_id
+        yield granularity, RollupScope.ADVERTISER, start, advertiser_id
+
+
+def aggregate(rows) -> Dict[RollupKey, Dict[str, float]]:
+    """
+    Folds (from_status, to_status, event_at, channel_id, advertiser_id,
+    amount_ton, deal_created_at) rows into {rollup key: counter deltas}.
+    """
+    totals: Dict[RollupKey, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for from_status, to_status, event_at, channel_id, advertiser_id, amount, created_at in rows:
+        if from_status is None:
+            for key in _keys(created_at, channel_id, advertiser_id):
+                totals[key]["created"] += 1
+        if to_status == DealStatus.COMPLETED:
+            for key in _keys(event_at, channel_id, advertiser_id):
+                totals[key]["completed"] += 1
+                totals[key]["volume_ton"] += amount
+                totals[key]["completion_seconds"] += max((event_at - created_at).total_seconds(), 0.0)
+        elif to_status in CANCELLED_STATUSES:
+            for key in _keys(event_at, channel_id, advertiser_id):
+                totals[key]["cancelled"] += 1
+    return totals
+
+
+async def _apply(session, totals: Dict[RollupKey, Dict[str, float]]):
+    table = DealRollup.__table__
+    rows = [
+        {"granularity": g, "scope": s, "period_start": p, "scope_id": i, **counters}
+        for (g, s, p, i), counters in totals.items()
+    ]
+    if rows:
+        # Core executemany of one cached statement: no per-batch SQL
+        # compilation and no ORM bulk-insert bookkeeping per row
+        await session.execute(upsert(
+            session, table, None, ["granularity", "scope", "period_start", "scope_id"],
+            lambda excluded: {name: table.c[name] + excluded[name] for name in COUNTERS},
+        ), rows)
+
+
+async def run_rollups(session, batch_size: Optional[int] = None, max_batches: Optional[int] = None,
+                      now: Optional[datetime] = None) -> int:
+    """
+    Folds every new event older than the commit-lag window into the rollups.
+    Returns the number of events processed.
+    """
+    batch_size = batch_size or settings.ANALYTICS_ROLLUP_BATCH
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=settings.ANALYTICS_ROLLUP_LAG_SECONDS)
+    await session.execute(upsert(session, RollupCursor, {"name": ROLLUP_CURSOR}, ["name"]))
+    await session.commit()
+
+    processed, batches = 0, 0
+    while max_batches is None or batches < max_batches:
+        last_id = (await session.exec(
+            select(RollupCursor.last_event_id).where(RollupCursor.name == ROLLUP_CURSOR)
+        )).one()
+        statement = (
+            select(
+                DealEvent.id, DealEvent.from_status, DealEvent.to_status, DealEvent.created_at,
+                Deal.channel_id, Deal.advertiser_id, Deal.amount_ton, Deal.created_at,
+            )
+            .join(Deal, Deal.id == DealEvent.deal_id)
+            .where(DealEvent.id > last_id)
+            .order_by(DealEvent.id)
+            .limit(batch_size)
+        )
+        fetched = (await session.exec(statement)).all()
+        # Stop at the first young event, not skip it: the cursor must not pass it
+        rows = next(
+            (fetched[:i] for i, row in enumerate(fetched) if row[3] >= cutoff),
+            fetched,
+        )
+        if not rows:
+            break
+
+        await _apply(session, aggregate(row[1:] for row in rows))
+        moved = await session.execute(
+            update(RollupCursor)
+            .where(RollupCursor.name == ROLLUP_CURSOR, RollupCursor.last_event_id == last_id)
+            .values(last_event_id=rows[-1][0], updated_at=datetime.utcnow())
+        )
+        if moved.rowcount != 1:
+            # Another worker folded this batch first
+            await session.rollback()
+            app_logger.warning("Rollups: cursor moved concurrently, batch discarded")
+            break
+        await session.commit()
+        processed += len(rows)
+        batches += 1
+        if len(rows) < batch_size:
+            break # Caught up (or reached the commit-lag window)
+
+    if processed:
+        app_logger.info(f"Rollups: {processed} deal events folded")
+    return processed
@@ -1,112 +1,202 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.interval import IntervalTrigger
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Optional
+
 from sqlmodel import select
-from datetime import datetime
-import asyncio
 
 from src.db.database import get_session
 from src.db.models import Deal, DealStatus
+from src.core.config import settings
 from src.core.logger import app_logger
+from src.workers import timer
+
+if TYPE_CHECKING:
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-# Create scheduler with job execution settings
-scheduler = AsyncIOScheduler(
-    job_defaults={
-        'coalesce': True,  # Combine missed runs into one
-        'max_instances': 1,  # Only one instance at a time
-        'misfire_grace_time': 60  # 60 seconds grace period for missed jobs
-    }
-)
+# Created by `start_scheduler()`: APScheduler is only imported by processes that run jobs
+scheduler: Optional["AsyncIOScheduler"] = None
 
 async def check_scheduled_posts():
     """
-    Worker task: Checks for deals that are ready to be published.
+    Worker task: Publishes every deal that is ready.
+    [PERF]: Delegates to the batched pipeline (claim, one load query, concurrent
+    rate-limited sends, batched commits) in `src.workers.publisher`.
+    [SCALE]: Deals are leased per worker, so any number of processes may run this.
     """
     app_logger.info("Worker: Checking for scheduled posts...")
+
+    from src.bot.instance import bot
+    from src.workers.publisher import claim_limit, run_publish_pipeline
+
     # Manually creating session
     async for session in get_session():
-        statement = select(Deal).where(
+        # Keep claiming while full batches come back (backlog after downtime)
+        # and make progress; a batch that only failed means Telegram is down
+        while True:
+            metrics = await run_publish_pipeline(session, bot)
+            if metrics.due < claim_limit() or not metrics.published:
+                break
+        break 
+
+async def reconcile_schedule():
+    """
+    [CRASH RECOVERY]: Low-frequency safety net for the event-driven timer.
+    1. Publishes anything already due (missed while down, or scheduled by
+       another process whose notification never reached this worker).
+    2. Primes the timer with deals due before the next scan.
+    """
+    await check_scheduled_posts()
+
+    now = datetime.utcnow()
+    horizon = now + timedelta(seconds=settings.SCHEDULER_RECONCILE_SECONDS)
+    async for session in get_session():
+        statement = select(Deal.id, Deal.scheduled_at).where(
             Deal.status == DealStatus.SCHEDULED,
-            Deal.scheduled_at <= datetime.utcnow()
+            Deal.scheduled_at > now,
+            Deal.scheduled_at <= horizon,
         )
-        result = await session.exec(statement)
-        deals = result.all()
-        
-        for deal in deals:
-            await publish_post(session, deal)
-        break 
+        upcoming = (await session.exec(statement)).all()
+        break
 
-async def publish_post(session, deal: Deal):
+    for deal_id, scheduled_at in upcoming:
+        timer.due_timer.schedule(deal_id, scheduled_at)
+    if upcoming:
+        app_logger.info(f"Worker: {len(upcoming)} upcoming deal(s) queued on the timer")
+
+async def poll_next_due():
+    """
+    [CROSS-PROCESS]: Deals scheduled by another process never notify this
+    worker's timer. One indexed LIMIT 1 lookup of the earliest claimable deal
+    per SCHEDULER_DUE_POLL_SECONDS feeds it instead, bounding that delay.
+    """
+    from src.workers.publisher import next_due_statement
+
+    async for session in get_session():
+        row = (await session.exec(next_due_statement(datetime.utcnow()))).first()
+        break
+
+    if row is None:
+        return
+    deal_id, scheduled_at = row
+    earliest = timer.due_timer.earliest
+    if earliest is None or scheduled_at < earliest:
+        timer.due_timer.schedule(deal_id, scheduled_at)
+
+def _payouts_signed_by_hot_wallet(gateway) -> bool:
+    from src.services.ton import raw_address
+
+    payout_address = gateway.payout_address
+    return bool(payout_address and gateway.wallet_address
+                and raw_address(payout_address) == raw_address(gateway.wallet_address))
+
+async def watch_payments():
     """
-    Publishes the post to the channel using the Bot API.
-    [FIX P0]: Enabled actual posting.
+    Worker task: One incremental scan of the hot wallet for incoming payments
+    (and payout confirmations, when the hot wallet also signs the payouts).
     """
-    try:
-        app_logger.info(f"PUBLISHING AD: Deal {deal.id} to Channel {deal.channel_id}")
-        
-        # [FIX P0]: Lazy import to avoid circular dependency
-        from src.main import bot
-        
-        # Get the channel's Telegram ID from the Channel model
-        from src.db.models import Channel
-        channel = await session.get(Channel, deal.channel_id)
-        
-        if not channel:
-            app_logger.error(f"Channel not found for deal {deal.id}")
-            return
-        
-        # [CORE ACTION]: Post the ad to the channel
-        content = deal.ad_draft or deal.ad_brief  # Fallback to brief if no draft
-        msg = await bot.send_message(channel.channel_id, content, parse_mode='HTML')
-
-        # [VERIFICATION]: Generate Proof Link
-        # If public channel, link format: t.me/username/id
-        proof_link = f"https://t.me/{channel.username}/{msg.message_id}" if channel.username else str(msg.message_id)
-        
-        # [AUTOMATION]: Auto-Release Funds
-        # 1. Get Owner Wallet
-        from src.db.models import User
-        from src.services.ton import TonGateway
-        from src.core.config import settings
-        
-        owner = await session.get(User, channel.owner_id)
-        
-        if owner and owner.wallet_address:
-            # 2. Initiate Transfer
-            gateway = TonGateway(settings.TON_WALLET_ADDRESS)
-            
-            # Using 95% of amount (5% Platform Fee reserved) or Full Amount for MVP?
-            # User wants "Hassle Free", implied full amount or fee deducted.
-            # Let's send FULL amount for MVP transparency.
-            
-            app_logger.info(f"Releasing funds to Owner: {owner.wallet_address}")
-            try:
-                tx_hash = await gateway.send_ton_transfer(
-                    destination=owner.wallet_address,
-                    amount=deal.amount_ton,
-                    memo=f"TG-ADMC Payout #{deal.id}"
-                )
-                if tx_hash:
-                     app_logger.info(f"PAYOUT SUCCESS: {tx_hash}")
-                else:
-                     app_logger.error("PAYOUT FAILED: Transaction not broadcasted.")
-            except Exception as pay_err:
-                app_logger.error(f"PAYOUT ERROR: {pay_err}")
-        else:
-            app_logger.error(f"Cannot pay owner {channel.owner_id}: No wallet connected.")
-
-        deal.status = DealStatus.COMPLETED
-        deal.published_at = datetime.utcnow()
-        deal.proof_link = proof_link
-        
-        session.add(deal)
-        await session.commit()
-        
-        app_logger.info(f"Ad Published & Funds Released: {deal.id} | Proof: {proof_link}")
-        
-    except Exception as e:
-        app_logger.error(f"Failed to publish ad {deal.id}: {e}")
+    from src.services.ton import get_ton_gateway
+    from src.workers.payment_watcher import PaymentWatcher
+
+    async for session in get_session():
+        try:
+            gateway = get_ton_gateway()
+            watcher = PaymentWatcher(session, gateway, payouts=_payouts_signed_by_hot_wallet(gateway))
+            locked = await watcher.poll()
+            if locked:
+                app_logger.info(f"Worker: funds locked for deals {locked}")
+        except Exception as e:
+            app_logger.error(f"Payment watcher failed: {e}")
+        break
+
+async def watch_payouts():
+    """
+    Worker task: Confirms sent payouts from the wallet that signs them
+    (WALLET_MNEMONIC). Payouts never leave from TON_WALLET_ADDRESS unless it
+    is that same wallet, in which case `watch_payments` already covers them.
+    """
+    from src.services.ton import get_ton_gateway
+    from src.workers.payment_watcher import PaymentWatcher
+
+    async for session in get_session():
+        try:
+            gateway = get_ton_gateway()
+            if _payouts_signed_by_hot_wallet(gateway):
+                break
+            await PaymentWatcher(session, gateway, address=gateway.payout_address, incoming=False).poll()
+        except Exception as e:
+            app_logger.error(f"Payout watcher failed: {e}")
+        break
+
+async def flush_payouts():
+    """
+    Worker task: Sends queued owner payouts in multi-output batches.
+    [SCALE]: Payouts are claimed per worker, so any number of processes may run this.
+    """
+    from src.services.ton import get_ton_gateway
+    from src.workers.payouts import PayoutAggregator, queue_missing_payouts
+    from src.workers.publisher import WORKER_ID
+
+    async for session in get_session():
+        try:
+            await queue_missing_payouts(session)
+            await PayoutAggregator(session, get_ton_gateway(), worker_id=WORKER_ID).flush()
+        except Exception as e:
+            app_logger.error(f"Payout aggregator failed: {e}")
+        break
+
+async def refresh_rollups():
+    """
+    Worker task: Folds new deal events into the analytics rollups.
+    """
+    from src.workers.rollups import run_rollups
+
+    async for session in get_session():
+        try:
+            await run_rollups(session)
+        except Exception as e:
+            app_logger.error(f"Analytics rollups failed: {e}")
+        break
 
 def start_scheduler():
-    scheduler.add_job(check_scheduled_posts, 'interval', minutes=1)
+    global scheduler
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+    from apscheduler.triggers.interval import IntervalTrigger
+
+    # Scheduler with job execution settings
+    scheduler = AsyncIOScheduler(
+        job_defaults={
+            'coalesce': True,  # Combine missed runs into one
+            'max_instances': 1,  # Only one instance at a time
+            'misfire_grace_time': 60  # 60 seconds grace period for missed jobs
+        }
+    )
+
+    # [EVENT-DRIVEN]: Wakes exactly when the next deal is due
+    timer.due_timer = timer.DueTimer(check_scheduled_posts)
+    timer.due_timer.start()
+
+    # Reconciliation runs once right away (recovery), then every N seconds
+    scheduler.add_job(
+        reconcile_schedule,
+        IntervalTrigger(seconds=settings.SCHEDULER_RECONCILE_SECONDS),
+        next_run_time=datetime.now(),
+    )
+    # [CROSS-PROCESS]: Deals scheduled by API/webhook processes
+    scheduler.add_job(poll_next_due, IntervalTrigger(seconds=settings.SCHEDULER_DUE_POLL_SECONDS))
+    # [PAYMENTS]: Incremental hot-wallet watcher (one scan for all deals)
+    if settings.TON_WALLET_ADDRESS:
+        scheduler.add_job(watch_payments, IntervalTrigger(seconds=settings.PAYMENT_WATCHER_SECONDS))
+    # [PAYOUTS]: Batched releases, off the publishing path, confirmed on the signing wallet
+    if settings.WALLET_MNEMONIC:
+        scheduler.add_job(flush_payouts, IntervalTrigger(seconds=settings.PAYOUT_FLUSH_SECONDS))
+        scheduler.add_job(watch_payouts, IntervalTrigger(seconds=settings.PAYMENT_WATCHER_SECONDS))
+    # [ANALYTICS]: Incremental rollups of the deal event log
+    scheduler.add_job(refresh_rollups, IntervalTrigger(seconds=settings.ANALYTICS_ROLLUP_SECONDS))
     scheduler.start()
     app_logger.info("Scheduler started.")
+
+def stop_scheduler():
+    if timer.due_timer:
+        timer.due_timer.stop()
+    if scheduler is not None and scheduler.running:
+        scheduler.shutdown(wait=False)
+        app_logger.info("Scheduler stopped.")
@@ -0,0 +1,111 @@
+"""
+[TIMER WHEEL]: Event-driven publishing.
+
+Instead of polling the `deal` table every minute, the worker keeps a min-heap
+of upcoming `scheduled_at` values and sleeps exactly until the earliest one.
+EscrowService feeds it the moment a deal becomes SCHEDULED in the same
+process. Deals scheduled by other processes (API replicas, the webhook) are
+picked up by a cheap next-due lookup every SCHEDULER_DUE_POLL_SECONDS, and a
+low-frequency reconciliation scan (see `scheduler.py`) re-primes it after
+restarts.
+
+Kept free of heavy imports: EscrowService imports `notify_deal_scheduled`.
+"""
+import asyncio
+import heapq
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from src.core.logger import app_logger
+
+
+class DueTimer:
+    """
+    Min-heap of (due_at, deal_id) that fires `on_due()` when entries come due.
+    Entries due at the same moment are coalesced into one callback; the
+    callback (the claim-based publisher) picks up every due deal anyway.
+    """
+
+    def __init__(self, on_due: Callable[[], Awaitable[None]], clock: Callable[[], datetime] = datetime.utcnow):
+        self.on_due = on_due
+        self._clock = clock
+        self._heap: List[Tuple[datetime, int]] = []
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def earliest(self) -> Optional[datetime]:
+        return self._heap[0][0] if self._heap else None
+
+    def schedule(self, deal_id: int, due_at: Optional[datetime]):
+        """
+        Registers a deal's due time. Wakes the loop only if it is the new earliest.
+        """
+        due_at = due_at or self._clock()
+        earliest = self.earliest
+        heapq.heappush(self._heap, (due_at, deal_id))
+        if earliest is None or due_at < earliest:
+            self._wake.set()
+
+    def pop_due(self) -> List[int]:
+        """
+        Removes and returns the IDs of every entry due now.
+        """
+        now = self._clock()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    async def run(self):
+        while True:
+            self._wake.clear()
+            if not self._heap:
+                await self._wake.wait()
+                continue
+
+            delay = (self._heap[0][0] - self._clock()).total_seconds()
+            if delay > 0:
+                try:
+                    # Sleep until due, unless an earlier deal arrives first
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = self.pop_due()
+            app_logger.info(f"Timer: {len(due)} deal(s) due, publishing now")
+            try:
+                await self.on_due()
+            except Exception as e:
+                app_logger.error(f"Timer: publish callback failed: {e}")
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+# Process-wide timer; set by `start_scheduler()` in processes that publish
+due_timer: Optional[DueTimer] = None
+
+
+def notify_deal_scheduled(deal_id: int, scheduled_at: Optional[datetime]):
+    """
+    [HOOK]: Called by EscrowService after a deal is committed as SCHEDULED.
+    No-op in processes without a running worker (e.g. PROCESS_ROLE=api);
+    the workers' next-due poll picks those deals up instead.
+    """
+    if due_timer is not None and due_timer.running:
+        due_timer.schedule(deal_id, scheduled_at)
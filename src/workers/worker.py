@@ -0,0 +1,46 @@
+"""
+[WORKER]: Standalone publishing worker.
+Runs the scheduler without the web app, so publishing scales independently:
+
+    python -m src.workers.worker
+
+Start any number of these (set RUN_EMBEDDED_WORKER=false on the API, or
+run it with PROCESS_ROLE=api / webhook); `PROCESS_ROLE=worker uvicorn
+src.main:app` is the same role with a /health endpoint for probes.
+deal leases guarantee each deal is posted by exactly one of them.
+"""
+import asyncio
+import signal
+
+from src.core.logger import setup_logging, app_logger
+
+
+async def main():
+    setup_logging()
+
+    from src.bot.instance import bot
+    from src.db.database import init_db
+    from src.services.ton import get_ton_gateway
+    from src.workers.publisher import WORKER_ID
+    from src.workers.scheduler import start_scheduler, stop_scheduler
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    # Same schema gate as the API: refuse to run jobs against an old schema
+    await init_db()
+    await get_ton_gateway().start()
+    start_scheduler()
+    app_logger.info(f"Worker {WORKER_ID} running. Ctrl+C to stop.")
+    await stop.wait()
+
+    app_logger.info("Worker shutting down...")
+    stop_scheduler()
+    await get_ton_gateway().close()
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,9 +1,44 @@
+import os
+import tempfile
+
 import pytest
+import pytest_asyncio
 import asyncio
 
+# [TEST ENV]: Settings are read at import time, so configure before importing src.*
+_TEST_DB_DIR = tempfile.mkdtemp(prefix="tgadmc-tests-")
+os.environ.setdefault("BOT_TOKEN", "123456:TEST-TOKEN")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_TEST_DB_DIR}/test.db")
+
 @pytest.fixture(scope="session")
 def event_loop():
     """Create an instance of the default event loop for the session."""
     loop = asyncio.get_event_loop_policy().new_event_loop()
     yield loop
     loop.close()
+
+@pytest_asyncio.fixture
+async def session():
+    """Fresh schema + AsyncSession on the test SQLite database."""
+    from sqlalchemy import text
+    from sqlmodel import SQLModel
+    from src.db.database import engine, async_session_maker
+    from src.services.analytics import system_counts_cache
+    from src.services.identity import invalidate_identity
+    from src.services.marketplace import invalidate_channel_feed
+    from src.services.search import ensure_search_index
+    from src.workers.publisher import reset_rate_limiter
+
+    invalidate_channel_feed()
+    invalidate_identity()
+    system_counts_cache.invalidate()
+    reset_rate_limiter()
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP TABLE IF EXISTS channel_fts"))
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await ensure_search_index(conn)
+    async with async_session_maker() as db_session:
+        yield db_session
+    # Pooled aiosqlite connections are bound to this test's event loop
+    await engine.dispose()
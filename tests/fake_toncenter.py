@@ -0,0 +1,96 @@
+"""
+Local stand-in for the toncenter v2 HTTP API (tests and benchmarks).
+Counts TCP connections so connection reuse can be asserted.
+"""
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+
+class FakeToncenter:
+    def __init__(self, transactions=None, seqno=7):
+        self.transactions = transactions or []
+        self.accounts = {} # Histories of other addresses; the rest read `transactions`
+        self.seqno = seqno
+        self.reject_sends = False
+        self.gateway_error_sends = False # 502 page: no verdict on the message
+        self.requests = []
+        self.sent_bocs = []
+        self.connections = set()
+        self.server = None
+
+    @property
+    def url(self) -> str:
+        return str(self.server.make_url("")).rstrip("/")
+
+    def _track(self, request):
+        self.connections.add(request.transport.get_extra_info("peername"))
+        self.requests.append((request.path, dict(request.query)))
+
+    async def master_info(self, request):
+        self._track(request)
+        return web.json_response({"ok": True, "result": {"last": {"seqno": 1}}})
+
+    async def transactions_handler(self, request):
+        self._track(request)
+        return web.json_response({"ok": True, "result": self.transactions_for(request.query)})
+
+    def transactions_for(self, query):
+        """Newest first; `lt`+`hash` start at that tx (inclusive), `to_lt` stops before it."""
+        txs = self.accounts.get(query.get("address"), self.transactions)
+        if "lt" in query:
+            start = next(i for i, tx in enumerate(txs)
+                         if str(tx["transaction_id"]["lt"]) == query["lt"]
+                         and tx["transaction_id"]["hash"] == query["hash"])
+            txs = txs[start:]
+        if "to_lt" in query:
+            txs = [tx for tx in txs if int(tx["transaction_id"]["lt"]) > int(query["to_lt"])]
+        return txs[: int(query.get("limit", 20))]
+
+    def receive(self, lt: int, value_nano: int, comment: str):
+        """Prepends an incoming transfer (the wallet's newest transaction)."""
+        self.transactions.insert(0, {
+            "transaction_id": {"lt": str(lt), "hash": f"hash-{lt}"},
+            "in_msg": {"value": str(value_nano), "message": comment},
+            "out_msgs": [],
+        })
+
+    def send(self, lt: int, outputs, address=None):
+        """
+        Prepends an outgoing wallet transaction with (destination, value_nano,
+        comment) outputs, to `address`'s history if given.
+        """
+        history = self.accounts.setdefault(address, []) if address else self.transactions
+        history.insert(0, {
+            "transaction_id": {"lt": str(lt), "hash": f"hash-{lt}"},
+            "in_msg": {"value": "0", "message": ""},
+            "out_msgs": [
+                {"destination": destination, "value": str(value_nano), "message": comment}
+                for destination, value_nano, comment in outputs
+            ],
+        })
+
+    async def run_get_method(self, request):
+        self._track(request)
+        return web.json_response({"ok": True, "result": {"stack": [["num", hex(self.seqno)]]}})
+
+    async def send_boc(self, request):
+        self._track(request)
+        self.sent_bocs.append((await request.json())["boc"])
+        if self.gateway_error_sends:
+            return web.Response(status=502, text="<html>502 Bad Gateway</html>", content_type="text/html")
+        if self.reject_sends:
+            return web.json_response({"ok": False, "error": "exitcode=33"}, status=500)
+        return web.json_response({"ok": True, "result": {}})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/getMasterchainInfo", self.master_info)
+        app.router.add_get("/getTransactions", self.transactions_handler)
+        app.router.add_post("/runGetMethod", self.run_get_method)
+        app.router.add_post("/sendBoc", self.send_boc)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.server.close()
@@ -0,0 +1,20 @@
+from sqlalchemy import event
+
+from src.db.database import engine
+
+
+class QueryCounter:
+    """Records every SQL statement sent to the test engine (round trips)."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(engine.sync_engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine.sync_engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql
+from sqlmodel import select
+
+from src.api.admin import ADMIN_KEY
+from src.core.config import settings
+from src.core.roles import process_plan
+from src.db.models import Channel, Deal, DealEvent, DealStatus, User
+from src.services.analytics import AnalyticsService, system_counts_statement
+from src.services.escrow import EscrowService
+from src.services.events import DealChange, record_changes
+from src.main import create_app
+from src.workers.rollups import run_rollups
+from tests.query_counter import QueryCounter
+
+
+async def _seed(session):
+    """Two channels, one advertiser: 3 deals on A (2 completed), 1 rejected on B."""
+    user = User(telegram_id=99)
+    session.add(user)
+    await session.commit()
+    a = Channel(channel_id=-990, title="A", owner_id=user.id)
+    b = Channel(channel_id=-991, title="B", owner_id=user.id)
+    session.add_all([a, b])
+    await session.commit()
+
+    escrow = EscrowService(session)
+    deals = [await escrow.create_deal_request(user.id, a.id, "x", amount) for amount in (2.0, 3.0, 7.0)]
+    rejected = await escrow.create_deal_request(user.id, b.id, "x", 1.0)
+    await escrow.reject_deal(rejected.id, "no")
+    for deal in deals[:2]:
+        deal.status = DealStatus.COMPLETED
+        await record_changes(session, [DealChange.from_deal(deal)], datetime.utcnow())
+    await session.commit()
+    return user, a, b
+
+
+def _after_lag():
+    """A clock past the commit-lag window of every event created so far."""
+    return datetime.utcnow() + timedelta(seconds=settings.ANALYTICS_ROLLUP_LAG_SECONDS + 1)
+
+
+@pytest.mark.asyncio
+async def test_rollups_feed_platform_and_scoped_stats(session):
+    user, a, b = await _seed(session)
+    assert await run_rollups(session, batch_size=2, now=_after_lag()) == 7
+
+    service = AnalyticsService(session)
+    stats = await service.get_platform_stats()
+    assert (stats["deals_created"], stats["deals_completed"], stats["deals_cancelled"]) == (4, 2, 1)
+    assert stats["volume_ton"] == 5.0 and stats["avg_completion_seconds"] is not None
+    assert (stats["active_deals"], stats["cancelled_deals"]) == (1, 1)
+
+    channels = await service.get_channel_performance()
+    assert [(c["id"], c["volume_ton"], c["deals_created"]) for c in channels] == [(a.id, 5.0, 3), (b.id, 0.0, 1)]
+    assert (await service.get_channel_performance(channel_id=b.id))[0]["deals_cancelled"] == 1
+    advertiser = (await service.get_advertiser_performance(advertiser_id=user.id))[0]
+    assert advertiser["completion_rate"] == 0.5
+
+    assert len(await service.get_timeseries()) == 1
+
+
+@pytest.mark.asyncio
+async def test_rollups_are_incremental(session):
+    await _seed(session)
+    assert await run_rollups(session, now=_after_lag()) == 7
+    assert await run_rollups(session, now=_after_lag()) == 0 # Nothing new: nothing counted twice
+
+    stats = await AnalyticsService(session).get_platform_stats()
+    assert stats["deals_created"] == 4 and stats["volume_ton"] == 5.0
+
+
+@pytest.mark.asyncio
+async def test_rollups_wait_for_events_that_may_commit_late(session):
+    await _seed(session)
+    # Within the lag window nothing is folded: a lower id could still commit
+    assert await run_rollups(session) == 0
+
+    # Event 3 stays young (a slow transaction); the others are old enough
+    await session.execute(
+        update(DealEvent).where(DealEvent.id != 3).values(created_at=datetime.utcnow() - timedelta(hours=1))
+    )
+    await session.commit()
+    assert await run_rollups(session) == 2
+    # ...and is folded once the window has passed, with everything after it
+    assert await run_rollups(session, now=_after_lag()) == 5
+
+
+@pytest.mark.asyncio
+async def test_system_counts_are_one_round_trip_and_cached(session):
+    await _seed(session)
+    service = AnalyticsService(session)
+
+    with QueryCounter() as counter:
+        counts = await service.get_system_counts()
+        again = await service.get_system_counts()
+    assert len(counter.statements) == 1 # Second call served from cache
+
+    assert (counts["users"], counts["channels"], counts["deals"]) == (1, 2, 4)
+    assert counts["deals_by_status"]["completed"] == 2 and counts["deals_by_status"]["created"] == 1
+    assert counts["deals_by_status"]["cancelled"] == 0 and counts["approximate"] == []
+    assert again == counts
+
+
+def test_postgres_counts_use_planner_estimates():
+    class Bind:
+        dialect = postgresql.dialect()
+
+    class Session:
+        bind = Bind
+
+    sql = str(system_counts_statement(Session).compile(dialect=postgresql.dialect()))
+    assert "reltuples" in sql and '\'"user"\'::regclass' in sql
+
+
+@pytest.mark.asyncio
+async def test_all_time_leaders_read_total_rows_without_grouping(session):
+    user, a, b = await _seed(session)
+    await run_rollups(session, now=_after_lag())
+
+    service = AnalyticsService(session)
+    with QueryCounter() as counter:
+        channels = await service.get_channel_performance(days=None)
+    assert "GROUP BY" not in counter.statements[0].upper()
+    assert [(c["id"], c["volume_ton"], c["deals_created"]) for c in channels] == [(a.id, 5.0, 3), (b.id, 0.0, 1)]
+    advertiser = (await service.get_advertiser_performance(advertiser_id=user.id, days=None))[0]
+    assert (advertiser["deals_completed"], advertiser["completion_rate"]) == (2, 0.5)
+
+
+@pytest.mark.asyncio
+async def test_admin_analytics_serves_all_time_without_days(session):
+    user, a, b = await _seed(session)
+    # The rejected deal on B is old: outside a 30-day window, inside all time
+    old = datetime.utcnow() - timedelta(days=90)
+    b_deals = select(Deal.id).where(Deal.channel_id == b.id)
+    await session.execute(update(DealEvent).where(DealEvent.deal_id.in_(b_deals)).values(created_at=old))
+    await session.execute(update(Deal).where(Deal.channel_id == b.id).values(created_at=old))
+    await session.commit()
+    await run_rollups(session, now=_after_lag())
+
+    app = create_app(process_plan("api"))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        async def created(**params):
+            response = await client.get("/admin/analytics", params={"key": ADMIN_KEY, **params})
+            assert response.status_code == 200
+            body = response.json()
+            return body["platform"]["deals_created"], body["platform"]["window_days"]
+
+        assert await created() == (4, None)
+        assert await created(days=0) == (4, None)
+        assert await created(days=30) == (3, 30)
@@ -0,0 +1,80 @@
+import hashlib
+import hmac
+import json
+import time
+from urllib.parse import urlencode
+
+import pytest
+
+from src.core.config import settings
+from src.utils import auth
+from src.utils.auth import init_data_cache, validate_init_data
+
+TOKEN = "123456:TEST-TOKEN"
+
+
+def sign(fields: dict, token: str = TOKEN) -> str:
+    check = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret = hmac.new(b"WebAppData", token.encode(), hashlib.sha256).digest()
+    digest = hmac.new(secret, check.encode(), hashlib.sha256).hexdigest()
+    return urlencode({**fields, "hash": digest})
+
+
+def init_data(user_id: int = 42, age: int = 0) -> str:
+    return sign({
+        "auth_date": str(int(time.time()) - age),
+        "query_id": "AAH",
+        "user": json.dumps({"id": user_id, "first_name": "Ana"}),
+    })
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    init_data_cache.invalidate()
+    yield
+    init_data_cache.invalidate()
+
+
+def test_valid_init_data_is_cached():
+    data = init_data()
+    assert validate_init_data(data, TOKEN)["id"] == 42
+    assert init_data_cache.misses == 1
+
+    user = validate_init_data(data, TOKEN)
+    assert user["id"] == 42
+    assert init_data_cache.hits == 1
+
+    # Callers get their own copy, never the cached dict
+    user["id"] = 0
+    assert validate_init_data(data, TOKEN)["id"] == 42
+
+
+def test_tampered_or_foreign_data_is_rejected_and_not_cached():
+    data = init_data()
+    assert validate_init_data(data.replace("Ana", "Eve"), TOKEN) is None
+    assert validate_init_data(data, "654321:OTHER") is None
+    assert validate_init_data("hash=" + "é" * 64, TOKEN) is None
+    assert init_data_cache.stats()["size"] == 0
+
+
+def test_expired_auth_date_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "INIT_DATA_MAX_AGE", 3600)
+    assert validate_init_data(init_data(age=3601), TOKEN) is None
+    assert validate_init_data(init_data(age=60), TOKEN) is not None
+
+
+def test_cached_entry_does_not_outlive_auth_date(monkeypatch):
+    monkeypatch.setattr(settings, "INIT_DATA_MAX_AGE", 3600)
+    data = init_data(age=3590)
+    assert validate_init_data(data, TOKEN) is not None
+
+    real_time = time.time
+    monkeypatch.setattr(auth.time, "time", lambda: real_time() + 20)
+    assert validate_init_data(data, TOKEN) is None
+
+
+def test_secret_key_is_derived_once():
+    auth._secret_key.cache_clear()
+    for user_id in range(5):
+        validate_init_data(init_data(user_id), TOKEN)
+    assert auth._secret_key.cache_info().misses == 1
@@ -0,0 +1,75 @@
+import pytest
+
+from src.core.cache import TTLCache
+from src.db.models import Channel, User
+from src.services.identity import IdentityService
+from src.services.marketplace import MarketplaceService, channel_feed_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_counters():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recent
+    cache.set("c", 3)           # evicts "b"
+
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 1)
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set("k", "v")
+    clock.now = 4.9
+    assert cache.get("k") == "v"
+    clock.now = 5.0
+    assert cache.get("k") is None
+    assert cache.stats()["expirations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_load_racing_invalidation_is_not_stored():
+    cache = TTLCache(maxsize=10, ttl=60)
+
+    async def loader():
+        cache.invalidate()  # a write lands while the query is in flight
+        return "stale"
+
+    assert await cache.get_or_load("k", loader) == "stale"
+    assert cache.get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_price_change_invalidates_feed(session):
+    owner = User(telegram_id=7)
+    session.add(owner)
+    await session.commit()
+    await session.refresh(owner)
+    channel = Channel(channel_id=-7, title="Cached", username=None, owner_id=owner.id, verified=True)
+    session.add(channel)
+    await session.commit()
+
+    marketplace = MarketplaceService(session)
+    await marketplace.list_verified_channels_page(limit=10)
+    page, _ = await marketplace.list_verified_channels_page(limit=10)
+    assert channel_feed_cache.stats()["hits"] >= 1
+    assert page[0].price_post == 100.0
+
+    misses = channel_feed_cache.stats()["misses"]
+    await IdentityService(session).set_channel_price(channel.id, 55.0)
+    assert channel_feed_cache.stats()["size"] == 0
+
+    page, _ = await marketplace.list_verified_channels_page(limit=10)
+    assert page[0].price_post == 55.0
+    assert channel_feed_cache.stats()["misses"] == misses + 1
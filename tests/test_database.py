@@ -0,0 +1,26 @@
+import pytest
+from sqlalchemy import text
+
+from src.db import database
+
+
+def test_memory_sqlite_skips_pool_arguments():
+    options = database._engine_options("sqlite+aiosqlite:///:memory:")
+    assert "pool_size" not in options
+    assert options["echo"] is False
+
+
+def test_server_database_gets_pool_settings():
+    options = database._engine_options("postgresql+asyncpg://u:p@db/tgadmc")
+    assert options["pool_size"] == database.settings.DB_POOL_SIZE
+    assert options["max_overflow"] == database.settings.DB_MAX_OVERFLOW
+    assert options["pool_recycle"] == database.settings.DB_POOL_RECYCLE
+
+
+@pytest.mark.asyncio
+async def test_sqlite_connections_use_wal():
+    async with database.engine.connect() as conn:
+        mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+        busy = (await conn.execute(text("PRAGMA busy_timeout"))).scalar()
+    assert mode == "wal"
+    assert busy == database.settings.SQLITE_BUSY_TIMEOUT_MS
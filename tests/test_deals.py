@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.db.models import Channel, Deal, DealStatus, User
+from src.services.deals import DEAL_PREVIEW_CHARS, UserDealsService
+from tests.query_counter import QueryCounter
+
+
+async def _seed(session):
+    """
+    `me` advertises 4 deals on someone else's channel, owns a channel with
+    3 incoming deals, and advertised once on their own channel.
+    """
+    me, other = User(telegram_id=1), User(telegram_id=2)
+    session.add_all([me, other])
+    await session.commit()
+    mine = Channel(channel_id=-1, title="Mine", owner_id=me.id)
+    theirs = Channel(channel_id=-2, title="Theirs", owner_id=other.id)
+    session.add_all([mine, theirs])
+    await session.commit()
+
+    base = datetime(2026, 1, 1)
+    specs = (
+        [(me.id, theirs.id, DealStatus.CREATED)] * 4
+        + [(other.id, mine.id, DealStatus.LOCKED)] * 3
+        + [(me.id, mine.id, DealStatus.CREATED)]
+        + [(other.id, theirs.id, DealStatus.CREATED)] # Not mine at all
+    )
+    deals = [
+        Deal(advertiser_id=advertiser, channel_id=channel, status=status, ad_brief="b" * 1000,
+             amount_ton=1.0, updated_at=base + timedelta(minutes=i % 3)) # Ties on updated_at
+        for i, (advertiser, channel, status) in enumerate(specs)
+    ]
+    session.add_all(deals)
+    await session.commit()
+    return me, deals
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_every_deal_once_with_roles(session):
+    me, deals = await _seed(session)
+    service = UserDealsService(session)
+
+    seen, cursor = [], None
+    while True:
+        with QueryCounter() as counter:
+            page, cursor = await service.list_page(me.id, limit=3, cursor=cursor)
+        assert len(counter.statements) == 1
+        seen.extend(page)
+        if not cursor:
+            break
+
+    expected = sorted(deals[:8], key=lambda d: (d.updated_at, d.id), reverse=True)
+    assert [d["id"] for d in seen] == [d.id for d in expected]
+    roles = {d["id"]: d["user_role"] for d in seen}
+    assert roles[deals[7].id] == "advertiser" # Own channel: listed once, as advertiser
+    assert sum(role == "owner" for role in roles.values()) == 3
+    assert all(len(d["ad_brief"]) == DEAL_PREVIEW_CHARS for d in seen)
+
+
+@pytest.mark.asyncio
+async def test_filters_and_export(session):
+    me, deals = await _seed(session)
+    service = UserDealsService(session)
+
+    owner_page, _ = await service.list_page(me.id, limit=50, role="owner")
+    assert {d["id"] for d in owner_page} == {d.id for d in deals[4:7]}
+    locked, _ = await service.list_page(me.id, limit=50, status=DealStatus.LOCKED)
+    assert {d["status"] for d in locked} == {DealStatus.LOCKED} and len(locked) == 3
+
+    exported = [d["id"] async for d in service.iter_all(me.id, page_size=2)]
+    assert sorted(exported) == sorted(d.id for d in deals[:8])
+
+    with pytest.raises(ValueError):
+        await service.list_page(me.id, cursor="not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_previews_flag_truncated_texts(session):
+    me, deals = await _seed(session)
+    short = deals[0]
+    short.ad_brief = "short brief"
+    drafted = deals[1]
+    drafted.ad_brief, drafted.ad_draft = "short brief", "d" * (DEAL_PREVIEW_CHARS + 1)
+    session.add_all([short, drafted])
+    await session.commit()
+
+    page, _ = await UserDealsService(session).list_page(me.id, limit=50)
+    flags = {d["id"]: (d["truncated"], d["brief_truncated"], d["draft_truncated"]) for d in page}
+    assert flags[short.id] == (False, False, False)
+    assert flags[drafted.id] == (True, False, True) # A long draft alone marks the preview
+    assert flags[deals[2].id] == (True, True, False)
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from sqlmodel import select
+
+from src.db.database import async_session_maker
+from src.db.models import Channel, Deal, DealStatus, User
+from src.services.escrow import DealRequest, EscrowService
+from src.services.transitions import InvalidTransition
+from tests.query_counter import QueryCounter
+
+
+async def _setup(session, channels=3):
+    user = User(telegram_id=77)
+    session.add(user)
+    await session.commit()
+    await session.refresh(user)
+    rows = [Channel(channel_id=-700 - i, title=f"C{i}", owner_id=user.id) for i in range(channels)]
+    session.add_all(rows)
+    await session.commit()
+    return user, rows
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_inserts_all_deals_in_one_statement(session):
+    user, channels = await _setup(session, channels=30)
+    requests = [DealRequest(channel_id=c.id, brief=f"brief {c.id}", amount=1.0 + i) for i, c in enumerate(channels)]
+
+    with QueryCounter() as counter:
+        created = await EscrowService(session).create_deals_bulk(user.id, requests)
+
+    # Channel validation SELECT + multi-row INSERT ... RETURNING, then the bulk
+    # event INSERT and the status/channel projection upserts: constant, not per deal
+    assert len(counter.statements) == 5
+    assert len({change.deal_id for change in created}) == 30
+
+    by_channel = {request.channel_id: request for request in requests}
+    deals = {d.id: d for d in (await session.exec(select(Deal))).all()}
+    for change in created:
+        deal, request = deals[change.deal_id], by_channel[change.channel_id]
+        assert (deal.channel_id, deal.amount_ton) == (change.channel_id, change.amount_ton)
+        assert (deal.ad_brief, deal.amount_ton) == (request.brief, request.amount)
+        assert deal.status == DealStatus.CREATED and deal.advertiser_id == user.id
+    assert set(by_channel) == {change.channel_id for change in created}
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_is_all_or_nothing(session):
+    user, channels = await _setup(session)
+    requests = [DealRequest(channel_id=channels[0].id, brief="x", amount=1.0),
+                DealRequest(channel_id=999_999, brief="x", amount=1.0)]
+
+    with pytest.raises(ValueError, match="999999"):
+        await EscrowService(session).create_deals_bulk(user.id, requests)
+    assert (await session.exec(select(Deal))).all() == []
+
+
+async def _deal(session, status, **fields):
+    user, channels = await _setup(session, channels=1)
+    deal = Deal(advertiser_id=user.id, channel_id=channels[0].id, ad_brief="brief",
+                amount_ton=2.0, status=status, **fields)
+    session.add(deal)
+    await session.commit()
+    return deal.id
+
+
+@pytest.mark.asyncio
+async def test_transition_is_one_conditional_update(session):
+    deal_id = await _deal(session, DealStatus.LOCKED)
+
+    with QueryCounter() as counter:
+        deal = await EscrowService(session).accept_deal(deal_id, owner_id=1)
+
+    # UPDATE ... WHERE id AND status IN (...) RETURNING comes first: no prior SELECT of the deal
+    assert counter.statements[0].lstrip().upper().startswith("UPDATE DEAL")
+    assert not any("FROM deal " in sql and sql.lstrip().upper().startswith("SELECT") for sql in counter.statements)
+    assert deal.status == DealStatus.SCHEDULED
+    assert deal.scheduled_at is not None and deal.ad_draft == "brief"
+
+
+@pytest.mark.asyncio
+async def test_transition_only_sets_on_enter_values_for_their_target(session):
+    deal_id = await _deal(session, DealStatus.CREATED)
+    deal = await EscrowService(session).lock_funds(deal_id, "tx-1")
+    assert deal.status == DealStatus.LOCKED
+    assert deal.scheduled_at is None and deal.payment_tx_hash == "tx-1"
+
+
+@pytest.mark.asyncio
+async def test_invalid_transition_keeps_the_deal_untouched(session):
+    deal_id = await _deal(session, DealStatus.PUBLISHED)
+    escrow = EscrowService(session)
+
+    with pytest.raises(InvalidTransition, match="status published"):
+        await escrow.request_revision(deal_id, "too late")
+    with pytest.raises(InvalidTransition, match="not found"):
+        await escrow.complete_deal(deal_id + 1)
+
+    deal = await session.get(Deal, deal_id)
+    await session.refresh(deal)
+    assert deal.status == DealStatus.PUBLISHED and deal.rejection_reason is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_transitions_only_one_wins(session):
+    deal_id = await _deal(session, DealStatus.AWAITING_PAYMENT)
+
+    async def pay(tx_hash):
+        async with async_session_maker() as other:
+            try:
+                await EscrowService(other).lock_funds(deal_id, tx_hash)
+                return tx_hash
+            except InvalidTransition:
+                return None
+
+    winners = [w for w in await asyncio.gather(pay("tx-a"), pay("tx-b")) if w]
+    assert len(winners) == 1
+
+    deal = await session.get(Deal, deal_id)
+    await session.refresh(deal)
+    assert deal.status == DealStatus.SCHEDULED and deal.payment_tx_hash == winners[0]
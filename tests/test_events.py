@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func
+from sqlmodel import select
+
+from src.db.models import Channel, ChannelDealStats, Deal, DealStatus, StatusDuration, User
+from src.services.escrow import EscrowService
+from src.services.events import DealChange, backfill_projections, deal_history, record_changes, status_counts
+
+
+async def _channel(session):
+    user = User(telegram_id=88)
+    session.add(user)
+    await session.commit()
+    channel = Channel(channel_id=-880, title="Events", owner_id=user.id)
+    session.add(channel)
+    await session.commit()
+    return user, channel
+
+
+async def _deal_counts(session):
+    rows = (await session.exec(select(Deal.status, func.count()).group_by(Deal.status))).all()
+    return {status.value: count for status, count in rows}
+
+
+@pytest.mark.asyncio
+async def test_transitions_append_events_and_keep_counts_in_sync(session):
+    user, channel = await _channel(session)
+    escrow = EscrowService(session)
+    first = await escrow.create_deal_request(user.id, channel.id, "brief", 3.0)
+    second = await escrow.create_deal_request(user.id, channel.id, "brief", 5.0)
+    await escrow.lock_funds(first.id, "tx-1")
+    await escrow.accept_deal(first.id, owner_id=user.id)
+    await escrow.reject_deal(second.id, "no")
+
+    history = [(e.from_status, e.to_status) for e in await deal_history(session, first.id)]
+    assert history == [
+        (None, DealStatus.CREATED),
+        (DealStatus.CREATED, DealStatus.LOCKED),
+        (DealStatus.LOCKED, DealStatus.SCHEDULED),
+    ]
+
+    counts = {status: deals for status, deals in (await status_counts(session)).items() if deals}
+    assert counts == await _deal_counts(session) == {"scheduled": 1, "rejected": 1}
+
+    durations = {d.status: d for d in (await session.exec(select(StatusDuration))).all()}
+    assert durations[DealStatus.CREATED].exits == 2 and durations[DealStatus.LOCKED].exits == 1
+    stats = await session.get(ChannelDealStats, channel.id)
+    assert (stats.deals_total, stats.deals_completed) == (2, 0)
+
+
+@pytest.mark.asyncio
+async def test_completion_adds_channel_volume_and_time_in_state(session):
+    user, channel = await _channel(session)
+    deal = await EscrowService(session).create_deal_request(user.id, channel.id, "brief", 4.5)
+    published_at = datetime.utcnow()
+    deal.status = DealStatus.PUBLISHED
+    await record_changes(session, [DealChange.from_deal(deal)], published_at)
+    deal.status = DealStatus.COMPLETED
+    await record_changes(session, [DealChange.from_deal(deal)], published_at + timedelta(seconds=90))
+    await session.commit()
+
+    stats = await session.get(ChannelDealStats, channel.id)
+    assert (stats.deals_total, stats.deals_completed, stats.volume_ton) == (1, 1, 4.5)
+    published = await session.get(StatusDuration, DealStatus.PUBLISHED)
+    assert (published.exits, published.total_seconds, published.max_seconds) == (1, 90.0, 90.0)
+
+
+@pytest.mark.asyncio
+async def test_backfill_seeds_deals_that_predate_the_log(session):
+    user, channel = await _channel(session)
+    session.add_all([
+        Deal(advertiser_id=user.id, channel_id=channel.id, ad_brief="old", amount_ton=2.0, status=DealStatus.COMPLETED),
+        Deal(advertiser_id=user.id, channel_id=channel.id, ad_brief="old", amount_ton=1.0, status=DealStatus.LOCKED),
+    ])
+    await session.commit()
+
+    assert await backfill_projections(session) == 2
+    assert await backfill_projections(session) == 0 # Once only
+
+    assert await status_counts(session) == {"completed": 1, "locked": 1}
+    stats = await session.get(ChannelDealStats, channel.id)
+    assert (stats.deals_total, stats.deals_completed, stats.volume_ton) == (2, 1, 2.0)
+
+    # Later transitions continue from the snapshot event
+    locked = (await session.exec(select(Deal).where(Deal.status == DealStatus.LOCKED))).one()
+    await EscrowService(session).accept_deal(locked.id, owner_id=user.id)
+    assert await status_counts(session) == {"completed": 1, "locked": 0, "scheduled": 1}
+
+
+@pytest.mark.asyncio
+async def test_projection_upserts_lock_rows_in_key_order(session):
+    from sqlalchemy import event
+    from src.db.database import engine
+
+    user, _ = await _channel(session)
+    channels = [Channel(channel_id=-900 - i, title=f"C{i}", owner_id=user.id) for i in range(3)]
+    session.add_all(channels)
+    await session.commit()
+    deals = [
+        Deal(advertiser_id=user.id, channel_id=channel.id, ad_brief="x", status=status)
+        for channel, status in zip(reversed(channels), (DealStatus.SCHEDULED, DealStatus.CREATED, DealStatus.LOCKED))
+    ]
+    session.add_all(deals)
+    await session.commit()
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "ON CONFLICT" in statement:
+            statements.append((statement.split()[2], parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        await record_changes(session, [DealChange.from_deal(d) for d in deals], created=True)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    parameters = dict(statements)
+    # Conflict key first in each VALUES row: (channel_id, 3 stats) / (status, deals)
+    assert list(parameters["channeldealstats"][0::4]) == sorted(c.id for c in channels)
+    assert list(parameters["dealstatuscount"][0::2]) == ["CREATED", "LOCKED", "SCHEDULED"]
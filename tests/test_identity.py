@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from sqlmodel import func, select
+
+from src.db.database import async_session_maker
+from src.db.models import Channel, ChannelManager, User, UserRole
+from src.services.identity import IdentityService, identity_cache, invalidate_identity
+from tests.query_counter import QueryCounter
+
+
+@pytest.mark.asyncio
+async def test_resolve_user_skips_the_query_on_hit(session):
+    service = IdentityService(session)
+    first = await service.resolve_user(1001, "ana")
+    assert first.role == UserRole.ADVERTISER
+
+    with QueryCounter() as counter:
+        for _ in range(5):
+            assert (await service.resolve_user(1001)).id == first.id
+        assert await service.find_user_id(1001) == first.id
+    assert counter.statements == []
+
+
+@pytest.mark.asyncio
+async def test_find_user_id_does_not_create(session):
+    service = IdentityService(session)
+    assert await service.find_user_id(2002) is None
+    assert await session.get(User, 1) is None
+
+
+@pytest.mark.asyncio
+async def test_invalidation_picks_up_role_and_wallet_changes(session):
+    service = IdentityService(session)
+    cached = await service.resolve_user(3003)
+
+    user = await service.get_or_create_user(3003)
+    user.role = UserRole.OWNER
+    user.wallet_address = "EQ-new"
+    session.add(user)
+    await session.commit()
+
+    # Stale until the write path invalidates it
+    assert (await service.resolve_user(3003)).role == UserRole.ADVERTISER
+    invalidate_identity(3003)
+    fresh = await service.resolve_user(3003)
+    assert (fresh.id, fresh.role, fresh.wallet_address) == (cached.id, UserRole.OWNER, "EQ-new")
+    assert identity_cache.stats()["invalidations"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_get_or_create_converges_on_one_row(session):
+    telegram_ids = [5000 + i % 10 for i in range(40)]
+
+    async def start(telegram_id):
+        async with async_session_maker() as task_session:
+            user = await IdentityService(task_session).get_or_create_user(telegram_id, f"u{telegram_id}")
+            return telegram_id, user.id
+
+    with QueryCounter() as counter:
+        results = await asyncio.gather(*(start(t) for t in telegram_ids))
+
+    # Every racer got the same row for its telegram_id, and no duplicates exist
+    ids = {}
+    for telegram_id, user_id in results:
+        assert ids.setdefault(telegram_id, user_id) == user_id
+    rows = (await session.exec(select(func.count()).select_from(User))).one()
+    assert rows == 10
+    # At most SELECT + upsert per call: no rollback/re-SELECT fallbacks
+    assert len(counter.statements) <= 2 * len(telegram_ids)
+
+
+@pytest.mark.asyncio
+async def test_register_channel_adds_owner_as_manager_in_one_commit(session):
+    service = IdentityService(session)
+    owner = await service.get_or_create_user(6001)
+
+    channel = await service.register_channel(owner.id, -600, "Crypto Daily", "cryptodaily")
+    again = await service.register_channel(owner.id, -600, "Crypto Daily", "cryptodaily")
+    await service.add_manager(channel.id, owner.id)
+
+    assert again.id == channel.id
+    managers = (await session.exec(select(ChannelManager))).all()
+    assert [(m.user_id, m.channel_id) for m in managers] == [(owner.id, channel.id)]
+    assert (await session.exec(select(func.count()).select_from(Channel))).one() == 1
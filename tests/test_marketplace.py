@@ -0,0 +1,59 @@
+import pytest
+
+from src.db.models import Channel, User
+from src.services.marketplace import MarketplaceService, FeedFilters
+
+
+async def _seed(session, count=7):
+    owner = User(telegram_id=42)
+    session.add(owner)
+    await session.commit()
+    await session.refresh(owner)
+    for i in range(count):
+        session.add(Channel(
+            channel_id=-1000 - i,
+            title=f"Channel {i}",
+            username=None,
+            owner_id=owner.id,
+            subscribers=100 * (i // 2),  # duplicates exercise the id tie-breaker
+            language="es" if i % 2 else "en",
+            price_post=10.0 * i,
+            verified=True,
+        ))
+    session.add(Channel(channel_id=-1, title="Hidden", username=None, owner_id=owner.id, verified=False))
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_match_offset_order(session):
+    await _seed(session)
+    service = MarketplaceService(session)
+
+    expected = [c.id for c in await service.list_verified_channels(limit=100)]
+    seen, cursor = [], None
+    while True:
+        page, cursor = await service.list_verified_channels_page(limit=3, cursor=cursor)
+        seen.extend(c.id for c in page)
+        if not cursor:
+            break
+
+    assert seen == expected
+    assert len(seen) == 7
+
+
+@pytest.mark.asyncio
+async def test_feed_filters(session):
+    await _seed(session)
+    service = MarketplaceService(session)
+
+    page, _ = await service.list_verified_channels_page(
+        limit=10, filters=FeedFilters(language="es", max_price=40.0)
+    )
+    assert {c.title for c in page} == {"Channel 1", "Channel 3"}
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_rejected(session):
+    service = MarketplaceService(session)
+    with pytest.raises(ValueError):
+        await service.list_verified_channels_page(limit=3, cursor="not-a-cursor")
@@ -0,0 +1,162 @@
+import asyncio
+import os
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlmodel import SQLModel
+
+from src.core.config import settings
+from src.db.database import create_engine_from_settings
+from src.db.migrate import (
+    SCHEMA_HEAD, alembic_config, check_schema, current_revision, include_object, migrate, migration_lock,
+)
+
+
+# `SQLModel.metadata.create_all` output for the models before migrations existed
+PRE_MIGRATION_SCHEMA = (
+    """CREATE TABLE user (
+        id INTEGER NOT NULL, telegram_id BIGINT NOT NULL, username VARCHAR, wallet_address VARCHAR,
+        role VARCHAR(10) NOT NULL, PRIMARY KEY (id)
+    )""",
+    "CREATE UNIQUE INDEX ix_user_telegram_id ON user (telegram_id)",
+    "CREATE INDEX ix_user_wallet_address ON user (wallet_address)",
+    """CREATE TABLE channel (
+        id INTEGER NOT NULL, channel_id BIGINT NOT NULL, title VARCHAR NOT NULL, username VARCHAR,
+        owner_id INTEGER NOT NULL, subscribers INTEGER NOT NULL, avg_views INTEGER NOT NULL,
+        language VARCHAR NOT NULL, premium_ratio FLOAT NOT NULL, price_post FLOAT NOT NULL,
+        verified BOOLEAN NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL,
+        PRIMARY KEY (id), FOREIGN KEY(owner_id) REFERENCES user (id)
+    )""",
+    "CREATE INDEX ix_channel_owner_id ON channel (owner_id)",
+    "CREATE UNIQUE INDEX ix_channel_channel_id ON channel (channel_id)",
+    """CREATE TABLE channelmanager (
+        user_id INTEGER NOT NULL, channel_id INTEGER NOT NULL, PRIMARY KEY (user_id, channel_id),
+        FOREIGN KEY(user_id) REFERENCES user (id), FOREIGN KEY(channel_id) REFERENCES channel (id)
+    )""",
+    """CREATE TABLE deal (
+        id INTEGER NOT NULL, advertiser_id INTEGER NOT NULL, channel_id INTEGER NOT NULL,
+        status VARCHAR(18) NOT NULL, amount_ton FLOAT NOT NULL, ad_brief VARCHAR NOT NULL,
+        ad_draft VARCHAR, rejection_reason VARCHAR, scheduled_at DATETIME, published_at DATETIME,
+        escrow_wallet VARCHAR, payment_tx_hash VARCHAR, proof_link VARCHAR,
+        created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, PRIMARY KEY (id),
+        FOREIGN KEY(advertiser_id) REFERENCES user (id), FOREIGN KEY(channel_id) REFERENCES channel (id),
+        UNIQUE (payment_tx_hash)
+    )""",
+    "CREATE INDEX ix_deal_channel_id ON deal (channel_id)",
+    "CREATE INDEX ix_deal_advertiser_id ON deal (advertiser_id)",
+)
+
+
+@pytest_asyncio.fixture
+async def fresh_engine(tmp_path):
+    engine = create_engine_from_settings(f"sqlite+aiosqlite:///{tmp_path}/migrations.db")
+    yield engine
+    await engine.dispose()
+
+
+def _schema_diff(sync_conn):
+    from alembic.autogenerate import compare_metadata
+    from alembic.runtime.migration import MigrationContext
+
+    context = MigrationContext.configure(sync_conn, opts={"include_object": include_object})
+    return compare_metadata(context, SQLModel.metadata)
+
+
+def test_schema_head_matches_latest_revision():
+    from alembic.script import ScriptDirectory
+
+    assert ScriptDirectory.from_config(alembic_config()).get_current_head() == SCHEMA_HEAD
+
+
+@pytest.mark.asyncio
+async def test_migrations_build_the_model_schema(fresh_engine):
+    assert await current_revision(fresh_engine) is None
+    await migrate(fresh_engine)
+    assert await current_revision(fresh_engine) == SCHEMA_HEAD
+    async with fresh_engine.connect() as conn:
+        assert await conn.run_sync(_schema_diff) == []
+        # Full-text search table comes with the baseline
+        assert (await conn.execute(text("SELECT count(*) FROM channel_fts"))).scalar() == 0
+
+    await migrate(fresh_engine) # Already at head: no-op
+
+
+@pytest.mark.asyncio
+async def test_startup_adopts_create_all_database(fresh_engine):
+    async with fresh_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.execute(text("DROP INDEX ix_deal_due")) # Predates the hot-query indexes
+        await conn.execute(text("INSERT INTO user (id, telegram_id, role) VALUES (1, 1, 'ADVERTISER')"))
+
+    await check_schema(fresh_engine)
+
+    assert await current_revision(fresh_engine) == SCHEMA_HEAD
+    async with fresh_engine.connect() as conn:
+        assert await conn.run_sync(_schema_diff) == []
+        assert (await conn.execute(text("SELECT count(*) FROM user"))).scalar() == 1
+
+
+@pytest.mark.asyncio
+async def test_startup_refuses_outdated_schema_without_auto_migrate(fresh_engine, monkeypatch):
+    monkeypatch.setattr(settings, "DB_AUTO_MIGRATE", False)
+    with pytest.raises(RuntimeError, match="src.db.migrate"):
+        await check_schema(fresh_engine)
+    assert await current_revision(fresh_engine) is None
+
+
+@pytest.mark.asyncio
+async def test_upgrades_pre_migration_database(fresh_engine):
+    async with fresh_engine.begin() as conn:
+        for statement in PRE_MIGRATION_SCHEMA:
+            await conn.execute(text(statement))
+        await conn.execute(text("INSERT INTO user (id, telegram_id, role) VALUES (1, 1, 'OWNER')"))
+        await conn.execute(text(
+            "INSERT INTO channel VALUES (1, -1, 'C', NULL, 1, 0, 0, 'en', 0, 0, 1, '2025-01-01', '2025-01-01')"
+        ))
+        await conn.execute(text(
+            "INSERT INTO deal (id, advertiser_id, channel_id, status, amount_ton, ad_brief, created_at, updated_at) "
+            "VALUES (1, 1, 1, 'SCHEDULED', 1.0, 'ad', '2025-01-01', '2025-01-01')"
+        ))
+
+    await migrate(fresh_engine)
+
+    assert await current_revision(fresh_engine) == SCHEMA_HEAD
+    async with fresh_engine.connect() as conn:
+        assert await conn.run_sync(_schema_diff) == []
+        row = (await conn.execute(text("SELECT status, claimed_by, lease_expires_at FROM deal"))).one()
+        assert tuple(row) == ("SCHEDULED", None, None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set")
+async def test_migrations_run_online_index_builds_on_postgres():
+    """
+    Fresh Postgres schema up to head: the CONCURRENTLY index builds must run
+    while another replica's migration lock is being waited on.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    pg_engine = create_async_engine(os.environ["TEST_POSTGRES_URL"])
+    try:
+        async with pg_engine.begin() as conn:
+            await conn.execute(text("DROP SCHEMA public CASCADE"))
+            await conn.execute(text("CREATE SCHEMA public"))
+
+        async with migration_lock(pg_engine):
+            # Held elsewhere: a second migrate waits instead of racing
+            waiting = asyncio.ensure_future(migrate(pg_engine))
+            await asyncio.sleep(0.5)
+            assert not waiting.done()
+        await asyncio.wait_for(waiting, timeout=60)
+
+        assert await current_revision(pg_engine) == SCHEMA_HEAD
+        async with pg_engine.connect() as conn:
+            valid = (await conn.execute(text(
+                "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = 'ix_deal_due'"
+            ))).scalar()
+            assert valid is True
+            assert await conn.run_sync(_schema_diff) == []
+    finally:
+        await pg_engine.dispose()
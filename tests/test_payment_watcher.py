@@ -0,0 +1,100 @@
+import base64
+
+import pytest
+from tonsdk.boc import begin_cell
+
+from src.db.models import Channel, Deal, DealStatus, User, WalletCursor
+from src.services.ton import TonGateway, decode_comment
+from src.workers.payment_watcher import PaymentWatcher
+from tests.fake_toncenter import FakeToncenter
+
+NANO = 1_000_000_000
+
+
+def test_decode_comment_from_raw_body():
+    cell = begin_cell().store_uint(0, 32).store_bytes("Deal 42 ✅".encode()).end_cell()
+    body = base64.b64encode(cell.to_boc(False)).decode()
+    assert decode_comment({"msg_data": {"@type": "msg.dataRaw", "body": body}}) == "Deal 42 ✅"
+    assert decode_comment({"message": "17"}) == "17"
+    assert decode_comment({"msg_data": {"@type": "msg.dataRaw", "body": "garbage"}}) == ""
+
+
+async def _deals(session, *amounts):
+    user = User(telegram_id=5)
+    session.add(user)
+    await session.commit()
+    await session.refresh(user)
+    channel = Channel(channel_id=-5, title="C", username=None, owner_id=user.id)
+    session.add(channel)
+    await session.commit()
+    deals = [Deal(advertiser_id=user.id, channel_id=channel.id, ad_brief="x",
+                  amount_ton=amount, status=DealStatus.AWAITING_PAYMENT) for amount in amounts]
+    session.add_all(deals)
+    await session.commit()
+    return deals
+
+
+@pytest.mark.asyncio
+async def test_watcher_pages_from_cursor_and_matches_by_id_and_amount(session):
+    d1, d2, d3 = await _deals(session, 1.0, 2.0, 3.0)
+
+    async with FakeToncenter() as toncenter:
+        gateway = TonGateway("EQ-hot", base_url=toncenter.url)
+        watcher = PaymentWatcher(session, gateway, page_size=3)
+        for lt in range(1, 5):
+            toncenter.receive(lt, 5 * NANO, "old history")
+
+        # First run only bookmarks the newest tx
+        assert await watcher.poll() == []
+        assert (await session.get(WalletCursor, "EQ-hot")).last_lt == 4
+
+        toncenter.receive(10, 2 * NANO, f"{d1.id}")         # pays deal 1 in full
+        toncenter.receive(11, 1 * NANO, f"deal {d2.id}")    # underpays deal 2
+        toncenter.receive(12, 9 * NANO, "no id here")
+        for lt in range(13, 18):
+            toncenter.receive(lt, NANO, "noise")             # forces several pages
+        toncenter.receive(18, 3 * NANO, f"#{d3.id}")
+
+        assert sorted(await watcher.poll()) == [d1.id, d3.id]
+        requests_before = len(toncenter.requests)
+        assert await watcher.poll() == []                    # nothing new
+        assert len(toncenter.requests) == requests_before + 1
+        await gateway.close()
+
+    await session.refresh(d1)
+    await session.refresh(d2)
+    assert d1.status == DealStatus.SCHEDULED and d1.payment_tx_hash == "hash-10"
+    assert d2.status == DealStatus.AWAITING_PAYMENT
+    assert (await session.get(WalletCursor, "EQ-hot")).last_lt == 18
+
+
+@pytest.mark.asyncio
+async def test_backlog_over_max_pages_resumes_without_skipping(session):
+    d1, d2 = await _deals(session, 1.0, 1.0)
+
+    async with FakeToncenter() as toncenter:
+        gateway = TonGateway("EQ-hot", base_url=toncenter.url)
+        watcher = PaymentWatcher(session, gateway, page_size=3, max_pages=3)
+        toncenter.receive(4, NANO, "old history")
+        assert await watcher.poll() == []  # bookmarks lt 4
+
+        toncenter.receive(10, NANO, f"{d1.id}")  # oldest of the backlog
+        for lt in range(11, 20):
+            toncenter.receive(lt, NANO, "noise")
+
+        # Three pages (lt 19..13) do not reach lt 4: the cursor stays, the scan resumes later
+        assert await watcher.poll() == []
+        assert not watcher.caught_up
+        cursor = await session.get(WalletCursor, "EQ-hot")
+        assert (cursor.last_lt, cursor.scan_top_lt) == (4, 19)
+
+        toncenter.receive(30, NANO, f"{d2.id}")  # arrives mid-catch-up
+        assert await watcher.poll() == [d1.id]   # gap closed
+        await session.refresh(cursor)
+        assert (cursor.last_lt, cursor.scan_lt) == (19, None)
+
+        assert await watcher.poll() == [d2.id]   # then the newer txs
+        assert watcher.caught_up
+        await session.refresh(cursor)
+        assert cursor.last_lt == 30
+        await gateway.close()
@@ -0,0 +1,348 @@
+import asyncio
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import select
+from tonsdk.boc import Cell
+
+from src.core.config import settings
+from src.db.database import async_session_maker
+from src.db.models import Channel, Deal, DealStatus, Payout, PayoutStatus, User, WalletCursor
+from src.services.ton import BatchSend, TonGateway, raw_address
+from src.workers.payment_watcher import PaymentWatcher
+from src.workers.payouts import PayoutAggregator, queue_missing_payouts, queue_payout
+from tests.fake_toncenter import FakeToncenter
+from tests.test_ton_gateway import DESTINATION, TEST_MNEMONIC
+
+NANO = 1_000_000_000
+
+
+class FakeGateway:
+    def __init__(self, max_outputs=4, sequential=True, fail=False, ambiguous=False):
+        self.max_outputs = max_outputs
+        self.sequential = sequential
+        self.fail = fail
+        self.ambiguous = ambiguous
+        self.batches = []
+
+    async def send_ton_batch(self, orders):
+        if self.fail:
+            return BatchSend()
+        self.batches.append(orders)
+        batch_ref = f"seqno:{len(self.batches)}"
+        return BatchSend(batch_ref, accepted=not self.ambiguous, ambiguous=self.ambiguous)
+
+
+async def make_payouts(session, count, destination=DESTINATION, created_at=None):
+    owner = User(telegram_id=1, wallet_address=destination)
+    session.add(owner)
+    await session.commit()
+    await session.refresh(owner)
+    channel = Channel(channel_id=-100, title="C", owner_id=owner.id)
+    session.add(channel)
+    await session.commit()
+    for i in range(count):
+        deal = Deal(advertiser_id=owner.id, channel_id=channel.id, ad_brief=str(i),
+                    amount_ton=1.5, status=DealStatus.PUBLISHED)
+        session.add(deal)
+        await session.flush()
+        payout = queue_payout(session, deal, destination)
+        if created_at:
+            payout.created_at = created_at
+    await session.commit()
+
+
+async def payouts_by_status(session, status):
+    return (await session.exec(select(Payout).where(Payout.status == status))).all()
+
+
+@pytest.mark.asyncio
+async def test_sweep_queues_payout_once_owner_links_wallet(session):
+    await make_payouts(session, 1)
+    owner = (await session.exec(select(User))).one()
+    # Published while the owner had no wallet: no payout row
+    owner.wallet_address = None
+    late = Deal(advertiser_id=owner.id, channel_id=(await session.exec(select(Channel))).one().id,
+                ad_brief="late", amount_ton=2.0, status=DealStatus.PUBLISHED)
+    session.add_all([owner, late])
+    await session.commit()
+    assert await queue_missing_payouts(session) == 0
+
+    owner.wallet_address = DESTINATION
+    session.add(owner)
+    await session.commit()
+    assert await queue_missing_payouts(session) == 1
+    assert await queue_missing_payouts(session) == 0
+
+    payout = (await session.exec(select(Payout).where(Payout.deal_id == late.id))).one()
+    assert (payout.status, payout.destination, payout.amount_ton) == (PayoutStatus.QUEUED, DESTINATION, 2.0)
+    assert payout.memo == f"TG-ADMC Payout #{late.id}"
+
+
+@pytest.mark.asyncio
+async def test_partial_batch_waits_for_size_or_age(session):
+    await make_payouts(session, 2)
+    gateway = FakeGateway()
+    aggregator = PayoutAggregator(session, gateway, flush_size=4, max_delay=30)
+
+    assert await aggregator.flush() == 0
+    assert gateway.batches == []
+
+    # The oldest payout has waited long enough: send what we have
+    assert await aggregator.flush(now=datetime.utcnow() + timedelta(seconds=31)) == 2
+    assert len(gateway.batches) == 1
+    sent = await payouts_by_status(session, PayoutStatus.SENT)
+    assert [p.batch_ref for p in sent] == ["seqno:1", "seqno:1"]
+
+
+@pytest.mark.asyncio
+async def test_seqno_wallet_sends_one_message_per_flush(session):
+    await make_payouts(session, 6)
+    gateway = FakeGateway(max_outputs=4, sequential=True)
+    aggregator = PayoutAggregator(session, gateway, flush_size=4)
+
+    assert await aggregator.flush() == 4
+    assert [len(batch) for batch in gateway.batches] == [4]
+    assert len(await payouts_by_status(session, PayoutStatus.QUEUED)) == 2
+
+
+@pytest.mark.asyncio
+async def test_highload_wallet_sends_several_messages(session, monkeypatch):
+    monkeypatch.setattr(settings, "PAYOUT_MESSAGES_PER_FLUSH", 4)
+    await make_payouts(session, 6)
+    gateway = FakeGateway(max_outputs=4, sequential=False)
+
+    assert await PayoutAggregator(session, gateway, flush_size=4).flush() == 6
+    assert [len(batch) for batch in gateway.batches] == [4, 2]
+
+
+@pytest.mark.asyncio
+async def test_failed_broadcast_backs_off_then_gives_up(session, monkeypatch):
+    monkeypatch.setattr(settings, "PAYOUT_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "PAYOUT_RETRY_BASE_SECONDS", 10)
+    await make_payouts(session, 4)
+    gateway = FakeGateway(fail=True)
+    aggregator = PayoutAggregator(session, gateway)
+    now = datetime.utcnow()
+
+    assert await aggregator.flush(now=now) == 0
+    queued = await payouts_by_status(session, PayoutStatus.QUEUED)
+    assert {p.attempts for p in queued} == {1}
+    assert all(p.next_attempt_at == now + timedelta(seconds=10) for p in queued)
+
+    # Still backing off: nothing is even loaded
+    assert await aggregator.load_queued(now + timedelta(seconds=5), 10) == []
+
+    assert await aggregator.flush(now=now + timedelta(seconds=10)) == 0
+    assert {p.next_attempt_at for p in await payouts_by_status(session, PayoutStatus.QUEUED)} == {now + timedelta(seconds=30)}
+
+    assert await aggregator.flush(now=now + timedelta(seconds=30)) == 0
+    failed = await payouts_by_status(session, PayoutStatus.FAILED)
+    assert len(failed) == 4 and failed[0].last_error == "broadcast rejected"
+
+
+@pytest.mark.asyncio
+async def test_ambiguous_broadcast_waits_for_the_chain(session):
+    await make_payouts(session, 6)
+    gateway = FakeGateway(ambiguous=True)
+    aggregator = PayoutAggregator(session, gateway)
+    # Counted as sent, and nothing more goes out until the chain answers
+    assert await aggregator.flush(force=True) == 4
+    sent = await payouts_by_status(session, PayoutStatus.SENT)
+    assert len(sent) == 4 and {p.batch_ref for p in sent} == {"seqno:1"}
+    assert all(p.attempts == 0 and p.last_error == "broadcast unconfirmed" for p in sent)
+
+    # Next flush never re-sends them (only the 2 still queued go out)
+    gateway.ambiguous = False
+    assert await aggregator.flush(force=True) == 2
+    assert [len(orders) for orders in gateway.batches] == [4, 2]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_aggregators_broadcast_each_payout_once(session, monkeypatch):
+    # Highload wallet: no seqno would reject a duplicate message
+    monkeypatch.setattr(settings, "WALLET_MNEMONIC", TEST_MNEMONIC)
+    monkeypatch.setattr(settings, "WALLET_VERSION", "hv2")
+    await make_payouts(session, 3)
+
+    both_read = asyncio.Barrier(2)
+
+    def reading_together(aggregator):
+        load = aggregator.load_queued
+
+        async def load_queued(now, limit):
+            queued = await load(now, limit)
+            await both_read.wait() # Both workers have seen the same QUEUED rows
+            return queued
+        aggregator.load_queued = load_queued
+        return aggregator
+
+    async with FakeToncenter() as toncenter, async_session_maker() as other:
+        gateways = [TonGateway("EQ-hot", base_url=toncenter.url) for _ in range(2)]
+        try:
+            flushed = await asyncio.gather(
+                reading_together(PayoutAggregator(session, gateways[0], worker_id="w1")).flush(force=True),
+                reading_together(PayoutAggregator(other, gateways[1], worker_id="w2")).flush(force=True),
+            )
+        finally:
+            for gateway in gateways:
+                await gateway.close()
+
+    assert sorted(flushed) == [0, 3]
+    assert len(toncenter.sent_bocs) == 1
+    sent = (await session.exec(
+        select(Payout).where(Payout.status == PayoutStatus.SENT).execution_options(populate_existing=True)
+    )).all()
+    assert len(sent) == 3 and len({p.claimed_by for p in sent}) == 1
+
+
+@pytest.mark.asyncio
+async def test_rejected_and_unattempted_claims_return_to_the_queue(session):
+    await make_payouts(session, 6)
+    gateway = FakeGateway(max_outputs=2, sequential=False, fail=True)
+    assert await PayoutAggregator(session, gateway, worker_id="w1").flush(force=True) == 0
+
+    queued = await payouts_by_status(session, PayoutStatus.QUEUED)
+    assert len(queued) == 6 and all(p.claimed_by is None and p.sent_at is None for p in queued)
+    # The first batch was rejected; the others were never attempted
+    assert sorted(p.attempts for p in queued) == [0, 0, 0, 0, 1, 1]
+
+
+@pytest.mark.asyncio
+async def test_invalid_destination_is_failed_not_batched(session):
+    await make_payouts(session, 2, destination="EQ-not-an-address")
+    gateway = FakeGateway()
+    assert await PayoutAggregator(session, gateway).flush(force=True) == 0
+    assert gateway.batches == []
+    assert len(await payouts_by_status(session, PayoutStatus.FAILED)) == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("version", ["v4r2", "hv2"])
+async def test_gateway_packs_batch_into_one_message(monkeypatch, version):
+    monkeypatch.setattr(settings, "WALLET_MNEMONIC", TEST_MNEMONIC)
+    monkeypatch.setattr(settings, "WALLET_VERSION", version)
+    from src.services.ton import TransferOrder
+
+    async with FakeToncenter() as toncenter:
+        gateway = TonGateway("EQ-hot-wallet", base_url=toncenter.url)
+        try:
+            orders = [TransferOrder(DESTINATION, 0.1, f"payout {i}") for i in range(4)]
+            assert (await gateway.send_ton_batch(orders)).accepted
+            with pytest.raises(ValueError):
+                await gateway.send_ton_batch(orders[:1] * (gateway.max_outputs + 1))
+        finally:
+            await gateway.close()
+
+    assert len(toncenter.sent_bocs) == 1
+    message = Cell.one_from_boc(base64.b64decode(toncenter.sent_bocs[0]))
+    if version == "v4r2":
+        # One (send_mode, order) action per payout, as refs of the body
+        assert len(message.refs) == 4
+    else:
+        # Highload: the body holds a dict of orders
+        assert len(message.refs) == 1
+
+
+@pytest.mark.asyncio
+async def test_watcher_confirms_payouts_and_completes_deals(session):
+    await make_payouts(session, 3)
+    gateway = FakeGateway()
+    assert await PayoutAggregator(session, gateway).flush(force=True) == 3
+    payouts = await payouts_by_status(session, PayoutStatus.SENT)
+    # toncenter may report the destination in another user-friendly form
+    destination = raw_address(DESTINATION)
+
+    async with FakeToncenter() as toncenter:
+        ton = TonGateway("EQ-hot", base_url=toncenter.url)
+        session.add(WalletCursor(address="EQ-hot", last_lt=1))
+        await session.commit()
+        toncenter.send(5, [
+            (destination, int(1.5 * NANO), payouts[0].memo),
+            (destination, int(1.5 * NANO), payouts[1].memo),
+            (destination, NANO, payouts[2].memo),  # wrong amount: not ours
+        ])
+        await PaymentWatcher(session, ton).poll()
+        await ton.close()
+
+    confirmed = await payouts_by_status(session, PayoutStatus.CONFIRMED)
+    assert sorted(p.deal_id for p in confirmed) == sorted([payouts[0].deal_id, payouts[1].deal_id])
+    assert all(p.tx_hash == "hash-5" for p in confirmed)
+    completed = (await session.exec(select(Deal).where(Deal.status == DealStatus.COMPLETED))).all()
+    assert sorted(d.id for d in completed) == sorted(p.deal_id for p in confirmed)
+
+
+@pytest.mark.asyncio
+async def test_unconfirmed_payout_is_requeued_after_expiry(session, monkeypatch):
+    monkeypatch.setattr(settings, "PAYOUT_CONFIRM_TIMEOUT_SECONDS", 180)
+    await make_payouts(session, 1)
+    long_ago = datetime.utcnow() - timedelta(minutes=5)
+    assert await PayoutAggregator(session, FakeGateway()).flush(now=long_ago, force=True) == 1
+
+    async with FakeToncenter() as toncenter:
+        ton = TonGateway("EQ-hot", base_url=toncenter.url)
+        watcher = PaymentWatcher(session, ton)
+        # First run has no cursor: history is unknown, never re-queue blindly
+        toncenter.receive(1, NANO, "noise")
+        await watcher.poll()
+        assert len(await payouts_by_status(session, PayoutStatus.SENT)) == 1
+        # Caught up and still not seen: the message expired unsent
+        await watcher.poll()
+        await ton.close()
+
+    requeued = await payouts_by_status(session, PayoutStatus.QUEUED)
+    assert len(requeued) == 1 and requeued[0].batch_ref is None and requeued[0].attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_payout_stranded_in_sending_is_requeued(session, monkeypatch):
+    monkeypatch.setattr(settings, "PAYOUT_CONFIRM_TIMEOUT_SECONDS", 180)
+    await make_payouts(session, 1)
+    aggregator = PayoutAggregator(session, FakeGateway(), worker_id="w1")
+    # The worker claimed it, then died before recording the broadcast
+    long_ago = datetime.utcnow() - timedelta(minutes=5)
+    await aggregator.claim(await aggregator.load_queued(long_ago, 10), long_ago)
+    assert await aggregator.load_queued(datetime.utcnow(), 10) == []
+
+    async with FakeToncenter() as toncenter:
+        ton = TonGateway("EQ-hot", base_url=toncenter.url)
+        session.add(WalletCursor(address="EQ-hot", last_lt=1))
+        await session.commit()
+        await PaymentWatcher(session, ton).poll()
+        await ton.close()
+
+    requeued = await payouts_by_status(session, PayoutStatus.QUEUED)
+    assert len(requeued) == 1 and requeued[0].claimed_by is None
+
+
+@pytest.mark.asyncio
+async def test_payouts_are_confirmed_on_the_signing_wallet(session, monkeypatch):
+    from src.services import ton as ton_module
+    from src.workers import scheduler
+
+    # hv2 signs from its own address, not from the hot wallet payments go to
+    monkeypatch.setattr(settings, "WALLET_MNEMONIC", TEST_MNEMONIC)
+    monkeypatch.setattr(settings, "WALLET_VERSION", "hv2")
+    await make_payouts(session, 1)
+    assert await PayoutAggregator(session, FakeGateway()).flush(force=True) == 1
+    payout = (await payouts_by_status(session, PayoutStatus.SENT))[0]
+
+    async with FakeToncenter() as toncenter:
+        ton = TonGateway("EQ-hot", base_url=toncenter.url)
+        monkeypatch.setattr(ton_module, "_gateway", ton)
+        payout_wallet = ton.payout_address
+        session.add_all([WalletCursor(address="EQ-hot", last_lt=1),
+                         WalletCursor(address=payout_wallet, last_lt=1)])
+        await session.commit()
+        toncenter.send(5, [(payout.destination, int(1.5 * NANO), payout.memo)], address=payout_wallet)
+
+        await scheduler.watch_payments()
+        assert len(await payouts_by_status(session, PayoutStatus.SENT)) == 1
+        await scheduler.watch_payouts()
+        await ton.close()
+
+    session.expire_all()
+    confirmed = await payouts_by_status(session, PayoutStatus.CONFIRMED)
+    assert [p.deal_id for p in confirmed] == [payout.deal_id]
+    assert (await session.get(WalletCursor, payout_wallet)).last_lt == 5
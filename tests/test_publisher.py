@@ -0,0 +1,208 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlmodel import select
+
+from src.core.config import settings
+from src.db.models import Channel, Deal, DealStatus, Payout, PayoutStatus, User
+from src.workers.publisher import RateLimiter, claim_due_deals, run_publish_pipeline
+
+
+class FakeBot:
+    def __init__(self, fail_chat=None):
+        self.sent = []
+        self.fail_chat = fail_chat
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        if chat_id == self.fail_chat:
+            raise RuntimeError("chat not found")
+        self.sent.append((chat_id, time.monotonic()))
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(message_id=len(self.sent))
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_same_chat():
+    limiter = RateLimiter(rate=1000, per_key_interval=0.05)
+    start = time.monotonic()
+    await asyncio.gather(*(limiter.acquire(1) for _ in range(3)))
+    assert time.monotonic() - start >= 0.1
+
+
+@pytest.mark.asyncio
+async def test_per_chat_interval_holds_across_runs(session, monkeypatch):
+    monkeypatch.setattr(settings, "TELEGRAM_PER_CHAT_INTERVAL", 0.2)
+    owner = User(telegram_id=6)
+    session.add(owner)
+    await session.commit()
+    await session.refresh(owner)
+    channel = Channel(channel_id=-600, title="C", owner_id=owner.id)
+    session.add(channel)
+    await session.commit()
+
+    bot = FakeBot()
+    past = datetime.utcnow() - timedelta(minutes=1)
+    for i in range(2):
+        # One deal per run, as when the timer fires twice for one channel
+        session.add(Deal(advertiser_id=owner.id, channel_id=channel.id, ad_brief=f"ad {i}",
+                         status=DealStatus.SCHEDULED, scheduled_at=past))
+        await session.commit()
+        assert (await run_publish_pipeline(session, bot)).published == 1
+
+    (_, first), (_, second) = bot.sent
+    assert second - first >= 0.19
+
+
+@pytest.mark.asyncio
+async def test_pipeline_publishes_due_deals(session, monkeypatch):
+    monkeypatch.setattr(settings, "TELEGRAM_PER_CHAT_INTERVAL", 0.02)
+    monkeypatch.setattr(settings, "PUBLISH_COMMIT_BATCH", 2)
+
+    owner = User(telegram_id=1, wallet_address="EQ-owner")
+    session.add(owner)
+    await session.commit()
+    await session.refresh(owner)
+    channels = [Channel(channel_id=-100 - i, title=f"C{i}", username=f"c{i}", owner_id=owner.id) for i in range(3)]
+    session.add_all(channels)
+    await session.commit()
+
+    past = datetime.utcnow() - timedelta(minutes=1)
+    for i in range(5):
+        session.add(Deal(advertiser_id=owner.id, channel_id=channels[i % 2].id, ad_brief=f"ad {i}",
+                         amount_ton=1.0, status=DealStatus.SCHEDULED, scheduled_at=past))
+    session.add(Deal(advertiser_id=owner.id, channel_id=channels[2].id, ad_brief="broken",
+                     status=DealStatus.SCHEDULED, scheduled_at=past))
+    session.add(Deal(advertiser_id=owner.id, channel_id=channels[0].id, ad_brief="later",
+                     status=DealStatus.SCHEDULED, scheduled_at=datetime.utcnow() + timedelta(hours=1)))
+    await session.commit()
+
+    bot = FakeBot(fail_chat=channels[2].channel_id)
+    metrics = await run_publish_pipeline(session, bot)
+
+    assert (metrics.due, metrics.published, metrics.failed) == (6, 5, 1)
+    assert set(metrics.stages_ms) == {"claim", "load", "publish", "send", "commit"}
+
+    # Same channel never receives two posts closer than the per-chat interval
+    by_chat = {}
+    for chat_id, at in bot.sent:
+        by_chat.setdefault(chat_id, []).append(at)
+    for times in by_chat.values():
+        assert all(b - a >= 0.015 for a, b in zip(times, times[1:]))
+
+    # COMPLETED only once the payout is confirmed on-chain
+    published = (await session.exec(select(Deal).where(Deal.status == DealStatus.PUBLISHED))).all()
+    assert len(published) == 5
+    assert all(d.proof_link.startswith("https://t.me/c") for d in published)
+
+    # Payouts are only queued here; the aggregator sends them
+    payouts = (await session.exec(select(Payout))).all()
+    assert sorted(p.deal_id for p in payouts) == sorted(d.id for d in published)
+    assert all(p.status == PayoutStatus.QUEUED and p.destination == "EQ-owner" for p in payouts)
+
+
+@pytest.mark.asyncio
+async def test_claims_are_exclusive_until_lease_expires(session, monkeypatch):
+    monkeypatch.setattr(settings, "PUBLISH_LEASE_SECONDS", 60)
+    owner = User(telegram_id=2)
+    session.add(owner)
+    await session.commit()
+    await session.refresh(owner)
+    channel = Channel(channel_id=-200, title="C", username=None, owner_id=owner.id)
+    session.add(channel)
+    await session.commit()
+    past = datetime.utcnow() - timedelta(minutes=1)
+    session.add_all([
+        Deal(advertiser_id=owner.id, channel_id=channel.id, ad_brief=str(i),
+             status=DealStatus.SCHEDULED, scheduled_at=past)
+        for i in range(5)
+    ])
+    await session.commit()
+
+    now = datetime.utcnow()
+    first = await claim_due_deals(session, "worker-a", now, limit=3)
+    second = await claim_due_deals(session, "worker-b", now, limit=3)
+    assert len(first) == 3 and len(second) == 2
+    assert not set(first) & set(second)
+    assert await claim_due_deals(session, "worker-c", now) == []
+
+    # worker-a crashed: once its lease lapses the deals are up for grabs again
+    later = now + timedelta(seconds=61)
+    assert sorted(await claim_due_deals(session, "worker-c", later)) == sorted(first + second)
+
+
+@pytest.mark.asyncio
+async def test_lost_lease_is_not_published_twice(session, monkeypatch):
+    monkeypatch.setattr(settings, "PUBLISH_LEASE_SECONDS", 60)
+    owner = User(telegram_id=3, wallet_address="EQ-owner")
+    session.add(owner)
+    await session.commit()
+    await session.refresh(owner)
+    channel = Channel(channel_id=-300, title="C", username="c", owner_id=owner.id)
+    session.add(channel)
+    await session.commit()
+    deal = Deal(advertiser_id=owner.id, channel_id=channel.id, ad_brief="ad", amount_ton=1.0,
+                status=DealStatus.SCHEDULED, scheduled_at=datetime.utcnow() - timedelta(minutes=1))
+    session.add(deal)
+    await session.commit()
+    deal_id = deal.id
+
+    class SlowBot(FakeBot):
+        async def send_message(self, chat_id, text, parse_mode=None):
+            # Worker-a stalls past its lease; worker-b re-claims and publishes
+            if not self.sent:
+                later = datetime.utcnow() + timedelta(seconds=61)
+                assert await claim_due_deals(session, "worker-b", later) == [deal_id]
+            return await super().send_message(chat_id, text, parse_mode)
+
+    metrics = await run_publish_pipeline(session, SlowBot(), worker_id="worker-a")
+    assert (metrics.published, metrics.lost) == (0, 1)
+    stored = (await session.exec(select(Deal).where(Deal.id == deal_id).execution_options(populate_existing=True))).one()
+    assert stored.status == DealStatus.SCHEDULED and stored.claimed_by == "worker-b"
+    assert (await session.exec(select(Payout))).all() == []
+
+
+@pytest.mark.asyncio
+async def test_no_send_after_lease_deadline(session, monkeypatch):
+    monkeypatch.setattr(settings, "PUBLISH_LEASE_SECONDS", 1)
+    monkeypatch.setattr(settings, "PUBLISH_LEASE_MARGIN_SECONDS", 1)
+    owner = User(telegram_id=4)
+    session.add(owner)
+    await session.commit()
+    await session.refresh(owner)
+    channel = Channel(channel_id=-400, title="C", owner_id=owner.id)
+    session.add(channel)
+    await session.commit()
+    session.add(Deal(advertiser_id=owner.id, channel_id=channel.id, ad_brief="ad",
+                     status=DealStatus.SCHEDULED, scheduled_at=datetime.utcnow() - timedelta(minutes=1)))
+    await session.commit()
+
+    bot = FakeBot()
+    metrics = await run_publish_pipeline(session, bot)
+    assert bot.sent == [] and metrics.failed == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_send_keeps_lease_until_it_expires(session, monkeypatch):
+    monkeypatch.setattr(settings, "PUBLISH_LEASE_SECONDS", 60)
+    owner = User(telegram_id=5)
+    session.add(owner)
+    await session.commit()
+    await session.refresh(owner)
+    channel = Channel(channel_id=-500, title="C", owner_id=owner.id)
+    session.add(channel)
+    await session.commit()
+    session.add(Deal(advertiser_id=owner.id, channel_id=channel.id, ad_brief="ad",
+                     status=DealStatus.SCHEDULED, scheduled_at=datetime.utcnow() - timedelta(minutes=1)))
+    await session.commit()
+
+    bot = FakeBot(fail_chat=channel.channel_id)
+    first = await run_publish_pipeline(session, bot)
+    assert (first.due, first.failed) == (1, 1)
+    # Same tick: nothing to claim, so the scheduler loop stops
+    assert (await run_publish_pipeline(session, bot)).due == 0
+    # Retried once the lease lapses
+    later = datetime.utcnow() + timedelta(seconds=61)
+    assert len(await claim_due_deals(session, "worker-b", later)) == 1
@@ -0,0 +1,57 @@
+import httpx
+import pytest
+
+from src.core.config import settings
+from src.core.roles import ProcessPlan, process_plan
+from src.main import create_app
+
+
+async def _status(role, method, path, **kwargs):
+    app = create_app(process_plan(role))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return (await client.request(method, path, **kwargs)).status_code
+
+
+def test_process_plan_per_role(monkeypatch):
+    assert process_plan("api") == ProcessPlan("api", api=True, webhook=False, scheduler=False)
+    assert process_plan("webhook") == ProcessPlan("webhook", api=False, webhook=True, scheduler=False)
+    assert process_plan("worker") == ProcessPlan("worker", api=False, webhook=False, scheduler=True)
+    assert process_plan("all") == ProcessPlan("all", api=True, webhook=True, scheduler=True)
+    monkeypatch.setattr(settings, "RUN_EMBEDDED_WORKER", False)
+    assert process_plan("all").scheduler is False
+    with pytest.raises(ValueError):
+        process_plan("cron")
+
+
+@pytest.mark.asyncio
+async def test_role_selects_routes(session):
+    # A non-object body is rejected (422) before reaching the dispatcher: the route exists
+    webhook = ("POST", settings.WEBHOOK_PATH)
+    for role, served, missing in (
+        ("api", [("GET", "/api/channels"), ("GET", "/admin/cache")], [webhook]),
+        ("webhook", [webhook], [("GET", "/api/channels"), ("GET", "/app")]),
+        ("worker", [], [("GET", "/api/channels"), ("GET", "/app"), webhook]),
+        ("all", [("GET", "/api/channels"), webhook], []),
+    ):
+        assert await _status(role, "GET", "/health") == 200, role
+        for method, path in served:
+            assert await _status(role, method, path, json=[]) != 404, (role, path)
+        for method, path in missing:
+            assert await _status(role, method, path, json=[]) == 404, (role, path)
+
+
+@pytest.mark.asyncio
+async def test_standalone_worker_checks_schema_before_scheduling(monkeypatch):
+    import src.db.database as database
+    import src.workers.scheduler as scheduler
+    from src.workers import worker
+
+    async def outdated():
+        raise RuntimeError("schema is behind")
+
+    started = []
+    monkeypatch.setattr(database, "init_db", outdated)
+    monkeypatch.setattr(scheduler, "start_scheduler", lambda: started.append(True))
+    with pytest.raises(RuntimeError, match="schema is behind"):
+        await worker.main()
+    assert started == []
@@ -0,0 +1,40 @@
+import pytest
+
+from src.services.identity import IdentityService
+from src.services.search import ChannelSearchService
+
+
+async def _register(identity, owner_id, channel_id, title, username, subscribers):
+    channel = await identity.register_channel(owner_id, channel_id, title, username)
+    return await identity.verify_channel_stats(channel.id, {"subscribers": subscribers})
+
+
+@pytest.mark.asyncio
+async def test_prefix_search_blends_popularity(session):
+    identity = IdentityService(session)
+    owner = await identity.get_or_create_user(telegram_id=99)
+    await _register(identity, owner.id, -1, "Crypto News Daily", "cryptonews", 50)
+    await _register(identity, owner.id, -2, "Crypto Signals", "signals", 250_000)
+    await _register(identity, owner.id, -3, "Cooking Club", "cooking", 1_000_000)
+
+    results = await ChannelSearchService(session).search("cryp", limit=10)
+
+    assert [c.title for c in results] == ["Crypto Signals", "Crypto News Daily"]
+
+
+@pytest.mark.asyncio
+async def test_search_matches_username_and_ignores_unverified(session):
+    identity = IdentityService(session)
+    owner = await identity.get_or_create_user(telegram_id=100)
+    await _register(identity, owner.id, -10, "Daily Memes", "memelord", 10)
+    await identity.register_channel(owner.id, -11, "Meme Drafts", "memedrafts")  # never verified
+
+    results = await ChannelSearchService(session).search("memel")
+    assert [c.username for c in results] == ["memelord"]
+
+
+@pytest.mark.asyncio
+async def test_operator_characters_are_stripped(session):
+    service = ChannelSearchService(session)
+    assert service.tokenize('"crypto" OR title:*') == ["crypto", "or", "title"]
+    assert await service.search('"*') == []
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+import time
+
+from src.core.startup import StartupReport
+
+
+def test_report_marks_consecutive_phases():
+    report = StartupReport()
+    time.sleep(0.01)
+    report.mark("imports")
+    report.mark("db")
+    names = [name for name, _ in report.phases]
+    assert names == ["imports", "db"]
+    assert report.phases[0][1] >= 10
+    assert report.total_ms == sum(ms for _, ms in report.phases)
+    assert report.summary().startswith("Startup ready in")
+
+
+def test_web_process_import_defers_heavy_packages():
+    """Importing the app must not pull aiogram, the TON SDK or APScheduler."""
+    code = (
+        "import sys, src.main; "
+        "print('loaded:' + ','.join(m for m in ('aiogram', 'tonsdk', 'apscheduler') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, env=dict(os.environ), check=True,
+    )
+    assert result.stdout.strip().splitlines()[-1] == "loaded:"
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.workers import timer
+
+
+@pytest.mark.asyncio
+async def test_fires_at_due_time_and_earlier_entries_preempt():
+    fired = []
+
+    async def on_due():
+        fired.append(datetime.utcnow())
+
+    due_timer = timer.DueTimer(on_due)
+    due_timer.start()
+    start = datetime.utcnow()
+    due_timer.schedule(1, start + timedelta(seconds=5))
+    await asyncio.sleep(0.01)
+    due_timer.schedule(2, start + timedelta(seconds=0.1))  # must wake the sleeping loop
+
+    await asyncio.sleep(0.3)
+    due_timer.stop()
+
+    assert len(fired) == 1
+    assert timedelta(seconds=0.1) <= fired[0] - start < timedelta(seconds=1)
+    assert len(due_timer) == 1  # deal 1 still pending
+
+
+@pytest.mark.asyncio
+async def test_same_moment_entries_coalesce():
+    calls = []
+
+    async def on_due():
+        calls.append(1)
+
+    due_timer = timer.DueTimer(on_due)
+    now = datetime.utcnow()
+    for deal_id in range(3):
+        due_timer.schedule(deal_id, now)
+    due_timer.start()
+    await asyncio.sleep(0.05)
+    due_timer.stop()
+
+    assert calls == [1]
+
+
+def test_notify_is_noop_without_running_worker(monkeypatch):
+    monkeypatch.setattr(timer, "due_timer", None)
+    timer.notify_deal_scheduled(1, datetime.utcnow())  # must not raise
+
+
+@pytest.mark.asyncio
+async def test_poll_feeds_deals_scheduled_by_other_processes(session, monkeypatch):
+    from src.db.models import Channel, Deal, DealStatus, User
+    from src.workers import scheduler
+
+    owner = User(telegram_id=1)
+    session.add(owner)
+    await session.commit()
+    channel = Channel(channel_id=-1, title="C", owner_id=owner.id)
+    session.add(channel)
+    await session.commit()
+    due_at = datetime.utcnow() + timedelta(minutes=5)
+    # Committed by an API process: its notify_deal_scheduled was a no-op
+    deal = Deal(advertiser_id=owner.id, channel_id=channel.id, ad_brief="ad",
+                status=DealStatus.SCHEDULED, scheduled_at=due_at)
+    session.add(deal)
+    await session.commit()
+
+    async def on_due():
+        pass
+
+    monkeypatch.setattr(timer, "due_timer", timer.DueTimer(on_due))
+    await scheduler.poll_next_due()
+    await scheduler.poll_next_due()  # already queued: not pushed again
+    assert timer.due_timer.earliest == due_at and len(timer.due_timer) == 1
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from src.core.config import settings
+from src.services.ton import SeqnoManager, TonGateway, TransferOrder, derive_wallet
+from tests.fake_toncenter import FakeToncenter
+
+
+@pytest.mark.asyncio
+async def test_calls_reuse_one_pooled_connection():
+    async with FakeToncenter() as toncenter:
+        gateway = TonGateway("EQ-hot-wallet", api_key="secret", base_url=toncenter.url)
+        await gateway.start()
+        try:
+            for _ in range(10):
+                assert await gateway.check_connection()
+            assert await gateway._get_seqno("EQ-hot-wallet") == 7
+        finally:
+            await gateway.close()
+
+    assert len(toncenter.requests) == 11
+    assert len(toncenter.connections) == 1
+
+
+@pytest.mark.asyncio
+async def test_session_is_created_lazily_and_recreated_after_close():
+    async with FakeToncenter() as toncenter:
+        gateway = TonGateway("EQ-hot-wallet", base_url=toncenter.url)
+        assert await gateway.check_connection()
+        await gateway.close()
+        assert await gateway.check_connection()
+        await gateway.close()
+
+
+DESTINATION = "EQD__________________________________________0vo"
+TEST_MNEMONIC = (
+    "display chronic leaf atom retire super alcohol sound muffin forum scatter twin "
+    "stuff online auction online blame deny drum segment urge fade critic endless"
+)
+
+
+def seqno_lookups(toncenter):
+    return sum(1 for path, _ in toncenter.requests if path == "/runGetMethod")
+
+
+@pytest.mark.asyncio
+async def test_payouts_track_seqno_locally(monkeypatch):
+    monkeypatch.setattr(settings, "WALLET_MNEMONIC", TEST_MNEMONIC)
+    derive_wallet.cache_clear()
+    async with FakeToncenter(seqno=7) as toncenter:
+        gateway = TonGateway("EQ-hot-wallet", base_url=toncenter.url)
+        try:
+            results = await asyncio.gather(*(
+                gateway.send_ton_transfer(DESTINATION, 0.1, f"payout {n}") for n in range(3)
+            ))
+        finally:
+            await gateway.close()
+
+    assert results == ["pending_hash"] * 3
+    assert len(toncenter.sent_bocs) == 3
+    # One chain lookup, then 7, 8, 9 are assigned locally
+    assert seqno_lookups(toncenter) == 1
+    assert gateway._seqno._next == 10
+    # Key derivation ran once for all payouts
+    assert derive_wallet.cache_info().misses == 1
+
+
+@pytest.mark.asyncio
+async def test_rejected_payout_resyncs_from_chain(monkeypatch):
+    monkeypatch.setattr(settings, "WALLET_MNEMONIC", TEST_MNEMONIC)
+    async with FakeToncenter(seqno=7) as toncenter:
+        gateway = TonGateway("EQ-hot-wallet", base_url=toncenter.url)
+        try:
+            toncenter.reject_sends = True
+            assert await gateway.send_ton_transfer(DESTINATION, 0.1, "payout") is None
+            toncenter.reject_sends = False
+            assert await gateway.send_ton_transfer(DESTINATION, 0.1, "payout") == "pending_hash"
+        finally:
+            await gateway.close()
+
+    assert seqno_lookups(toncenter) == 2
+
+
+@pytest.mark.asyncio
+async def test_gateway_error_on_send_is_ambiguous(monkeypatch):
+    monkeypatch.setattr(settings, "WALLET_MNEMONIC", TEST_MNEMONIC)
+    async with FakeToncenter(seqno=7) as toncenter:
+        gateway = TonGateway("EQ-hot-wallet", base_url=toncenter.url)
+        try:
+            toncenter.gateway_error_sends = True
+            result = await gateway.send_ton_batch([TransferOrder(DESTINATION, 0.1, "payout")])
+            assert (result.batch_ref, result.accepted, result.ambiguous) == ("seqno:7", False, True)
+            # seqno 7 may still land: it is never signed again
+            assert await gateway._seqno.next() == 8
+        finally:
+            await gateway.close()
+
+
+@pytest.mark.asyncio
+async def test_resync_never_reuses_an_unexpired_seqno():
+    now = [0.0]
+    chain = [7]
+
+    async def fetch():
+        return chain[0]
+
+    manager = SeqnoManager(fetch, message_ttl=60, clock=lambda: now[0])
+    assert await manager.next() == 7
+    manager.mark_sent(7)
+
+    # The chain hasn't seen seqno 7 yet: a resync must not hand it out again
+    manager.invalidate()
+    assert await manager.next() == 8
+
+    # Once the message has expired the chain is authoritative again
+    now[0] = 61.0
+    manager.invalidate()
+    assert await manager.next() == 7